@@ -1,11 +1,10 @@
 from src.token import Token
 from abc import ABC, abstractmethod, abstractproperty
 from dataclasses import dataclass, field
-from typing import Union
-from pydantic import BaseModel
+from typing import Any, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class Node(ABC):
     """
     A single node in the AST
@@ -18,21 +17,21 @@ class Node(ABC):
         return self.token.Literal
 
 
-@dataclass
+@dataclass(slots=True)
 class Statement(Node):
     @abstractmethod
     def statement_node() -> None:
         ...
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Node):
     @abstractmethod
     def expression_node(self) -> None:
         ...
 
 
-@dataclass
+@dataclass(slots=True)
 class Program:
     statements: list[Statement] = field(default_factory=list)
 
@@ -52,13 +51,15 @@ class Program:
         return return_str
 
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(Expression):
     """
     Identifier in a program
     """
 
     value: str
+    # where 'resolver' found the variable, see 'resolver.address'
+    address: Any = field(default=None, repr=False, compare=False)
 
     def statement_node():
         pass
@@ -70,7 +71,7 @@ class Identifier(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class LetStatement(Statement):
     """
     Representation of the Let statement in a program.
@@ -90,7 +91,7 @@ class LetStatement(Statement):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStatement(Statement):
     """
     ReturnStatement structure with a field for the initial token
@@ -107,7 +108,7 @@ class ReturnStatement(Statement):
         return self.token.Literal
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionStatement(Statement):
     """
     When we hit the Parser.parse_statement() default case,
@@ -129,7 +130,7 @@ class ExpressionStatement(Statement):
         return self.token.Literal
 
 
-@dataclass
+@dataclass(slots=True)
 class IntegerLiteral(Expression):
     """
     The IntegerLiteral in the Monkey programming language is
@@ -138,6 +139,8 @@ class IntegerLiteral(Expression):
 
     # token: Token  inherited from 'Expression' -> 'Node'
     value: int = 0
+    # the runtime object of the literal, set by 'constant_pool'
+    constant: Any = field(default=None, repr=False, compare=False)
 
     def statement_node():
         pass
@@ -149,7 +152,7 @@ class IntegerLiteral(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class PrefixExpression(Expression):
     # token: Token  inherited from 'Expression' -> 'Node'
     operator: str  # - or !
@@ -165,7 +168,7 @@ class PrefixExpression(Expression):
         return f"({self.operator} {self.right})"
 
 
-@dataclass
+@dataclass(slots=True)
 class InfixExpression(Expression):
     # token: Token  inherited from 'Expression' -> 'Node'
     left: Expression | None  # the expression to the left of the operator
@@ -182,7 +185,7 @@ class InfixExpression(Expression):
         return f"({self.left} {self.operator} {self.right})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Boolean(Expression):
     """
     The Boolean in the Monkey programming language
@@ -190,6 +193,8 @@ class Boolean(Expression):
 
     # token: Token  inherited from 'Expression' -> 'Node'
     value: bool = False
+    # the runtime object of the literal, set by 'constant_pool'
+    constant: Any = field(default=None, repr=False, compare=False)
 
     def statement_node():
         pass
@@ -201,7 +206,7 @@ class Boolean(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockStatement(Expression):
     """
     Blockstatement, enabling if/else
@@ -209,6 +214,13 @@ class BlockStatement(Expression):
 
     # token: Token  inherited from 'Expression' -> 'Node'
     statements: list[Statement] = field(default_factory=list)
+    # the closure 'closure_compiler' compiles the block into
+    compiled: Any = field(default=None, repr=False, compare=False)
+    # the 'resolver.Scope' of the function the block is the body of
+    scope: Any = field(default=None, repr=False, compare=False)
+    # the free frames of the function the block is the body of, when
+    # 'escape_analysis' found that they do not escape a call
+    frames: Any = field(default=None, repr=False, compare=False)
 
     def statement_node():
         pass
@@ -220,7 +232,7 @@ class BlockStatement(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class IfExpression(Expression):
     """ """
 
@@ -239,7 +251,7 @@ class IfExpression(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionLiteral(Expression):
     """
     Representation of a function in the Monkey language.
@@ -260,7 +272,7 @@ class FunctionLiteral(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class CallExpression(Expression):
     """
     Represents the calling of a function.
@@ -273,6 +285,9 @@ class CallExpression(Expression):
         None  # Identifier | FunctionLiteral  # identifier or FunctionLiteral
     )
     arguments: list[Expression] = field(default_factory=list)
+    # set by 'tail_calls' when the value of the call is the value of the
+    # function the call is in
+    tail: bool = field(default=False, repr=False, compare=False)
 
     def statement_node():
         pass
@@ -284,7 +299,7 @@ class CallExpression(Expression):
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class StringLiteral(Expression):
     """
     The StringLiteral in the Monkey programming language is
@@ -293,6 +308,8 @@ class StringLiteral(Expression):
 
     # token: Token  inherited from 'Expression' -> 'Node'
     value: str = ""
+    # the runtime object of the literal, set by 'constant_pool'
+    constant: Any = field(default=None, repr=False, compare=False)
 
     def token_literal(self) -> str:
         return self.token.Literal
@@ -304,7 +321,7 @@ class StringLiteral(Expression):
         return self.token.Literal
 
 
-@dataclass
+@dataclass(slots=True)
 class ArrayLiteral(Expression):
     """
     The ArrayLiteral in the Monkey programming language is
@@ -324,7 +341,7 @@ class ArrayLiteral(Expression):
         return self.elements
 
 
-@dataclass
+@dataclass(slots=True)
 class IndexExpression(Expression):
     # token: Token  inherited from 'Expression' -> 'Node'
     left: Expression | None = None
@@ -338,3 +355,74 @@ class IndexExpression(Expression):
 
     def __str__(self) -> str:
         return f"({self.left} [{self.index}])"
+
+
+@dataclass(slots=True)
+class CommonExpression(Expression):
+    """
+    An expression that 'common_subexpressions' found more than once in a
+    function, its value is computed once per call and kept at 'place': a
+    slot of the Frame of a resolved call, or a name in the Environment of
+    the call.
+    """
+
+    # token: Token  inherited from 'Expression' -> 'Node'
+    expression: Expression | None = None
+    place: Any = field(default=None, repr=False, compare=False)
+
+    def expression_node():
+        pass
+
+    def token_literal(self) -> str:
+        return self.token.Literal
+
+    def __str__(self) -> str:
+        return str(self.expression)
+
+
+# the kinds of the fields in SCHEMAS
+SCALAR = 0  # a str, int, bool or None
+NODE = 1  # a node or None
+NODES = 2  # a list of nodes or None
+
+# The fields of every node class that hold its values and the nodes below
+# it, in the order of the dataclass fields. The passes over the ast walk it
+# with these, 'parse_cache' and 'flat_ast' store nodes with them.
+SCHEMAS: dict[type, tuple[tuple[str, int], ...]] = {
+    Program: (("statements", NODES),),
+    Identifier: (("value", SCALAR),),
+    LetStatement: (("name", NODE), ("value", NODE)),
+    ReturnStatement: (("return_value", NODE),),
+    ExpressionStatement: (("expression", NODE),),
+    IntegerLiteral: (("value", SCALAR),),
+    PrefixExpression: (("operator", SCALAR), ("right", NODE)),
+    InfixExpression: (("left", NODE), ("operator", SCALAR), ("right", NODE)),
+    Boolean: (("value", SCALAR),),
+    BlockStatement: (("statements", NODES),),
+    IfExpression: (
+        ("condition", NODE),
+        ("consequence", NODE),
+        ("alternative", NODE),
+    ),
+    FunctionLiteral: (("body", NODE), ("parameters", NODES)),
+    CallExpression: (("body", NODE), ("function", NODE), ("arguments", NODES)),
+    StringLiteral: (("value", SCALAR),),
+    ArrayLiteral: (("elements", NODES),),
+    IndexExpression: (("left", NODE), ("index", NODE)),
+    CommonExpression: (("expression", NODE), ("place", SCALAR)),
+}
+
+
+def children(node: Any) -> list[Any]:
+    """
+    The nodes right below a node in the order of its fields, a missing
+    node is None.
+    """
+    result = []
+    for name, kind in SCHEMAS[type(node)]:
+        value = getattr(node, name)
+        if kind == NODE:
+            result.append(value)
+        elif kind == NODES and value is not None:
+            result.extend(value)
+    return result
@@ -0,0 +1,1038 @@
+"""
+python -m src.benchmarks
+python -m src.benchmarks lexer
+python -m src.benchmarks lexer_file
+python -m src.benchmarks tokens
+python -m src.benchmarks parallel_lexer
+python -m src.benchmarks parse_files
+python -m src.benchmarks incremental_lexer
+python -m src.benchmarks parser
+python -m src.benchmarks snippets
+python -m src.benchmarks parse_cache
+python -m src.benchmarks ast_memory
+python -m src.benchmarks flat_ast
+python -m src.benchmarks streaming
+python -m src.benchmarks resolver
+python -m src.benchmarks closures
+python -m src.benchmarks leaf_calls
+python -m src.benchmarks tail_calls
+python -m src.benchmarks stackless
+python -m src.benchmarks unboxed
+python -m src.benchmarks small_objects
+python -m src.benchmarks constants
+python -m src.benchmarks optimizer
+python -m src.benchmarks common_subexpressions
+
+Benchmarks for the interpreter. Without arguments all benchmarks run,
+otherwise only the named ones.
+"""
+from __future__ import annotations
+from src.lexer import (
+    Lexer,
+    RegexLexer,
+    TokenBuffer,
+    tokenize,
+    tokenize_compact,
+    tokenize_file,
+)
+from src.token import TokenTypes
+from src.evaluator import (
+    eval_each,
+    eval_identifier,
+    eval_program,
+    extended_function_env,
+    release_function_env,
+)
+from src.escape_analysis import analyze
+from src.flat_ast import FlatProgram
+from src import ast
+from src import object
+from src.incremental import IncrementalLexer
+from src.iterative_parser import IterativeParser
+from src.parser import Parser
+from src.parallel import MIN_PARALLEL_SIZE, lex_parallel, parse_files
+from src.ast import SCHEMAS, children
+from src.parse_cache import ParseCache, decode_program
+from src.resolver import resolve
+from src.common_subexpressions import eliminate
+from src.constant_pool import attach_constants
+from src.optimizer import optimize
+from src.stackless import Evaluation
+from src.tail_calls import mark
+from src import unboxed
+from typing import Callable, Iterator
+import contextlib
+import dataclasses
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SAMPLE_PROGRAM = """let five = 5;
+let ten = 10;
+let add = fn(x, y) {
+x + y;
+};
+let result = add(five, ten);
+let fullName = fn(first, last) { first + " " + last };
+if (5 < 10) { return true; } else { return false; }
+10 == 10; 10 != 9; [1, 2 * 3, add(4, 5)][2];
+"""
+
+
+def generate_source(size: int) -> str:
+    """
+    Repeat the sample program until the source is at least 'size' chars.
+    """
+    repeat = size // len(SAMPLE_PROGRAM) + 1
+    return SAMPLE_PROGRAM * repeat
+
+
+def timed(function: Callable, *args) -> tuple[float, object]:
+    """
+    Run a function once and return the elapsed seconds and its result.
+
+    The output and logging of the interpreter are silenced while it runs.
+    """
+    logging.disable(logging.CRITICAL)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+    return elapsed, result
+
+
+def lex_with_lexer(source_code: str) -> int:
+    lexer = Lexer.new(source_code)
+    count = 1
+    while lexer.next_token().Type != TokenTypes.EOF:
+        count += 1
+    return count
+
+
+def lex_with_tokenize(source_code: str) -> int:
+    count = 0
+    for _ in tokenize(source_code):
+        count += 1
+    return count
+
+
+def bench_lexer(size: int = 2_000_000) -> None:
+    """
+    Throughput of 'Lexer.next_token' against the regex based 'tokenize'.
+    """
+    source_code = generate_source(size)
+    megabytes = len(source_code) / 1_000_000
+    print(f"lexing {megabytes:.1f} MB")
+    results = {}
+    for name, function in [
+        ("Lexer.next_token", lex_with_lexer),
+        ("tokenize", lex_with_tokenize),
+    ]:
+        elapsed, count = timed(function, source_code)
+        results[name] = elapsed
+        print(
+            f"  {name:<20} {count} tokens  {elapsed:7.2f}s"
+            f"  {megabytes / elapsed:6.2f} MB/s"
+        )
+    speedup = results["Lexer.next_token"] / results["tokenize"]
+    print(f"  speedup: {speedup:.1f}x")
+
+
+def best_of(times: int, function: Callable, *args) -> float:
+    """
+    The lowest elapsed seconds of running a function 'times' times, for
+    timings that are short enough to be thrown off by other processes.
+    """
+    return min(timed(function, *args)[0] for _ in range(times))
+
+
+def peak_memory(function: Callable, *args) -> tuple[float, int, object]:
+    """
+    Like 'timed', but also return the peak of the traced memory in bytes.
+    """
+    tracemalloc.start()
+    elapsed, result = timed(function, *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def lex_file_in_memory(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return lex_with_tokenize(f.read())
+
+
+def lex_file_streaming(path: str) -> int:
+    count = 0
+    for _ in tokenize_file(path):
+        count += 1
+    return count
+
+
+def bench_lexer_file(size: int = 2_000_000) -> None:
+    """
+    Peak memory of lexing a file that is read as a whole against
+    'tokenize_file', which reads it in chunks.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.monkey")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_source(size))
+        megabytes = os.path.getsize(path) / 1_000_000
+        print(f"lexing a {megabytes:.1f} MB file")
+        for name, function in [
+            ("read whole file", lex_file_in_memory),
+            ("tokenize_file", lex_file_streaming),
+        ]:
+            elapsed, peak, count = peak_memory(function, path)
+            print(
+                f"  {name:<20} {count} tokens  {elapsed:7.2f}s"
+                f"  peak {peak / 1_000_000:7.2f} MB"
+            )
+
+
+def bench_tokens(size: int = 1_000_000) -> None:
+    """
+    Memory held by the tokens of a source, as Tokens, as CompactTokens and
+    as a columnar TokenBuffer.
+    """
+    source_code = generate_source(size)
+    print(f"tokens of {len(source_code) / 1_000_000:.1f} MB of source")
+    for name, function in [
+        ("Token", lambda: list(tokenize(source_code))),
+        ("CompactToken", lambda: list(tokenize_compact(source_code))),
+        ("TokenBuffer", lambda: TokenBuffer.new(source_code)),
+    ]:
+        elapsed, peak, tokens = peak_memory(function)
+        print(
+            f"  {name:<20} {len(tokens)} tokens  {elapsed:7.2f}s"
+            f"  peak {peak / 1_000_000:7.2f} MB"
+            f"  {peak / len(tokens):6.1f} bytes/token"
+        )
+
+
+def bench_parallel_lexer(size: int = 8_000_000) -> None:
+    """
+    Time of 'lex_parallel' for a growing number of worker processes,
+    against lexing into a TokenBuffer on a single core.
+    """
+    source_code = generate_source(size)
+    cpus = os.cpu_count() or 1
+    print(f"lexing {len(source_code) / 1_000_000:.1f} MB on {cpus} cpus")
+    serial, _ = timed(TokenBuffer.new, source_code)
+    print(f"  {'serial':<20} {serial:7.2f}s")
+    workers = 1
+    while workers <= max(cpus, 2):
+        elapsed, _ = timed(lex_parallel, source_code, workers)
+        print(
+            f"  {f'{workers} workers':<20} {elapsed:7.2f}s"
+            f"  speedup: {serial / elapsed:.1f}x"
+        )
+        workers *= 2
+
+
+def write_corpus(directory: str, files: int, size: int) -> list[str]:
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"script{size}_{index}.monkey")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_source(size))
+        paths.append(path)
+    return paths
+
+
+def bench_parse_files(files: int = 40, size: int = 10_000) -> None:
+    """
+    Time of 'parse_files' on a corpus of generated files, for a growing
+    number of worker processes, and on a corpus below MIN_PARALLEL_SIZE
+    that is parsed in-process.
+
+    On a machine with one cpu the workers take turns, the times then show
+    the cost of the pool, the pickling and the decoding in the parent.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+    cpus = cpus or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(directory, files, size)
+        print(f"parsing {files} files of {size / 1_000:.0f} kB on {cpus} cpus")
+        serial, _ = timed(parse_files, paths, 1)
+        print(f"  {'serial':<20} {serial:7.2f}s")
+        workers = 2
+        while workers <= max(cpus, 2):
+            elapsed, _ = timed(parse_files, paths, workers)
+            print(
+                f"  {f'{workers} workers':<20} {elapsed:7.2f}s"
+                f"  speedup: {serial / elapsed:.1f}x"
+            )
+            workers *= 2
+        _, results = timed(parse_files, paths, 1, True)
+        decode, _ = timed(lambda: [decode_program(r.program) for r in results])
+        share = decode / serial
+        print(f"  {'decode in parent':<20} {decode:7.2f}s  {share:.0%} of serial")
+
+        small = max(1, MIN_PARALLEL_SIZE // (size * 4))
+        small_paths = paths[:small]
+        print(f"{small} files, below MIN_PARALLEL_SIZE, with {max(cpus, 2)} workers")
+        serial, _ = timed(parse_files, small_paths, 1)
+        elapsed, _ = timed(parse_files, small_paths, max(cpus, 2))
+        print(f"  {'serial':<20} {serial:7.2f}s")
+        print(f"  {'in-process':<20} {elapsed:7.2f}s  speedup: {serial / elapsed:.1f}x")
+
+
+def type_characters(lexer: IncrementalLexer, offset: int, text: str) -> None:
+    for index, char in enumerate(text):
+        lexer.edit(offset + index, 0, char)
+
+
+def bench_incremental_lexer(size: int = 2_000_000, edits: int = 100) -> None:
+    """
+    Time per keystroke of 'IncrementalLexer.edit' against lexing the whole
+    source again, for sources of growing size.
+    """
+    text = "let x = 1;\n" * (edits // 11 + 1)
+    text = text[:edits]
+    while size >= 20_000:
+        source_code = generate_source(size)
+        offset = len(source_code) // 2
+        offset = source_code.index("\n", offset) + 1
+        full, _ = timed(TokenBuffer.new, source_code)
+        lexer = IncrementalLexer.new(source_code)
+        elapsed, _ = timed(type_characters, lexer, offset, text)
+        per_edit = elapsed / len(text)
+        print(
+            f"  {len(source_code) / 1_000_000:5.2f} MB"
+            f"  full {full * 1000:9.3f} ms"
+            f"  edit {per_edit * 1000:7.3f} ms"
+            f"  speedup: {full / per_edit:.0f}x"
+        )
+        size //= 10
+
+
+def parse_with(parser_class: type[Parser], source_code: str) -> str:
+    p = parser_class.new(RegexLexer.new(source_code))
+    try:
+        p.parse_program()
+    except RecursionError:
+        return "RecursionError"
+    return f"{len(p.errors)} errors"
+
+
+def bench_parser() -> None:
+    """
+    The recursive Parser against the IterativeParser on wide expressions,
+    long operator chains, and on nested parentheses and prefix operators.
+    """
+    operators = ["+", "*", "-", "/", "==", "<"]
+    wide = " ".join(f"{i} {operators[i % 6]}" for i in range(20_000)) + " 1;"
+    programs = [
+        ("wide, 20000 operators", wide),
+        ("program, 0.2 MB", generate_source(200_000)),
+        ("nested (), depth 100", "(" * 100 + "1" + ")" * 100),
+        ("nested (), depth 10000", "(" * 10_000 + "1" + ")" * 10_000),
+        ("prefix -, depth 10000", "-" * 10_000 + "1"),
+    ]
+    for name, source_code in programs:
+        print(f"  {name}")
+        for parser_class in [Parser, IterativeParser]:
+            elapsed, result = timed(parse_with, parser_class, source_code)
+            print(f"    {parser_class.__name__:<20} {elapsed:7.3f}s  {result}")
+
+
+def parse_snippets_with_new_parsers(snippets: list[str]) -> int:
+    statements = 0
+    for snippet in snippets:
+        statements += len(
+            Parser.new(RegexLexer.new(snippet)).parse_program().statements
+        )
+    return statements
+
+
+def parse_snippets_with_one_parser(snippets: list[str]) -> int:
+    statements = 0
+    p = Parser(l=None)
+    for snippet in snippets:
+        statements += len(p.reset(RegexLexer.new(snippet)).parse_program().statements)
+    return statements
+
+
+def construct_parsers(count: int) -> None:
+    for _ in range(count):
+        Parser(l=None)
+
+
+def bench_snippets(count: int = 20_000) -> None:
+    """
+    Parsing many tiny snippets, as the repl does for every line, with a
+    new parser for every snippet and with one parser that is reset.
+    """
+    snippets = ["let x = 1 + 2;", "x * (y - 3)", 'len("abc")', "[1, 2][0]"]
+    snippets = snippets * (count // len(snippets))
+    elapsed, _ = timed(construct_parsers, len(snippets))
+    print(f"  {'Parser()':<20} {elapsed / len(snippets) * 1e6:7.2f} us per parser")
+    for name, function in [
+        ("Parser.new", parse_snippets_with_new_parsers),
+        ("Parser.reset", parse_snippets_with_one_parser),
+    ]:
+        elapsed, _ = timed(function, snippets)
+        print(f"  {name:<20} {elapsed / len(snippets) * 1e6:7.2f} us per snippet")
+
+
+def bench_parse_cache(size: int = 200_000) -> None:
+    """
+    Parsing a source with an empty parse cache against loading it from
+    the cache.
+    """
+    source_code = generate_source(size)
+    print(f"parsing {len(source_code) / 1_000_000:.1f} MB of source")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache.new(directory)
+        cold, _ = timed(cache.parse, source_code)
+        warm, _ = timed(cache.parse, source_code)
+        entry = os.path.getsize(cache.path(cache.key(source_code)))
+    print(f"  {'cold':<20} {cold:7.3f}s")
+    print(f"  {'warm':<20} {warm:7.3f}s  speedup: {cold / warm:.1f}x")
+    print(f"  entry of {entry / 1_000_000:.2f} MB")
+
+
+def ast_nodes(program) -> list:
+    """
+    All nodes of a program, found without recursion.
+    """
+    nodes = []
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        nodes.append(node)
+        stack.extend(children(node))
+    return nodes
+
+
+def copy_nodes(nodes: list, classes: dict[type, type]) -> list:
+    """
+    Shallow copies of the nodes as instances of the mapped classes.
+    """
+    return [
+        classes[type(node)](
+            *[getattr(node, field.name) for field in dataclasses.fields(node)]
+        )
+        for node in nodes
+    ]
+
+
+def bench_ast_memory(size: int = 200_000) -> None:
+    """
+    Bytes per ast node of the slotted node classes, against the same
+    classes as plain dataclasses with a __dict__ per instance.
+    """
+    source_code = generate_source(size)
+    _, program = timed(lambda: Parser.new(RegexLexer.new(source_code)).parse_program())
+    nodes = ast_nodes(program)
+    print(f"{len(nodes)} nodes in {len(source_code) / 1_000_000:.1f} MB of source")
+    slotted = {cls: cls for cls in SCHEMAS}
+    with_dict = {
+        cls: dataclasses.make_dataclass(
+            cls.__name__, [field.name for field in dataclasses.fields(cls)]
+        )
+        for cls in SCHEMAS
+    }
+    for name, classes in [("__dict__", with_dict), ("__slots__", slotted)]:
+        _, peak, copies = peak_memory(copy_nodes, nodes, classes)
+        print(f"  {name:<20} {peak / len(copies):6.1f} bytes per node")
+
+
+def bench_flat_ast(size: int = 200_000) -> None:
+    """
+    Memory and traversal time of the object graph ast against the flat
+    ast, in memory and mapped from a file.
+    """
+    source_code = generate_source(size)
+    _, program = timed(lambda: Parser.new(RegexLexer.new(source_code)).parse_program())
+    flat = FlatProgram.from_program(program)
+    print(f"{len(flat)} nodes in {len(source_code) / 1_000_000:.1f} MB of source")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.flat")
+        flat.save(path)
+        for name, function in [
+            ("objects", flat.to_program),
+            ("flat", lambda: FlatProgram.from_program(program)),
+            ("flat mmap", lambda: FlatProgram.load(path)),
+        ]:
+            gc.collect()
+            tracked = len(gc.get_objects())
+            tracemalloc.start()
+            _, result = timed(function)
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            tracked = len(gc.get_objects()) - tracked
+            walk = ast_nodes if name == "objects" else lambda flat: list(flat.walk())
+            elapsed = timed(walk, result)[0]
+            print(
+                f"  {name:<20} {size / 1_000_000:7.2f} MB  {tracked:8} gc objects"
+                f"  walk: {elapsed:.3f}s"
+            )
+            del result
+
+
+STREAMING_PROGRAM = """let add = fn(x, y) { x + y; };
+let v = add(1, [1, 2 * 3, 4][1]) * 2;
+if (v > 10) { add(v, v) } else { v };
+"""
+
+
+def whole_program(source_code: str) -> Iterator[object.Object]:
+    program = Parser.new(RegexLexer.new(source_code)).parse_program()
+    return eval_each(program.statements, object.new_environment())
+
+
+def streamed_statements(source_code: str) -> Iterator[object.Object]:
+    statements = Parser.new(RegexLexer.new(source_code)).parse_statements()
+    return eval_each(statements, object.new_environment())
+
+
+def last_result(evaluate: Callable, source_code: str) -> object.Object:
+    result = None
+    for result in evaluate(source_code):
+        pass
+    return result
+
+
+def bench_streaming(size: int = 200_000) -> None:
+    """
+    Peak memory and time to the first result of parsing the whole program
+    before evaluating it, against evaluating every statement as soon as
+    it is parsed.
+    """
+    source_code = STREAMING_PROGRAM * (size // len(STREAMING_PROGRAM) + 1)
+    print(f"evaluating {len(source_code) / 1_000_000:.1f} MB of source")
+    for name, evaluate in [
+        ("parse_program", whole_program),
+        ("parse_statements", streamed_statements),
+    ]:
+        first, _ = timed(lambda: next(evaluate(source_code)))
+        elapsed, peak, _ = peak_memory(last_result, evaluate, source_code)
+        print(
+            f"  {name:<20} {elapsed:7.2f}s  peak {peak / 1_000_000:6.2f} MB"
+            f"  first result after {first * 1000:8.2f} ms"
+        )
+
+
+def identifier(index: int) -> str:
+    """
+    A name for variable 'index', identifiers can not contain digits.
+    """
+    name = ""
+    while True:
+        index, letter = divmod(index, 26)
+        name = chr(ord("a") + letter) + name
+        if index == 0:
+            return name
+
+
+def nested_closures_source(depth: int, calls: int) -> str:
+    """
+    A function 'depth' closures deep whose innermost body reads the
+    parameters of all of them, a top level variable and a builtin, called
+    'calls' times.
+    """
+    parameters = [f"p{identifier(level)}" for level in range(depth)]
+    function = " + ".join(parameters * 4 + ["k", 'len("four")'])
+    for parameter in reversed(parameters):
+        function = f"fn({parameter}) {{ {function} }}"
+    call = "".join(f"({level})" for level in range(depth - 1))
+    statements = ["let k = 1;", f"let f = {function};", f"let g = f{call};"]
+    statements += [f"g({index});" for index in range(calls)]
+    return "\n".join(statements)
+
+
+def evaluate(program) -> object.Object:
+    return eval_program(program, object.new_environment())
+
+
+def look_up_identifiers(program, repeat: int) -> None:
+    """
+    Evaluate the identifiers in the body of 'g' of 'nested_closures_source'
+    in the environment of a call of 'g'.
+    """
+    env = object.new_environment()
+    # the statements that define 'g'
+    eval_program(ast.Program(statements=program.statements[:3]), env)
+    g = env.get("g")
+    call_env = extended_function_env(g, [object.Integer(value=1)])
+    identifiers = [
+        node for node in ast_nodes(g.body) if type(node) is ast.Identifier
+    ]
+    for _ in range(repeat):
+        for identifier in identifiers:
+            eval_identifier(identifier, call_env)
+
+
+def bench_resolver(calls: int = 2_000) -> None:
+    """
+    Evaluating programs with variables looked up by name through the
+    Environments, against with the addresses of 'resolver'. The lookups
+    are also timed on their own.
+    """
+    for depth in [1, 4, 16]:
+        source_code = nested_closures_source(depth, calls)
+        print(f"closures {depth} deep, {calls} calls")
+        times = {}
+        for name in ["by name", "resolved"]:
+            _, program = timed(
+                lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+            )
+            if name == "resolved":
+                resolve(program)
+            evaluated, _ = timed(evaluate, program)
+            looked_up, _ = timed(look_up_identifiers, program, calls * 10)
+            times[name] = (evaluated, looked_up)
+            by_name = times["by name"]
+            print(
+                f"  {name:<20} {evaluated:7.3f}s"
+                f"  speedup: {by_name[0] / evaluated:.2f}x"
+                f"  lookups only {looked_up:7.3f}s"
+                f"  speedup: {by_name[1] / looked_up:.2f}x"
+            )
+
+
+def closures_source(count: int) -> str:
+    """
+    'count' adders, made by calls that also build an array and a string
+    that the adder does not use, in the style of 'newAdder' in the repl.
+    """
+    elements = ", ".join(str(index) for index in range(50))
+    statements = [
+        "let newAdder = fn(x) {",
+        f'  let table = [{elements}]; let label = "adder" + "-" + "label";',
+        "  let offset = table[1] * x;",
+        "  fn(y) { x + y }",
+        "};",
+    ]
+    statements += [
+        f"let add{identifier(index)} = newAdder({index});" for index in range(count)
+    ]
+    return "\n".join(statements)
+
+
+def evaluate_in_env(program) -> object.Environment:
+    env = object.new_environment()
+    eval_program(program, env)
+    return env
+
+
+def bench_closures(count: int = 2_000) -> None:
+    """
+    Memory kept alive by closures that capture the whole Environment they
+    are made in, against closures that capture only what they use.
+    """
+    source_code = closures_source(count)
+    print(f"{count} closures")
+    for name in ["by name", "resolved"]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        if name == "resolved":
+            resolve(program)
+        gc.collect()
+        tracemalloc.start()
+        elapsed, env = timed(evaluate_in_env, program)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"  {name:<20} {elapsed:7.3f}s  {size / count:8.0f} bytes per closure"
+        )
+        del env
+
+
+LEAF_FUNCTIONS = """let add = fn(x, y) { x + y };
+let scale = fn(x, factor) { let scaled = x * factor; scaled - 1 };
+"""
+LEAF_CALLS = "let total = add(scale(3, 4), add(1, 2)) + scale(add(5, 6), 2);\n"
+
+
+def set_up_environments(program, calls: int) -> None:
+    """
+    Make and release the environments of 'calls' calls of 'scale' from
+    LEAF_FUNCTIONS, like 'apply_function' does.
+    """
+    env = object.new_environment()
+    eval_program(ast.Program(statements=program.statements[:2]), env)
+    scale = env.get("scale")
+    args = [object.Integer(value=3), object.Integer(value=4)]
+    for _ in range(calls):
+        release_function_env(scale, extended_function_env(scale, args))
+
+
+def bench_leaf_calls(repeat: int = 4_000) -> None:
+    """
+    Calls of functions that make no closures, with a new environment for
+    every call, against frames reused after 'escape_analysis'. The making
+    and releasing of the environments is also timed on its own.
+    """
+    source_code = LEAF_FUNCTIONS + LEAF_CALLS * repeat
+    calls = repeat * 5
+    print(f"{calls} calls of leaf functions")
+    for name, passes in [
+        ("by name", []),
+        ("resolved", [resolve]),
+        ("resolved, reused", [resolve, analyze]),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        for function in passes:
+            function(program)
+        elapsed = best_of(3, evaluate, program)
+        environments = best_of(3, set_up_environments, program, calls * 10)
+        print(
+            f"  {name:<20} {elapsed / calls * 1e6:6.2f} us per call,"
+            f" {environments / calls * 1e5:6.3f} us of it for the environment"
+        )
+
+
+COUNT_DOWN = """let count = fn(n, total) {
+    if (n == 0) { total } else { count(n - 1, total + 1) }
+};
+"""
+
+
+def count_down(passes: list[Callable], depth: int) -> bool:
+    """
+    Whether a tail recursion 'depth' calls deep runs without a
+    RecursionError.
+    """
+    source_code = COUNT_DOWN + f"count({depth}, 0);\n"
+    _, program = timed(lambda: Parser.new(RegexLexer.new(source_code)).parse_program())
+    for function in passes:
+        function(program)
+    try:
+        timed(evaluate, program)
+    except RecursionError:
+        return False
+    return True
+
+
+def bench_tail_calls(depth: int = 40, repeat: int = 500) -> None:
+    """
+    A tail recursive loop with nested calls, against calls run in the loop
+    of 'apply_function' after 'tail_calls', and the deepest recursion that
+    each runs, up to 100000 calls.
+    """
+    source_code = COUNT_DOWN + f"count({depth}, 0);\n" * repeat
+    calls = (depth + 1) * repeat
+    print(f"{calls} calls, {depth} deep")
+    for name, passes in [
+        ("nested", []),
+        ("tail calls", [mark]),
+        ("resolved, tail calls", [resolve, analyze, mark]),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        for function in passes:
+            function(program)
+        elapsed = best_of(3, evaluate, program)
+        deepest = 0
+        for deeper in (10**exponent for exponent in range(1, 6)):
+            if not count_down(passes, deeper):
+                break
+            deepest = deeper
+        print(
+            f"  {name:<22} {elapsed / calls * 1e6:6.2f} us per call,"
+            f" runs {deepest} calls deep"
+        )
+
+
+SUM = """let sum = fn(n) { if (n == 0) { 0 } else { n + sum(n - 1) } };
+"""
+FIB = """let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+"""
+
+
+def evaluate_stackless(program, pause: int | None = None) -> object.Object:
+    """
+    Evaluate without recursion, pausing every 'pause' steps.
+    """
+    evaluation = Evaluation.new(program, object.new_environment())
+    while not evaluation.run(pause):
+        pass
+    return evaluation.result
+
+
+def deepest_sum(evaluate: Callable) -> int:
+    """
+    The deepest non-tail recursion that runs without a RecursionError, up
+    to 100000 calls.
+    """
+    deepest = 0
+    for depth in (10**exponent for exponent in range(1, 6)):
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(SUM + f"sum({depth});")).parse_program()
+        )
+        try:
+            timed(evaluate, program)
+        except RecursionError:
+            break
+        deepest = depth
+    return deepest
+
+
+def bench_stackless(n: int = 18) -> None:
+    """
+    A naive 'fib' with the recursive evaluator, against the stackless one,
+    run to the end and paused every 1000 steps, and the deepest non-tail
+    recursion that each runs.
+    """
+    source_code = FIB + f"fib({n});"
+    _, program = timed(lambda: Parser.new(RegexLexer.new(source_code)).parse_program())
+    print(f"fib({n})")
+    for name, function, args in [
+        ("recursive", evaluate, ()),
+        ("stackless", evaluate_stackless, ()),
+        ("stackless, paused", evaluate_stackless, (1000,)),
+    ]:
+        elapsed = best_of(3, function, program, *args)
+        deepest = deepest_sum(lambda program: function(program, *args))
+        print(f"  {name:<20} {elapsed:6.3f} s, runs {deepest} calls deep")
+
+
+ARITHMETIC = """let step = fn(n, total) {
+    let square = n * n;
+    if (square - 3 * n > 10) { total + square / 2 } else { total - n + 1 }
+};
+let loop = fn(n, total) { if (n == 0) { total } else { loop(n - 1, step(n, total)) } };
+"""
+
+
+def count_objects(function: Callable, *args) -> int:
+    """
+    The number of object.* instances that are constructed by a function.
+    """
+    count = 0
+
+    def profile(frame, event, arg):
+        nonlocal count
+        if event == "call" and frame.f_code.co_name == "__init__":
+            if type(frame.f_locals.get("self")).__module__ == object.__name__:
+                count += 1
+
+    sys.setprofile(profile)
+    try:
+        timed(function, *args)
+    finally:
+        sys.setprofile(None)
+    return count
+
+
+def bench_unboxed(n: int = 50, repeat: int = 200) -> None:
+    """
+    An arithmetic loop with boxed values, against unboxed values, with
+    and without the passes that run before evaluation.
+    """
+    source_code = ARITHMETIC + f"loop({n}, 0);\n" * repeat
+    _, program = timed(lambda: Parser.new(RegexLexer.new(source_code)).parse_program())
+    mark(analyze(resolve(program)))
+    print(f"{n * repeat} iterations of an arithmetic loop")
+    for name, function in [
+        ("boxed", eval_program),
+        ("unboxed", unboxed.eval_program),
+    ]:
+        elapsed = best_of(3, function, program, object.new_environment())
+        count = count_objects(function, program, object.new_environment())
+        print(
+            f"  {name:<10} {elapsed:6.3f} s, {count / (n * repeat):5.1f} objects"
+            " per iteration"
+        )
+
+
+LABELS = """let label = fn(n) { if (n < 25) { "low" } else { "hi" + "gh" } };
+let labels = fn(n, last) { if (n == 0) { last } else { labels(n - 1, label(n)) } };
+"""
+
+
+def bench_small_objects(repeat: int = 100) -> None:
+    """
+    The object.* constructions of loop and recursion heavy programs, with
+    the shared small integers and interned strings of 'object.new_integer'
+    and 'object.new_string', against a new object for every value.
+    """
+    for name, source_code, calls in [
+        ("arithmetic loop", ARITHMETIC + "loop(50, 0);\n" * repeat, 100 * repeat),
+        ("fib(12)", FIB + "fib(12);\n" * (repeat // 10), 465 * (repeat // 10)),
+        ("string labels", LABELS + 'labels(50, "");\n' * repeat, 100 * repeat),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        mark(analyze(resolve(program)))
+        print(f"{name}, {calls} calls")
+        max_interned = object.MAX_INTERNED_STRINGS
+        for cached in [False, True]:
+            if not cached:
+                # an empty range of small integers and no interned strings
+                object.cache_small_integers(0, -1)
+                object.MAX_INTERNED_STRINGS = 0
+                object.STRINGS.clear()
+            try:
+                elapsed = best_of(3, evaluate, program)
+                count = count_objects(evaluate, program)
+            finally:
+                object.cache_small_integers()
+                object.MAX_INTERNED_STRINGS = max_interned
+            print(
+                f"  {'shared' if cached else 'new':<8} {elapsed:6.3f} s,"
+                f" {count / calls:5.2f} objects per call"
+            )
+
+
+LITERALS = """let price = fn(n, total) {
+    let base = if (n > 20) { 250000 } else { 125000 };
+    if (n == 0) { total } else { price(n - 1, total + base * 3 - 5000 + len("ref")) }
+};
+"""
+
+
+def bench_constants(repeat: int = 200) -> None:
+    """
+    A loop whose body has literals outside the small integers, with a new
+    object for every visit of a literal, against the runtime objects that
+    'constant_pool' attached to the literals.
+    """
+    source_code = LITERALS + "price(50, 0);\n" * repeat
+    calls = 51 * repeat
+    print(f"{calls} calls")
+    for name, passes in [
+        ("literals", []),
+        ("constant pool", [attach_constants]),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        mark(analyze(resolve(program)))
+        for function in passes:
+            function(program)
+        elapsed = best_of(3, evaluate, program)
+        count = count_objects(evaluate, program)
+        print(
+            f"  {name:<14} {elapsed:6.3f} s, {count / calls:5.2f} objects per call"
+        )
+
+
+CONSTANT_EXPRESSIONS = """let debug = 1 > 2;
+let seconds = fn(n, total) {
+    let day = 24 * 60 * 60;
+    let limit = if (debug) { 10 } else { 7 * day - 3600 };
+    let label = "seconds" + " " + "left";
+    if (n == 0) { total } else { seconds(n - 1, total + (limit - n * day) * 1) }
+};
+"""
+
+
+def bench_optimizer(repeat: int = 200) -> None:
+    """
+    A loop with constant sub expressions, before and after 'optimizer'.
+    """
+    source_code = CONSTANT_EXPRESSIONS + "seconds(50, 0);\n" * repeat
+    calls = 51 * repeat
+    print(f"{calls} calls")
+    for name, passes in [
+        ("parsed", []),
+        ("optimized", [optimize]),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        for function in passes:
+            function(program)
+        mark(analyze(resolve(program)))
+        elapsed = best_of(3, evaluate, program)
+        nodes = len(ast_nodes(program.statements[1]))
+        print(f"  {name:<10} {elapsed:6.3f} s, {nodes} nodes in the function")
+
+
+def rules_source(rules: int, calls: int) -> str:
+    """
+    'rules' generated rules that each test one field of a record a few
+    times, and a check that applies all of them to a record, 'calls' times.
+    """
+    statements = []
+    for index in range(rules):
+        field = f"r[{index % 4}]"
+        limit = f"(len(r) - 1) * {index + 2}"
+        statements.append(
+            f"let rule{identifier(index)} = fn(r) {{\n"
+            f"    if ({field} * 3 > {limit}) {{\n"
+            f"        if ({field} * 3 - {limit} > {index}) {{ {field} * 3 - {limit} }}"
+            f" else {{ {limit} }}\n"
+            f"    }} else {{ {field} + len(r) - 1 }}\n"
+            "};"
+        )
+    checks = ", ".join(f"rule{identifier(index)}(r)" for index in range(rules))
+    statements.append(f"let check = fn(r) {{ [{checks}] }};")
+    statements += [
+        f"check([{index % 7}, {index % 11}, {index % 13}, {index % 17}]);"
+        for index in range(calls)
+    ]
+    return "\n".join(statements)
+
+
+def bench_common_subexpressions(rules: int = 20, calls: int = 200) -> None:
+    """
+    Generated rules that repeat pure expressions, before and after the
+    repeated expressions are computed once per call.
+    """
+    source_code = rules_source(rules, calls)
+    print(f"{rules} rules applied to {calls} records")
+    for name, passes in [
+        ("repeated", [resolve]),
+        ("computed once", [resolve, eliminate]),
+    ]:
+        _, program = timed(
+            lambda: Parser.new(RegexLexer.new(source_code)).parse_program()
+        )
+        for function in passes:
+            function(program)
+        mark(analyze(program))
+        elapsed = best_of(3, evaluate, program)
+        per_rule = elapsed / (rules * calls) * 1e6
+        print(f"  {name:<14} {elapsed:6.3f} s, {per_rule:6.2f} us per rule")
+
+
+BENCHMARKS: dict[str, Callable[[], None]] = {
+    "lexer": bench_lexer,
+    "lexer_file": bench_lexer_file,
+    "tokens": bench_tokens,
+    "parallel_lexer": bench_parallel_lexer,
+    "parse_files": bench_parse_files,
+    "incremental_lexer": bench_incremental_lexer,
+    "parser": bench_parser,
+    "snippets": bench_snippets,
+    "parse_cache": bench_parse_cache,
+    "ast_memory": bench_ast_memory,
+    "flat_ast": bench_flat_ast,
+    "streaming": bench_streaming,
+    "resolver": bench_resolver,
+    "closures": bench_closures,
+    "leaf_calls": bench_leaf_calls,
+    "tail_calls": bench_tail_calls,
+    "stackless": bench_stackless,
+    "unboxed": bench_unboxed,
+    "small_objects": bench_small_objects,
+    "constants": bench_constants,
+    "optimizer": bench_optimizer,
+    "common_subexpressions": bench_common_subexpressions,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
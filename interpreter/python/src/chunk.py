@@ -0,0 +1,111 @@
+"""
+Bytecode chunks for the 'vm', modelled after the clox chunk.c/chunk.h.
+
+A chunk is a flat list of integers. Every instruction starts with a one-int
+OpCode that is followed by its operands, if any. Values that the
+instructions refer to (integers, strings, identifier names and compiled
+function bodies) are kept in the constant pool of the chunk.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0  # [index] push constants[index]
+    POP = 1  # discard the top of the stack
+    POP_OR_HALT = 2  # [target] like POP, but jump to target on an error
+    GET_NAME = 3  # [index] push the value bound to constants[index]
+    DEFINE = 4  # [index] bind the top of the stack to constants[index]
+    ADD = 5
+    SUBTRACT = 6
+    MULTIPLY = 7
+    DIVIDE = 8
+    LESS = 9
+    GREATER = 10
+    EQUAL = 11
+    NOT_EQUAL = 12
+    NEGATE = 13
+    BANG = 14
+    JUMP = 15  # [target]
+    JUMP_IF_FALSE = 16  # [else target, end target]
+    EXIT_BLOCK = 17  # [target] 'return' out of the innermost block
+    CLOSURE = 18  # [index] turn constants[index] into a function object
+    CALL = 19  # [argument count]
+    ARRAY = 20  # [element count]
+    INDEX = 21
+    RETURN = 22  # return the top of the stack to the caller
+    JUMP_IF_ERROR = 23  # [target, depth] drop 'depth' values below an error
+
+
+# number of operands that follow each OpCode
+OPERAND_COUNT: dict[OpCode, int] = {
+    OpCode.CONSTANT: 1,
+    OpCode.POP_OR_HALT: 1,
+    OpCode.GET_NAME: 1,
+    OpCode.DEFINE: 1,
+    OpCode.JUMP: 1,
+    OpCode.JUMP_IF_FALSE: 2,
+    OpCode.EXIT_BLOCK: 1,
+    OpCode.CLOSURE: 1,
+    OpCode.CALL: 1,
+    OpCode.ARRAY: 1,
+    OpCode.JUMP_IF_ERROR: 2,
+}
+
+
+@dataclass
+class Chunk:
+    code: list[int] = field(default_factory=list)
+    constants: list[Any] = field(default_factory=list)
+    # maps a constant to its index so identical constants are stored once
+    constant_index: dict[Any, int] = field(default_factory=dict, repr=False)
+
+    def write(self, op: OpCode, *operands: int) -> int:
+        """
+        Append an instruction and return the offset of its first operand.
+        """
+        self.code.append(int(op))
+        offset = len(self.code)
+        self.code.extend(operands)
+        return offset
+
+    def add_constant(self, value: Any, key: Any = None) -> int:
+        """
+        Add a value to the constant pool and return its index.
+
+        When a key is given, values with an equal key share one slot.
+        """
+        if key is not None and key in self.constant_index:
+            return self.constant_index[key]
+        self.constants.append(value)
+        index = len(self.constants) - 1
+        if key is not None:
+            self.constant_index[key] = index
+        return index
+
+    def patch(self, offset: int, value: int) -> None:
+        """
+        Overwrite an operand, used to fill in forward jump targets.
+        """
+        self.code[offset] = value
+
+    def disassemble(self, name: str = "chunk") -> str:
+        """
+        Human readable listing of the chunk, like debug.c in clox.
+        """
+        lines = [f"== {name} =="]
+        offset = 0
+        while offset < len(self.code):
+            op = OpCode(self.code[offset])
+            operand_count = OPERAND_COUNT.get(op, 0)
+            operands = self.code[offset + 1 : offset + 1 + operand_count]
+            line = f"{offset:04d} {op.name:<16}"
+            if operands:
+                line += " ".join(f"{operand:4d}" for operand in operands)
+            if op in (OpCode.CONSTANT, OpCode.GET_NAME, OpCode.DEFINE):
+                line += f" '{self.constants[operands[0]]}'"
+            lines.append(line.rstrip())
+            offset += 1 + operand_count
+        return "\n".join(lines)
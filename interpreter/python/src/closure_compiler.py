@@ -0,0 +1,402 @@
+"""
+Compile the AST into nested Python closures.
+
+Every ast.Node is turned into a closure that takes an object.Environment
+and returns the value of the node, so the 'match type(node)' dispatch and
+the operator matching of the evaluator are done once, at compile time.
+
+The closures follow the semantics of 'evaluator.eval':
+- a block evaluates to the value of its last statement
+- 'return' leaves the innermost block with the returned value
+- errors are values that expressions pass on, the program halts when a
+  top level statement results in an error
+"""
+from __future__ import annotations
+from src import ast
+from src import object
+from src import evaluator
+from typing import Callable
+from operator import add, sub, mul, truediv, lt, gt, eq, ne
+
+Compiled = Callable[[object.Environment], object.Object]
+
+Integer = object.Integer
+Error = object.Error
+Function = object.Function
+Builtin = object.Builtin
+Environment = object.Environment
+TRUE = evaluator.TRUE
+FALSE = evaluator.FALSE
+NULL = evaluator.NULL
+
+
+class CompileError(Exception):
+    pass
+
+
+ARITHMETIC_OPERATORS: dict[str, Callable] = {
+    "+": add,
+    "-": sub,
+    "*": mul,
+    "/": truediv,
+}
+
+COMPARISON_OPERATORS: dict[str, Callable] = {
+    "<": lt,
+    ">": gt,
+    "==": eq,
+    "!=": ne,
+}
+
+
+def compile_node(node: ast.Node | None) -> Compiled:
+    """
+    Turn a node into a closure, the compiled counterpart of 'evaluator.eval'.
+    """
+    match type(node):
+        case ast.ExpressionStatement:
+            return compile_node(node.expression)
+        case ast.LetStatement:
+            return compile_let_statement(node)
+        case ast.ReturnStatement:
+            # leaving the block is handled by 'compile_statements'
+            return compile_node(node.return_value)
+        case ast.BlockStatement:
+            return compile_block(node)
+        case ast.IntegerLiteral:
+            return compile_constant(object.Integer(value=node.value))
+        case ast.StringLiteral:
+            return compile_constant(object.String(value=node.value))
+        case ast.Boolean:
+            return compile_constant(TRUE if node.value else FALSE)
+        case ast.Identifier:
+            return compile_identifier(node)
+        case ast.PrefixExpression:
+            return compile_prefix_expression(node)
+        case ast.InfixExpression:
+            return compile_infix_expression(node)
+        case ast.IfExpression:
+            return compile_if_expression(node)
+        case ast.FunctionLiteral:
+            return compile_function_literal(node)
+        case ast.CallExpression:
+            return compile_call_expression(node)
+        case ast.ArrayLiteral:
+            return compile_array_literal(node)
+        case ast.IndexExpression:
+            return compile_index_expression(node)
+        case ast.CommonExpression:
+            return compile_common_expression(node)
+    if node is not None:
+        raise CompileError(f"cannot compile {type(node).__name__}")
+    # missing nodes, left behind by parse errors, evaluate to None
+    return compile_constant(None)
+
+
+def compile_constant(value: object.Object | None) -> Compiled:
+    def constant(env: Environment) -> object.Object:
+        return value
+
+    return constant
+
+
+def compile_statements(statements: list[ast.Statement]) -> Compiled:
+    """
+    Compile a list of statements into a closure that returns the value of
+    the last statement, or the value of the first 'return' statement that
+    does not evaluate to an error.
+    """
+    if not statements:
+        return compile_constant(None)
+    compiled = [compile_node(statement) for statement in statements]
+    returns = [type(statement) == ast.ReturnStatement for statement in statements]
+    *init, last = compiled
+
+    if not any(returns[:-1]):
+        if not init:
+            return last
+
+        def statements_without_return(env: Environment) -> object.Object:
+            for statement in init:
+                statement(env)
+            return last(env)
+
+        return statements_without_return
+
+    steps = list(zip(compiled, returns))
+
+    def statements_with_return(env: Environment) -> object.Object:
+        result = None
+        for statement, is_return in steps:
+            result = statement(env)
+            if is_return and type(result) is not Error:
+                return result
+        return result
+
+    return statements_with_return
+
+
+def compile_block(block: ast.BlockStatement) -> Compiled:
+    """
+    Compile a block once, the closure is cached on the block so that the
+    body of a function literal is never compiled twice.
+    """
+    compiled = block.compiled
+    if compiled is None:
+        compiled = compile_statements(block.statements)
+        block.compiled = compiled
+    return compiled
+
+
+def compile_program(program: ast.Program) -> Compiled:
+    """
+    Compile the top level statements of a program, the compiled counterpart
+    of 'evaluator.eval_program'.
+    """
+    steps = [
+        (compile_node(statement), type(statement) == ast.ReturnStatement)
+        for statement in program.statements
+    ]
+
+    def run(env: Environment) -> object.Object:
+        result = None
+        for statement, is_return in steps:
+            result = statement(env)
+            if type(result) is Error or is_return:
+                return result
+        return result
+
+    return run
+
+
+def compile_let_statement(node: ast.LetStatement) -> Compiled:
+    value = compile_node(node.value)
+    name = node.name.value
+
+    def let_statement(env: Environment) -> object.Object | None:
+        val = value(env)
+        if type(val) is Error:
+            return val
+        env.store[name] = val
+        return None
+
+    return let_statement
+
+
+def compile_identifier(node: ast.Identifier) -> Compiled:
+    name = node.value
+    builtin = evaluator.BUILTINS.get(name)
+    if builtin is not None:
+        return compile_constant(builtin)
+    message = f"identifier not found: {name}"
+
+    def identifier(env: Environment) -> object.Object:
+        while env is not None:
+            val = env.store.get(name)
+            if val is not None:
+                return val
+            env = env.outer
+        return evaluator.new_error(message)
+
+    return identifier
+
+
+def compile_prefix_expression(node: ast.PrefixExpression) -> Compiled:
+    right = compile_node(node.right)
+
+    if node.operator == "-":
+
+        def minus(env: Environment) -> object.Object:
+            val = right(env)
+            if type(val) is Integer:
+                return Integer(value=-val.value)
+            if evaluator.is_error(val):
+                return val
+            return evaluator.eval_minus_prefix_operator_expression(val)
+
+        return minus
+
+    if node.operator == "!":
+
+        def bang(env: Environment) -> object.Object:
+            val = right(env)
+            if type(val) is object.Null:
+                return TRUE
+            if type(val) is Error:
+                return val
+            return FALSE if bool(val.value) else TRUE
+
+        return bang
+
+    operator = node.operator
+
+    def unknown(env: Environment) -> object.Object:
+        val = right(env)
+        if evaluator.is_error(val):
+            return val
+        return evaluator.eval_prefix_expression(operator, val)
+
+    return unknown
+
+
+def compile_infix_expression(node: ast.InfixExpression) -> Compiled:
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    operator = node.operator
+
+    def slow_path(left_val: object.Object, env: Environment) -> object.Object:
+        if evaluator.is_error(left_val):
+            return left_val
+        right_val = right(env)
+        if evaluator.is_error(right_val):
+            return right_val
+        return evaluator.eval_infix_expression(operator, left_val, right_val)
+
+    arithmetic = ARITHMETIC_OPERATORS.get(operator)
+    if arithmetic is not None:
+
+        def arithmetic_expression(env: Environment) -> object.Object:
+            left_val = left(env)
+            if type(left_val) is Integer:
+                right_val = right(env)
+                if type(right_val) is Integer:
+                    return Integer(value=arithmetic(left_val.value, right_val.value))
+                if evaluator.is_error(right_val):
+                    return right_val
+                return evaluator.eval_infix_expression(operator, left_val, right_val)
+            return slow_path(left_val, env)
+
+        return arithmetic_expression
+
+    comparison = COMPARISON_OPERATORS.get(operator)
+    if comparison is not None:
+
+        def comparison_expression(env: Environment) -> object.Object:
+            left_val = left(env)
+            if type(left_val) is Integer:
+                right_val = right(env)
+                if type(right_val) is Integer:
+                    if comparison(left_val.value, right_val.value):
+                        return TRUE
+                    return FALSE
+                if evaluator.is_error(right_val):
+                    return right_val
+                return evaluator.eval_infix_expression(operator, left_val, right_val)
+            return slow_path(left_val, env)
+
+        return comparison_expression
+
+    def unknown(env: Environment) -> object.Object:
+        return slow_path(left(env), env)
+
+    return unknown
+
+
+def compile_if_expression(node: ast.IfExpression) -> Compiled:
+    condition = compile_node(node.condition)
+    consequence = compile_node(node.consequence)
+    alternative = (
+        compile_node(node.alternative)
+        if node.alternative is not None
+        else compile_constant(None)
+    )
+
+    def if_expression(env: Environment) -> object.Object:
+        val = condition(env)
+        if val is FALSE or val is NULL:
+            return alternative(env)
+        if type(val) is Error:
+            return val
+        return consequence(env)
+
+    return if_expression
+
+
+def compile_function_literal(node: ast.FunctionLiteral) -> Compiled:
+    parameters = node.parameters
+    body = node.body
+    compile_block(body)
+
+    def function_literal(env: Environment) -> object.Object:
+        return Function(parameters=parameters, env=env, body=body)
+
+    return function_literal
+
+
+def apply_function(func: object.Object, args: list[object.Object]) -> object.Object:
+    if type(func) is Function:
+        store = {}
+        for idx, parameter in enumerate(func.parameters):
+            store[parameter.value] = args[idx]
+        return compile_block(func.body)(Environment(store=store, outer=func.env))
+    if type(func) is Builtin:
+        return func.fn(*args)
+    return evaluator.not_a_function_error(func)
+
+
+def compile_call_expression(node: ast.CallExpression) -> Compiled:
+    function = compile_node(node.function)
+    arguments = [compile_node(argument) for argument in node.arguments]
+
+    def call_expression(env: Environment) -> object.Object:
+        func = function(env)
+        if type(func) is Error:
+            return func
+        args = [argument(env) for argument in arguments]
+        for arg in args:
+            if type(arg) is Error:
+                return arg
+        return apply_function(func, args)
+
+    return call_expression
+
+
+def compile_array_literal(node: ast.ArrayLiteral) -> Compiled:
+    elements = [compile_node(element) for element in node.elements]
+
+    def array_literal(env: Environment) -> object.Object:
+        values = [element(env) for element in elements]
+        for val in values:
+            if type(val) is Error:
+                return val
+        return object.Array(elements=values)
+
+    return array_literal
+
+
+def compile_index_expression(node: ast.IndexExpression) -> Compiled:
+    left = compile_node(node.left)
+    index = compile_node(node.index)
+
+    def index_expression(env: Environment) -> object.Object:
+        left_val = left(env)
+        if evaluator.is_error(left_val):
+            return left_val
+        index_val = index(env)
+        if evaluator.is_error(index_val):
+            return index_val
+        return evaluator.eval_index_expression(left_val, index_val)
+
+    return index_expression
+
+
+def compile_common_expression(node: ast.CommonExpression) -> Compiled:
+    expression = compile_node(node.expression)
+    common_value = evaluator.common_value
+    set_common_value = evaluator.set_common_value
+
+    def common_expression(env: Environment) -> object.Object:
+        val = common_value(node, env)
+        if val is None:
+            val = expression(env)
+            set_common_value(node, env, val)
+        return val
+
+    return common_expression
+
+
+def interpret(program: ast.Program, env: object.Environment) -> object.Object:
+    """
+    Compile and run a program.
+    """
+    return compile_program(program)(env)
@@ -0,0 +1,194 @@
+"""
+Compute the repeated pure expressions of a function once per call.
+
+A rule often tests the same value more than once, 'len(items) - 1' or
+'items[i]', and the evaluator computes it again at every use. Within
+the body of a function the only way a variable changes is a let
+statement of that function, and the body runs in the order it is
+written, so two equal pure expressions with no let of one of their
+variables between them have the same value. 'eliminate' wraps every
+such expression in an ast.CommonExpression; the first of them that a
+call evaluates keeps its value in the environment of the call, the
+others read it:
+
+- in a slot that is added to the Frame of a function that went through
+  'resolver', so the pass runs after 'resolve'
+- under a name that no identifier can have in the Environment of the
+  call of a function that did not
+
+The first evaluated occurrence is evaluated where it was, so an error
+or an exception happens at the same point as before, and an occurrence
+in a branch that is not taken is skipped as before. A value of None,
+from an index out of range, is not kept, it is computed again.
+
+Pure are identifiers, literals, prefix and infix operators, indexes, and
+calls of 'len', the builtins take precedence over bindings. The top
+level is left as it is, its Environment lives on after the program.
+
+The 'closure_compiler' keeps the values the same way, the 'vm' and the
+'transpiler' compute a common expression at every occurrence, which
+gives the same value.
+"""
+from __future__ import annotations
+from src import ast
+from src.evaluator import BUILTINS
+from src.ast import NODE, NODES, SCHEMAS, children
+from typing import Any, Hashable
+
+# the builtins that compute a value from their arguments only
+PURE_BUILTINS = {"len"}
+# the pure expressions that are worth keeping, not identifiers and literals
+COMMON_EXPRESSIONS = (
+    ast.PrefixExpression,
+    ast.InfixExpression,
+    ast.IndexExpression,
+    ast.CallExpression,
+)
+# where the value of a common expression is kept, in an Environment
+PLACE_PREFIX = "$common"
+
+# an occurrence is a node with the parent and the field it is in, and the
+# index in the field for a list
+Occurrence = tuple[Any, Any, str, int | None]
+
+
+def eliminate(program: ast.Program) -> ast.Program:
+    """
+    Wrap the repeated pure expressions of every function, in place.
+    Returns the program.
+    """
+    places = 0
+    stack: list[Any] = [program]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if type(node) is ast.FunctionLiteral and node.body is not None:
+            for occurrences in common_expressions(node.body):
+                places = share(node.body, occurrences, places)
+        stack.extend(children(node))
+    return program
+
+
+def share(body: ast.BlockStatement, occurrences: list[Occurrence], places: int) -> int:
+    """
+    Wrap the occurrences of one expression in a CommonExpression with a
+    new place. Returns the number of places in Environments so far.
+    """
+    scope = getattr(body, "scope", None)
+    if scope is not None:
+        place = scope.new_slot()
+    else:
+        place = f"{PLACE_PREFIX}{places}"
+        places += 1
+    for node, parent, name, index in occurrences:
+        common = ast.CommonExpression(token=node.token, expression=node, place=place)
+        if index is None:
+            setattr(parent, name, common)
+        else:
+            getattr(parent, name)[index] = common
+    return places
+
+
+def common_expressions(body: ast.BlockStatement) -> list[list[Occurrence]]:
+    """
+    The pure expressions that occur more than once in a function body,
+    with the same values of their variables, without those in the
+    functions inside it.
+    """
+    versions: dict[str, int] = {}
+    keys: dict[int, Hashable | None] = {}
+    groups: dict[Hashable, list[Occurrence]] = {}
+    # nodes in the order they are evaluated, with where they are, and the
+    # name of a let statement once its value is evaluated
+    stack: list[Any] = [(body, None, "", None)]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            versions[item] = versions.get(item, 0) + 1
+            continue
+        node, parent, name, index = item
+        if node is None or type(node) is ast.FunctionLiteral:
+            continue
+        if type(node) in COMMON_EXPRESSIONS:
+            key = pure_key(node, versions, keys)
+            if key is not None:
+                groups.setdefault(key, []).append(item)
+        if type(node) is ast.LetStatement and node.name is not None:
+            stack.append(node.name.value)
+        children = []
+        for field_name, kind in SCHEMAS[type(node)]:
+            value = getattr(node, field_name)
+            if kind == NODE:
+                children.append((value, node, field_name, None))
+            elif kind == NODES and value is not None:
+                children.extend(
+                    (child, node, field_name, position)
+                    for position, child in enumerate(value)
+                )
+        stack.extend(reversed(children))
+    return [occurrences for occurrences in groups.values() if len(occurrences) > 1]
+
+
+def pure_key(
+    node: Any, versions: dict[str, int], keys: dict[int, Hashable | None]
+) -> Hashable | None:
+    """
+    A key that is equal for equal pure expressions whose variables have
+    the same values, None when the expression is not pure. The keys of
+    the nodes below it are kept in 'keys', by id, without recursion.
+    """
+    stack: list[tuple[Any, bool]] = [(node, False)]
+    while stack:
+        current, children_done = stack.pop()
+        if id(current) in keys:
+            continue
+        children = pure_children(current)
+        if children is None:
+            keys[id(current)] = None
+            continue
+        if not children_done:
+            stack.append((current, True))
+            stack.extend((child, False) for child in children)
+            continue
+        child_keys = tuple(keys[id(child)] for child in children)
+        if None in child_keys:
+            keys[id(current)] = None
+            continue
+        match type(current):
+            case ast.Identifier:
+                value = current.value
+                key: Hashable = ("identifier", value, versions.get(value, 0))
+            case ast.IntegerLiteral | ast.StringLiteral | ast.Boolean:
+                key = (type(current.value), current.value)
+            case ast.PrefixExpression | ast.InfixExpression:
+                key = (current.operator, child_keys)
+            case _:
+                key = (type(current), child_keys)
+        keys[id(current)] = key
+    return keys[id(node)]
+
+
+def pure_children(node: Any) -> list[Any] | None:
+    """
+    The sub expressions of a pure expression, None for any other node.
+    """
+    match type(node):
+        case ast.Identifier | ast.IntegerLiteral | ast.StringLiteral | ast.Boolean:
+            return []
+        case ast.PrefixExpression:
+            return [node.right]
+        case ast.InfixExpression:
+            return [node.left, node.right]
+        case ast.IndexExpression:
+            return [node.left, node.index]
+        case ast.CallExpression:
+            function = node.function
+            if (
+                type(function) is ast.Identifier
+                and function.value in PURE_BUILTINS
+                and function.value in BUILTINS
+                and node.arguments is not None
+            ):
+                return [function] + node.arguments
+    return None
@@ -0,0 +1,241 @@
+"""
+Compile an ast.Program into a bytecode chunk that can be run by the 'vm'.
+
+The compiler mirrors the behavior of 'evaluator.eval':
+- a block evaluates to the value of its last statement
+- 'return' leaves the innermost block with the returned value
+- errors are values that the instructions pass on, the program halts
+  when a top level statement results in an error
+- an error in an operand, a callee, an argument or an element skips the
+  operands after it, like the early returns of 'eval'
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from src import ast
+from src import object
+from src.chunk import Chunk, OpCode
+from src.evaluator import BUILTINS, TRUE, FALSE
+
+INFIX_OPCODES: dict[str, OpCode] = {
+    "+": OpCode.ADD,
+    "-": OpCode.SUBTRACT,
+    "*": OpCode.MULTIPLY,
+    "/": OpCode.DIVIDE,
+    "<": OpCode.LESS,
+    ">": OpCode.GREATER,
+    "==": OpCode.EQUAL,
+    "!=": OpCode.NOT_EQUAL,
+}
+
+PREFIX_OPCODES: dict[str, OpCode] = {
+    "-": OpCode.NEGATE,
+    "!": OpCode.BANG,
+}
+
+
+@dataclass
+class FunctionPrototype:
+    """
+    Constant that describes a compiled function literal. The 'vm' turns it
+    into an object.CompiledFunction by pairing it with an environment.
+    """
+
+    parameters: list[ast.Identifier]
+    body: ast.BlockStatement
+    chunk: Chunk
+
+    def __str__(self) -> str:
+        return f"<fn({', '.join(str(p.value) for p in self.parameters)})>"
+
+
+class CompileError(Exception):
+    pass
+
+
+class Compiler:
+    def __init__(self, chunk: Chunk):
+        self.chunk = chunk
+        # offsets of the 'EXIT_BLOCK' operands that target the end of the
+        # block that is currently being compiled
+        self.block_exits: list[list[int]] = []
+
+    @staticmethod
+    def new() -> Compiler:
+        return Compiler(chunk=Chunk())
+
+    def compile_program(self, program: ast.Program) -> Chunk:
+        """
+        Compile the top level statements of a program.
+
+        The value of a top level statement is discarded unless it is an
+        error, in which case the program halts with that error.
+        """
+        halts: list[int] = []
+        self.block_exits.append(halts)
+        statements = program.statements
+        if not statements:
+            self.emit_constant(None)
+        for idx, statement in enumerate(statements):
+            self.compile_statement(statement)
+            if idx < len(statements) - 1:
+                halts.append(self.chunk.write(OpCode.POP_OR_HALT, 0))
+        self.block_exits.pop()
+        end = len(self.chunk.code)
+        for offset in halts:
+            self.chunk.patch(offset, end)
+        self.chunk.write(OpCode.RETURN)
+        return self.chunk
+
+    def compile_block(self, block: ast.BlockStatement | None) -> None:
+        """
+        Compile a block so that it leaves the value of its last statement,
+        or the value of a 'return' statement, on the stack.
+        """
+        statements = block.statements if block is not None else []
+        if not statements:
+            self.emit_constant(None)
+            return
+        exits: list[int] = []
+        self.block_exits.append(exits)
+        for idx, statement in enumerate(statements):
+            self.compile_statement(statement)
+            if idx < len(statements) - 1:
+                self.chunk.write(OpCode.POP)
+        self.block_exits.pop()
+        end = len(self.chunk.code)
+        for offset in exits:
+            self.chunk.patch(offset, end)
+
+    def compile_statement(self, node: ast.Statement) -> None:
+        match type(node):
+            case ast.LetStatement:
+                self.compile_expression(node.value)
+                self.chunk.write(OpCode.DEFINE, self.name_constant(node.name.value))
+            case ast.ReturnStatement:
+                self.compile_expression(node.return_value)
+                self.block_exits[-1].append(self.chunk.write(OpCode.EXIT_BLOCK, 0))
+            case ast.ExpressionStatement:
+                self.compile_expression(node.expression)
+            case _:
+                self.compile_expression(node)
+
+    def compile_expression(self, node: ast.Expression | None) -> None:
+        match type(node):
+            case ast.IntegerLiteral:
+                self.emit_constant(
+                    object.Integer(value=node.value), key=(int, node.value)
+                )
+            case ast.StringLiteral:
+                self.emit_constant(
+                    object.String(value=node.value), key=(str, node.value)
+                )
+            case ast.Boolean:
+                self.emit_constant(TRUE if node.value else FALSE)
+            case ast.Identifier:
+                builtin = BUILTINS.get(node.value)
+                if builtin is not None:
+                    self.emit_constant(builtin)
+                else:
+                    self.chunk.write(OpCode.GET_NAME, self.name_constant(node.value))
+            case ast.PrefixExpression:
+                opcode = PREFIX_OPCODES.get(node.operator)
+                if opcode is None:
+                    raise CompileError(f"unknown prefix operator: {node.operator}")
+                self.compile_expression(node.right)
+                self.chunk.write(opcode)
+            case ast.InfixExpression:
+                opcode = INFIX_OPCODES.get(node.operator)
+                if opcode is None:
+                    raise CompileError(f"unknown infix operator: {node.operator}")
+                self.compile_expression(node.left)
+                skip = self.jump_if_error(0)
+                self.compile_expression(node.right)
+                self.chunk.write(opcode)
+                self.patch_jumps([skip])
+            case ast.IfExpression:
+                self.compile_if_expression(node)
+            case ast.BlockStatement:
+                self.compile_block(node)
+            case ast.FunctionLiteral:
+                self.compile_function_literal(node)
+            case ast.CallExpression:
+                self.compile_expression(node.function)
+                skips = [self.jump_if_error(0)]
+                for idx, argument in enumerate(node.arguments):
+                    self.compile_expression(argument)
+                    skips.append(self.jump_if_error(idx + 1))
+                self.chunk.write(OpCode.CALL, len(node.arguments))
+                self.patch_jumps(skips)
+            case ast.ArrayLiteral:
+                skips = []
+                for idx, element in enumerate(node.elements):
+                    self.compile_expression(element)
+                    skips.append(self.jump_if_error(idx))
+                self.chunk.write(OpCode.ARRAY, len(node.elements))
+                self.patch_jumps(skips)
+            case ast.IndexExpression:
+                self.compile_expression(node.left)
+                skip = self.jump_if_error(0)
+                self.compile_expression(node.index)
+                self.chunk.write(OpCode.INDEX)
+                self.patch_jumps([skip])
+            case ast.CommonExpression:
+                # the expression is pure, the vm computes it at every use
+                self.compile_expression(node.expression)
+            case _:
+                if node is not None:
+                    raise CompileError(f"cannot compile {type(node).__name__}")
+                # missing nodes, left behind by parse errors, evaluate to None
+                self.emit_constant(None)
+
+    def compile_if_expression(self, node: ast.IfExpression) -> None:
+        self.compile_expression(node.condition)
+        jump_if_false = self.chunk.write(OpCode.JUMP_IF_FALSE, 0, 0)
+        self.compile_block(node.consequence)
+        jump = self.chunk.write(OpCode.JUMP, 0)
+        self.chunk.patch(jump_if_false, len(self.chunk.code))
+        if node.alternative is not None:
+            self.compile_block(node.alternative)
+        else:
+            self.emit_constant(None)
+        end = len(self.chunk.code)
+        self.chunk.patch(jump_if_false + 1, end)
+        self.chunk.patch(jump, end)
+
+    def compile_function_literal(self, node: ast.FunctionLiteral) -> None:
+        function_compiler = Compiler.new()
+        function_compiler.compile_block(node.body)
+        function_compiler.chunk.write(OpCode.RETURN)
+        prototype = FunctionPrototype(
+            parameters=node.parameters,
+            body=node.body,
+            chunk=function_compiler.chunk,
+        )
+        self.chunk.write(OpCode.CLOSURE, self.chunk.add_constant(prototype))
+
+    def jump_if_error(self, depth: int) -> int:
+        """
+        Skip to a target that is patched in later when the value on top of
+        the stack is an error, dropping the 'depth' values below it.
+        """
+        return self.chunk.write(OpCode.JUMP_IF_ERROR, 0, depth)
+
+    def patch_jumps(self, offsets: list[int]) -> None:
+        end = len(self.chunk.code)
+        for offset in offsets:
+            self.chunk.patch(offset, end)
+
+    def emit_constant(self, value: object.Object | None, key=None) -> None:
+        if key is None:
+            key = ("none",) if value is None else id(value)
+        self.chunk.write(OpCode.CONSTANT, self.chunk.add_constant(value, key=key))
+
+    def name_constant(self, name: str) -> int:
+        return self.chunk.add_constant(name, key=("name", name))
+
+
+def compile_program(program: ast.Program) -> Chunk:
+    """
+    Compile a program into a new chunk.
+    """
+    return Compiler.new().compile_program(program)
@@ -0,0 +1,48 @@
+"""
+Make the runtime objects of the literals of a program once.
+
+The evaluator turns an integer, string or boolean literal into an
+object.* value every time it visits it, also in the body of a function
+that is called in a loop. 'attach_constants' makes the value of every
+literal up front and sets it on the node (ast.IntegerLiteral.constant
+and the like), so evaluating a literal is reading that attribute.
+
+Equal literals share one object, as the objects are never changed. The
+pool is keyed by the type and the value of the literal, so 1 and true
+stay apart.
+"""
+from __future__ import annotations
+from src import ast
+from src import object
+from src.escape_analysis import nodes
+from src.evaluator import native_bool_to_boolean_object
+from typing import Any, Callable
+
+Pool = dict[tuple[type, Any], object.Object]
+
+CONSTANTS: dict[type, Callable[[Any], object.Object]] = {
+    ast.IntegerLiteral: object.new_integer,
+    ast.StringLiteral: object.new_string,
+    ast.Boolean: native_bool_to_boolean_object,
+}
+
+
+def attach_constants(program: ast.Program, pool: Pool | None = None) -> Pool:
+    """
+    Set the runtime object of every literal in the program, in place.
+    Returns the pool, which can be passed on to the next program so that
+    programs evaluated in one environment share their constants.
+    """
+    if pool is None:
+        pool = {}
+    for node in nodes(program):
+        constant = CONSTANTS.get(type(node))
+        if constant is None:
+            continue
+        key = (type(node.value), node.value)
+        value = pool.get(key)
+        if value is None:
+            value = constant(node.value)
+            pool[key] = value
+        node.constant = value
+    return pool
@@ -0,0 +1,60 @@
+"""
+Find the functions whose environment can not outlive a call.
+
+The object.Frame of a call of a function that went through 'resolver' is
+only referenced by the evaluator while the call runs, closures made during
+the call capture cells, not the frame. A function without function
+literals in its body makes no closures and has no cells, so its frame is
+garbage when the call returns. The evaluator keeps the frames of such
+leaf functions on a free list in the body of the function and reuses them
+for the next call, instead of allocating a frame and its slots for every
+call.
+
+The Environment of a function that did not go through the resolver is
+not reused: its dict would have to be emptied, which frees its table, so
+the next call would allocate it again anyway.
+"""
+from __future__ import annotations
+from src import ast
+from src.ast import children
+from typing import Any, Iterator
+
+# the number of free frames a function keeps, the depth of the recursion
+# the free list covers
+MAX_FREE_FRAMES = 16
+
+
+def nodes(node: Any) -> Iterator[Any]:
+    """
+    Yield a node and all nodes below it, without recursion.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        yield node
+        stack.extend(children(node))
+
+
+def escapes(function: ast.FunctionLiteral) -> bool:
+    """
+    Whether the environment of a call of the function can be captured by a
+    closure made during the call.
+    """
+    return any(type(node) is ast.FunctionLiteral for node in nodes(function.body))
+
+
+def analyze(program: ast.Program) -> ast.Program:
+    """
+    Give the body of every function whose frame does not escape a call a
+    free list of frames, in place. Returns the program.
+    """
+    for node in nodes(program):
+        if type(node) is not ast.FunctionLiteral or node.body is None:
+            continue
+        if escapes(node):
+            node.body.frames = None
+        elif node.body.frames is None:
+            node.body.frames = []
+    return program
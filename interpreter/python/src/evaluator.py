@@ -4,7 +4,8 @@ from src import lexer
 from src import token
 from src import object
 from src import builtins
-from typing import Any
+from src.escape_analysis import MAX_FREE_FRAMES
+from typing import Any, Iterable, Iterator
 import logging
 import pdb
 
@@ -29,7 +30,7 @@ def eval(node: ast.Node, env: object.Environment) -> Any:
             val = eval(node.value, env)
             if is_error(val):
                 return val
-            env.set(name=node.name.value, val=val)
+            set_variable(node.name, val, env)
 
         # expression
         case ast.ExpressionStatement:
@@ -51,10 +52,16 @@ def eval(node: ast.Node, env: object.Environment) -> Any:
                 return right
             return eval_infix_expression(node.operator, left, right)
         case ast.IntegerLiteral:
-            return object.Integer(value=node.value)
+            if node.constant is not None:
+                return node.constant
+            return object.new_integer(node.value)
         case ast.StringLiteral:
-            return object.String(value=node.value)
+            if node.constant is not None:
+                return node.constant
+            return object.new_string(node.value)
         case ast.Boolean:
+            if node.constant is not None:
+                return node.constant
             return native_bool_to_boolean_object(node.value)
         case ast.BlockStatement:
             return eval_statements(node.statements, env)
@@ -66,6 +73,8 @@ def eval(node: ast.Node, env: object.Environment) -> Any:
                 return val
             return object.ReturnValue(value=val)
         case ast.Identifier:
+            if node.address is not None:
+                return eval_resolved_identifier(node, env)
             return eval_identifier(node, env)
         case ast.CallExpression:
             import pdb
@@ -81,10 +90,14 @@ def eval(node: ast.Node, env: object.Environment) -> Any:
             if len(eval_expr_result) == 1 and is_error(eval_expr_result[0]):
                 return eval_expr_result[0]
 
+            if node.tail:
+                return object.TailCall(function=func, arguments=eval_expr_result)
             return apply_function(func, eval_expr_result)
         case ast.FunctionLiteral:
             parameters = node.parameters
             body = node.body
+            if getattr(body, "scope", None) is not None:
+                return new_closure(node, env)
             return object.Function(parameters=parameters, env=env, body=body)
         case ast.ArrayLiteral:
             elements = eval_expressions(node.elements, env)
@@ -100,10 +113,54 @@ def eval(node: ast.Node, env: object.Environment) -> Any:
                 return index
 
             return eval_index_expression(left, index)
+        case ast.CommonExpression:
+            val = common_value(node, env)
+            if val is None:
+                val = eval(node.expression, env)
+                set_common_value(node, env, val)
+            return val
 
     return None
 
 
+def set_variable(
+    name: ast.Identifier, val: object.Object, env: object.Environment | object.Frame
+) -> None:
+    """
+    Bind the name of a let statement, at the place 'resolver' gave it.
+    """
+    address = name.address
+    if address is None or address[0][0] == object.GLOBAL:
+        env.set(name=name.value, val=val)
+    elif address[0][0] == object.LOCAL:
+        env.slots[address[0][1]] = val
+    else:
+        env.cells[address[0][1]].value = val
+
+
+def common_value(
+    node: ast.CommonExpression, env: object.Environment | object.Frame
+) -> object.Object | None:
+    """
+    The value of a common expression in this call, None until the first
+    of its occurrences is evaluated.
+    """
+    if type(env) is object.Frame:
+        return env.slots[node.place]
+    return env.store.get(node.place)
+
+
+def set_common_value(
+    node: ast.CommonExpression,
+    env: object.Environment | object.Frame,
+    val: object.Object | None,
+) -> None:
+    if type(env) is object.Frame:
+        env.slots[node.place] = val
+    else:
+        env.store[node.place] = val
+
+
 def eval_program(program: ast.Program, env: object.Environment) -> object.Object:
     """
     Main function to evaluate a program.
@@ -112,17 +169,48 @@ def eval_program(program: ast.Program, env: object.Environment) -> object.Object
     function, one at a time.
     """
     result: object.Object
-    for statement in program.statements:
+    for result in eval_each(program.statements, env):
+        pass
+    return result
+
+
+def eval_each(
+    statements: Iterable[ast.Statement], env: object.Environment
+) -> Iterator[object.Object]:
+    """
+    Evaluate top-level statements as they come in and yield the result of
+    every statement. Stops after a return statement, yielding the returned
+    value, or after an error.
+
+    With 'Parser.parse_statements' as the statements, every statement is
+    evaluated right after it is parsed and is released before the next one
+    is parsed.
+    """
+    for statement in statements:
         result = eval(statement, env)
+        del statement
         result_type = type(result)
         LOGGER.info(f"result_type: {result_type}")
         LOGGER.info(f"result: {result}")
         # print(f"result_type: {result_type}")
         if result_type == object.ReturnValue:
-            return result.value
-        elif result_type == object.Error:
-            return result
+            yield result.value
+            return
+        yield result
+        if result_type == object.Error:
+            return
+
 
+def eval_stream(
+    statements: Iterable[ast.Statement], env: object.Environment
+) -> object.Object | None:
+    """
+    'eval_program' for a stream of statements, returns the result of the
+    last statement or None when there are none.
+    """
+    result = None
+    for result in eval_each(statements, env):
+        pass
     return result
 
 
@@ -186,7 +274,7 @@ def eval_minus_prefix_operator_expression(right: object.Object) -> object.Object
     if right.object_type() != object.Type.INTEGER_OBJ:
         return new_error(f"unknown operator: -{right.object_type()}")
     value = right.value
-    return object.Integer(value=-value)
+    return object.new_integer(-value)
 
 
 def eval_bang_operator_expression(right: object.Object) -> object.Object:
@@ -241,13 +329,13 @@ def eval_integer_infix_expression(
     right_value = right.value
     match operator:
         case "+":
-            return object.Integer(value=left_value + right_value)
+            return object.new_integer(left_value + right_value)
         case "-":
-            return object.Integer(value=left_value - right_value)
+            return object.new_integer(left_value - right_value)
         case "*":
-            return object.Integer(value=left_value * right_value)
+            return object.new_integer(left_value * right_value)
         case "/":
-            return object.Integer(value=left_value / right_value)
+            return object.new_integer(left_value / right_value)
         case "<":
             return native_bool_to_boolean_object(left_value < right_value)
         case ">":
@@ -295,7 +383,15 @@ def new_error(format: str, *arg: Any) -> object.Error:
     return object.Error(message=f"{error_message}")
 
 
+def not_a_function_error(function: object.Object | None) -> object.Error:
+    if function is None:
+        return new_error("not a function: None")
+    return new_error(f"not a function: {function.object_type()}")
+
+
 def eval_identifier(node: ast.Identifier, env: object.Environment) -> object.Object:
+    if node.address is not None:
+        return eval_resolved_identifier(node, env)
     val = env.get(name=node.value)
 
     builtin = BUILTINS.get(node.value)
@@ -309,6 +405,48 @@ def eval_identifier(node: ast.Identifier, env: object.Environment) -> object.Obj
     return val
 
 
+def eval_resolved_identifier(
+    node: ast.Identifier, env: object.Environment | object.Frame
+) -> object.Object:
+    """
+    'eval_identifier' for an identifier with an address from 'resolver':
+    a builtin, or the places the name can be bound in.
+    """
+    address = node.address
+    if type(address) is object.Builtin:
+        return address
+    for kind, index in address:
+        if kind == object.LOCAL:
+            val = env.slots[index]
+        elif kind == object.CELL:
+            val = env.cells[index].value
+        elif type(env) is object.Frame:
+            val = env.globals.get(name=node.value)
+        else:
+            val = env.get(name=node.value)
+        if val is not None:
+            return val
+    return new_error(f"identifier not found: {node.value}")
+
+
+def new_closure(
+    node: ast.FunctionLiteral, env: object.Environment | object.Frame
+) -> object.Function:
+    """
+    A function that went through 'resolver' captures only the cells of the
+    variables around it that it uses, and the Environment of the top level.
+    """
+    if type(env) is object.Frame:
+        cells = env.cells
+        captured = tuple(cells[index] for index in node.body.scope.captures)
+        env = env.globals
+    else:
+        captured = ()
+    return object.Function(
+        parameters=node.parameters, env=env, body=node.body, cells=captured
+    )
+
+
 def eval_expressions(
     exps: list[ast.Expression], env: object.Environment
 ) -> list[object.Object]:
@@ -325,26 +463,68 @@ def eval_expressions(
 
 
 def apply_function(fn: object.Object, args: list[object.Object]) -> object.Object:
-    LOGGER.info("execuring apply_function")
-    print("execuring apply_function")
-
-    # pdb.set_trace()
+    """
+    Call a function. A call that 'tail_calls' marked evaluates to a
+    TailCall, which is run by the next iteration of the loop, after the
+    environment of the call it ended is released.
+    """
     func = fn
+    while True:
+        LOGGER.info("execuring apply_function")
+        print("execuring apply_function")
 
-    if type(func) == object.Builtin:
         # pdb.set_trace()
-        return func.fn(*args)
-    extended_env = extended_function_env(func, args)
-    evaluated = eval(func.body, extended_env)
-    return unwrap_return_value(evaluated)
+        if type(func) == object.Builtin:
+            # pdb.set_trace()
+            return func.fn(*args)
+        extended_env = extended_function_env(func, args)
+        evaluated = eval(func.body, extended_env)
+        release_function_env(func, extended_env)
+        if type(evaluated) is not object.TailCall:
+            return unwrap_return_value(evaluated)
+        func = evaluated.function
+        args = evaluated.arguments
 
 
 def extended_function_env(
     func: object.Function, args: list[object.Object]
-) -> object.Environment:
+) -> object.Environment | object.Frame:
     import pdb
 
     # pdb.set_trace()
+    body = func.body
+    scope = getattr(body, "scope", None)
+    if scope is not None:
+        # a function that went through 'resolver', the frames of functions
+        # that 'escape_analysis' found to not escape a call are reused
+        frames = body.frames
+        padding = scope.padding
+        if padding is not None and len(args) == len(scope.parameters):
+            # the arguments are the first slots and there are no cells
+            if frames:
+                frame = frames.pop()
+                frame.slots[: len(args)] = args
+                frame.globals = func.env
+                return frame
+            return object.Frame(slots=args + padding, cells=(), globals=func.env)
+        if frames:
+            frame = frames.pop()
+            frame.cells = func.cells
+            frame.globals = func.env
+        else:
+            cells = func.cells
+            if scope.celled:
+                cells += tuple(object.Cell() for _ in scope.celled)
+            frame = object.Frame(
+                slots=[None] * scope.slots, cells=cells, globals=func.env
+            )
+        for idx, (kind, index) in enumerate(scope.parameter_places):
+            if kind == object.LOCAL:
+                frame.slots[index] = args[idx]
+            else:
+                frame.cells[index].value = args[idx]
+        return frame
+
     env = object.new_enclosed_environment(func.env)
     for idx, param in enumerate(func.parameters):
         env.set(param.value, args[idx])
@@ -352,6 +532,25 @@ def extended_function_env(
     return env
 
 
+def release_function_env(
+    func: object.Function, env: object.Environment | object.Frame
+) -> None:
+    """
+    Put the Frame of a call that returned on the free list of the function,
+    if 'escape_analysis' gave it one. The frame is emptied first, so it
+    does not keep its values alive.
+    """
+    frames = getattr(func.body, "frames", None)
+    if frames is None or type(env) is not object.Frame:
+        return
+    if len(frames) >= MAX_FREE_FRAMES:
+        return
+    slots = env.slots
+    slots[:] = [None] * len(slots)
+    env.cells = ()
+    frames.append(env)
+
+
 def unwrap_return_value(obj: object.Object) -> object.Object:
     import pdb
 
@@ -371,7 +570,7 @@ def eval_string_infix_expression(
         return new_error(
             f"unknown operator: {left.object_type()} {operator} {right.object_type()}"
         )
-    return object.String(value=left.value + right.value)
+    return object.new_string(left.value + right.value)
 
 
 def builtin_len(*args):
@@ -379,9 +578,9 @@ def builtin_len(*args):
         return new_error(f"wrong number of arguments. got = {len(args)}, want = 1")
     arg_type = type(args[0])
     if arg_type == object.String:
-        return object.Integer(value=int(len(args[0].value)))
+        return object.new_integer(int(len(args[0].value)))
     elif arg_type == object.Array:
-        return object.Integer(value=int(len(args[0].elements)))
+        return object.new_integer(int(len(args[0].elements)))
     else:
         return new_error(f"argument to 'len' not supported, got {arg_type}")
 
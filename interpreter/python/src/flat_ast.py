@@ -0,0 +1,401 @@
+"""
+A flat, struct-of-arrays form of the ast.
+
+Every node is an index into parallel arrays, the nodes are stored in
+postorder so the root, the Program, is the last node:
+
+kinds:    the index of the node class in 'NODE_CLASSES'
+tokens:   the TokenCode of the token of the node, NO_TOKEN for the Program
+literals: the index of the token literal in the string table, or -1
+values:   the scalar field of the node, if the class has one: an index in
+          the string table for names and strings, an index in the constant
+          table for integers, or -1 minus the index of the digits in the
+          string table for integers that do not fit in 64 bits, the
+          TokenCode of an operator, 0 and 1, or the place of a common
+          expression
+starts:   the start of the children of the node in 'children', the
+          children of node i are children[starts[i]:starts[i + 1]]
+children: for every node field the index of the child or -1 for None,
+          for every list field its length or -1 for None, followed by the
+          indexes of the items
+
+The arrays and tables are written to a single file that 'FlatProgram.load'
+maps into memory, the arrays are then memoryviews on the mapped file and
+nothing is deserialized until a node is read.
+"""
+from __future__ import annotations
+from array import array
+from src import ast
+from src import token
+from src.lexer import OPERATOR_CODES
+from src.ast import NODE, NODES, SCALAR, SCHEMAS
+from src.parse_cache import NODE_CLASSES, CLASS_INDEX
+from typing import Any, Iterator
+import mmap
+import struct
+
+MAGIC = b"MONKEYFA"
+HEADER = struct.Struct("<8sQQQQ")  # magic, nodes, children, constants, strings
+NO_TOKEN = 255
+# the range of the constant table, larger integers are stored as digits
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+OPERATORS: dict[int, str] = {
+    code: operator for operator, code in OPERATOR_CODES.items()
+}
+
+# the kind of the scalar field of every node class, if it has one
+STRING_VALUE = 1
+CONSTANT_VALUE = 2
+OPERATOR_VALUE = 3
+BOOLEAN_VALUE = 4
+# a slot as it is, -1 for None, and a name as -2 minus its string index
+PLACE_VALUE = 5
+VALUE_KINDS: dict[type, int] = {
+    ast.Identifier: STRING_VALUE,
+    ast.StringLiteral: STRING_VALUE,
+    ast.IntegerLiteral: CONSTANT_VALUE,
+    ast.PrefixExpression: OPERATOR_VALUE,
+    ast.InfixExpression: OPERATOR_VALUE,
+    ast.Boolean: BOOLEAN_VALUE,
+    ast.CommonExpression: PLACE_VALUE,
+}
+# the kinds of the child fields of every node class, by class index
+CHILD_KINDS: list[tuple[int, ...]] = [
+    tuple(kind for _, kind in SCHEMAS[cls] if kind != SCALAR) for cls in NODE_CLASSES
+]
+
+
+def aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class FlatProgram:
+    """
+    The columns of a flat ast, see the module docstring. The string table
+    is UTF-8 encoded in 'string_data', string i is the bytes from
+    string_offsets[i] up to string_offsets[i + 1].
+    """
+
+    def __init__(
+        self,
+        kinds: Any,
+        tokens: Any,
+        literals: Any,
+        values: Any,
+        starts: Any,
+        children: Any,
+        constants: Any,
+        string_offsets: Any,
+        string_data: Any,
+    ):
+        self.kinds = kinds
+        self.tokens = tokens
+        self.literals = literals
+        self.values = values
+        self.starts = starts
+        self.children = children
+        self.constants = constants
+        self.string_offsets = string_offsets
+        self.string_data = string_data
+        self.mapped: mmap.mmap | None = None
+
+    @staticmethod
+    def from_program(program: ast.Program) -> FlatProgram:
+        """
+        Flatten an ast, without recursion.
+        """
+        kinds = array("B")
+        tokens = array("B")
+        literals = array("i")
+        values = array("i")
+        starts = array("I")
+        children = array("i")
+        constants = array("q")
+        constant_index: dict[int, int] = {}
+        strings: dict[str, int] = {}
+
+        def string(value: str | None) -> int:
+            if value is None:
+                return -1
+            return strings.setdefault(value, len(strings))
+
+        # the indexes of the flattened nodes whose parent is not flattened
+        # yet, -1 for None, in field order
+        done: list[int] = []
+        stack: list[tuple[Any, bool]] = [(program, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if node is None:
+                done.append(-1)
+                continue
+            schema = SCHEMAS[type(node)]
+            if not children_done:
+                stack.append((node, True))
+                for name, kind in reversed(schema):
+                    value = getattr(node, name)
+                    if kind == NODE:
+                        stack.append((value, False))
+                    elif kind == NODES and value is not None:
+                        stack.extend((item, False) for item in reversed(value))
+                continue
+
+            starts.append(len(children))
+            count = 0
+            for name, kind in schema:
+                if kind == NODE:
+                    count += 1
+                elif kind == NODES:
+                    value = getattr(node, name)
+                    count += 0 if value is None else len(value)
+            position = len(done) - count
+            for name, kind in schema:
+                if kind == NODE:
+                    children.append(done[position])
+                    position += 1
+                elif kind == NODES:
+                    value = getattr(node, name)
+                    if value is None:
+                        children.append(-1)
+                        continue
+                    children.append(len(value))
+                    children.extend(done[position : position + len(value)])
+                    position += len(value)
+            del done[len(done) - count :]
+
+            cls = type(node)
+            value_kind = VALUE_KINDS.get(cls)
+            value = 0
+            if value_kind == STRING_VALUE:
+                value = string(node.value)
+            elif value_kind == CONSTANT_VALUE:
+                if not INT64_MIN <= node.value <= INT64_MAX:
+                    value = -1 - string(str(node.value))
+                else:
+                    if node.value not in constant_index:
+                        constant_index[node.value] = len(constants)
+                        constants.append(node.value)
+                    value = constant_index[node.value]
+            elif value_kind == OPERATOR_VALUE:
+                value = OPERATOR_CODES[node.operator]
+            elif value_kind == BOOLEAN_VALUE:
+                value = int(node.value)
+            elif value_kind == PLACE_VALUE:
+                place = node.place
+                if type(place) is int:
+                    value = place
+                else:
+                    value = -1 if place is None else -2 - string(place)
+
+            tok = getattr(node, "token", None)
+            kinds.append(CLASS_INDEX[cls])
+            tokens.append(NO_TOKEN if tok is None else tok.code)
+            literals.append(-1 if tok is None else string(tok.Literal))
+            values.append(value)
+            done.append(len(kinds) - 1)
+        starts.append(len(children))
+
+        string_offsets = array("I", [0])
+        string_data = bytearray()
+        for value in strings:
+            string_data += value.encode("utf-8", "surrogatepass")
+            string_offsets.append(len(string_data))
+        return FlatProgram(
+            kinds,
+            tokens,
+            literals,
+            values,
+            starts,
+            children,
+            constants,
+            string_offsets,
+            bytes(string_data),
+        )
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> int:
+        return len(self.kinds) - 1
+
+    def string(self, index: int) -> str | None:
+        if index < 0:
+            return None
+        start = self.string_offsets[index]
+        end = self.string_offsets[index + 1]
+        return bytes(self.string_data[start:end]).decode("utf-8", "surrogatepass")
+
+    def node_class(self, index: int) -> type:
+        return NODE_CLASSES[self.kinds[index]]
+
+    def token(self, index: int) -> token.Token | None:
+        code = self.tokens[index]
+        if code == NO_TOKEN:
+            return None
+        return token.Token(token.TOKEN_TYPES[code], self.string(self.literals[index]))
+
+    def value(self, index: int) -> Any:
+        """
+        The scalar field of a node, decoded.
+        """
+        value_kind = VALUE_KINDS.get(self.node_class(index))
+        value = self.values[index]
+        if value_kind == STRING_VALUE:
+            return self.string(value)
+        if value_kind == CONSTANT_VALUE:
+            if value < 0:
+                return int(self.string(-1 - value))
+            return self.constants[value]
+        if value_kind == OPERATOR_VALUE:
+            return OPERATORS[value]
+        if value_kind == BOOLEAN_VALUE:
+            return bool(value)
+        if value_kind == PLACE_VALUE:
+            if value >= 0:
+                return value
+            return None if value == -1 else self.string(-2 - value)
+        return None
+
+    def fields(self, index: int) -> dict[str, Any]:
+        """
+        The fields of a node without its token: scalars are decoded, child
+        nodes are given by their index, lists of child nodes as lists of
+        indexes, and None stays None.
+        """
+        children = self.children
+        position = self.starts[index]
+        fields: dict[str, Any] = {}
+        for name, kind in SCHEMAS[self.node_class(index)]:
+            if kind == SCALAR:
+                fields[name] = self.value(index)
+                continue
+            child = children[position]
+            position += 1
+            if kind == NODE:
+                fields[name] = None if child < 0 else child
+            elif child < 0:
+                fields[name] = None
+            else:
+                items = children[position : position + child]
+                fields[name] = [None if item < 0 else item for item in items]
+                position += child
+        return fields
+
+    def child_indexes(self, index: int) -> list[int]:
+        """
+        The indexes of the children of a node, in field order.
+        """
+        children = self.children
+        position = self.starts[index]
+        result = []
+        for kind in CHILD_KINDS[self.kinds[index]]:
+            child = children[position]
+            position += 1
+            if kind == NODE:
+                if child >= 0:
+                    result.append(child)
+            elif child > 0:
+                result.extend(
+                    item for item in children[position : position + child] if item >= 0
+                )
+                position += child
+        return result
+
+    def walk(self, index: int | None = None) -> Iterator[int]:
+        """
+        Yield the indexes of a node and all nodes below it in preorder,
+        without recursion. By default the walk starts at the root.
+        """
+        stack = [self.root if index is None else index]
+        while stack:
+            index = stack.pop()
+            yield index
+            stack.extend(reversed(self.child_indexes(index)))
+
+    def to_program(self) -> ast.Program:
+        """
+        Rebuild the object graph. The nodes are in postorder, so the children
+        of a node are built before the node.
+        """
+        nodes: list[Any] = []
+        for index in range(len(self.kinds)):
+            fields = self.fields(index)
+            for name, kind in SCHEMAS[self.node_class(index)]:
+                value = fields[name]
+                if kind == NODE and value is not None:
+                    fields[name] = nodes[value]
+                elif kind == NODES and value is not None:
+                    fields[name] = [
+                        None if item is None else nodes[item] for item in value
+                    ]
+            cls = self.node_class(index)
+            tok = self.token(index)
+            nodes.append(cls(**fields) if tok is None else cls(token=tok, **fields))
+        return nodes[-1]
+
+    def save(self, path: str) -> None:
+        """
+        Write the flat ast to a single file, every array starts at a
+        multiple of 8 bytes so it can be viewed in place once mapped.
+        """
+        sections = [
+            self.kinds,
+            self.tokens,
+            self.literals,
+            self.values,
+            self.starts,
+            self.children,
+            self.constants,
+            self.string_offsets,
+        ]
+        with open(path, "wb") as f:
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    len(self.kinds),
+                    len(self.children),
+                    len(self.constants),
+                    len(self.string_offsets) - 1,
+                )
+            )
+            for section in sections + [self.string_data]:
+                data = bytes(section)
+                f.write(data)
+                f.write(b"\0" * (aligned(len(data)) - len(data)))
+
+    @staticmethod
+    def load(path: str) -> FlatProgram:
+        """
+        Map a file written by 'save' into memory, the columns are views on
+        the mapped file.
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, nodes, children, constants, strings = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a flat ast file")
+
+        offset = HEADER.size
+        columns = []
+        for typecode, length in [
+            ("B", nodes),
+            ("B", nodes),
+            ("i", nodes),
+            ("i", nodes),
+            ("I", nodes + 1),
+            ("i", children),
+            ("q", constants),
+            ("I", strings + 1),
+        ]:
+            size = length * array(typecode).itemsize
+            columns.append(view[offset : offset + size].cast(typecode))
+            offset += aligned(size)
+        string_offsets = columns[-1]
+        columns.append(view[offset : offset + string_offsets[-1]])
+
+        flat = FlatProgram(*columns)
+        flat.mapped = mapped
+        return flat
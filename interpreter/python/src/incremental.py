@@ -0,0 +1,123 @@
+"""
+Incremental lexing of a source that is edited.
+
+The tokens are kept as (code, start, end) spans in a gap buffer: the
+spans before the gap are stored with their position from the start of
+the source, the spans after the gap with their position from the end of
+the source. An edit does not move the spans before it in the first
+form, nor the spans after it in the second, so only the tokens around
+the edit are lexed again and the gap is moved to the edit.
+"""
+from __future__ import annotations
+from array import array
+from src.lexer import TokenBuffer, match_token, scan_spans, span_literal
+from src.token import CompactToken, TokenCode, TOKEN_CODES
+from typing import Iterator
+
+Span = tuple[int, int, int]
+
+
+class IncrementalLexer:
+    """
+    source_code: the current source
+    head: spans before the gap, positions from the start of the source
+    tail: spans after the gap in reverse order, so the first one after the
+          gap is last, with positions from the end of the source
+    """
+
+    def __init__(self, source_code: str, head: list[Span], tail: list[Span]):
+        self.source_code = source_code
+        self.head = head
+        self.tail = tail
+
+    @staticmethod
+    def new(source_code: str) -> IncrementalLexer:
+        return IncrementalLexer(
+            source_code=source_code, head=list(scan_spans(source_code)), tail=[]
+        )
+
+    def __len__(self) -> int:
+        return len(self.head) + len(self.tail)
+
+    def move_gap(self, offset: int) -> None:
+        """
+        Move the gap to the first span that ends at or after 'offset'.
+
+        The spans before it end before the offset, so an edit at the offset
+        does not change them, not even the char that ended them.
+        """
+        head = self.head
+        tail = self.tail
+        length = len(self.source_code)
+        while head and head[-1][2] >= offset:
+            code, start, end = head.pop()
+            tail.append((code, length - start, length - end))
+        while tail and length - tail[-1][2] < offset:
+            code, start, end = tail.pop()
+            head.append((code, length - start, length - end))
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> tuple[int, int, int]:
+        """
+        Replace 'deleted' chars at 'offset' with 'inserted' and lex again
+        from the first token the edit can change, until the new tokens line
+        up with the old ones after the edit.
+
+        Returns the index of the first changed token, the number of tokens
+        that were removed and the number of tokens that were added.
+        """
+        self.move_gap(offset)
+        source_code = self.source_code
+        source_code = source_code[:offset] + inserted + source_code[offset + deleted :]
+        self.source_code = source_code
+
+        head = self.head
+        tail = self.tail
+        index = len(head)
+        length = len(source_code)
+        edit_end = offset + len(inserted)
+        position = head[-1][2] if head else 0
+        removed = 0
+        while True:
+            tok, start, end = match_token(source_code, position)
+            if tok is None:
+                removed += len(tail)
+                tail.clear()
+                break
+            head.append((TOKEN_CODES[tok.Type], start, end))
+            if end >= edit_end:
+                # old tokens that end at or before this one are replaced,
+                # if one ends at the same place the old tokens line up again
+                from_end = length - end
+                lined_up = False
+                while tail and tail[-1][2] >= from_end:
+                    lined_up = tail.pop()[2] == from_end
+                    removed += 1
+                if lined_up:
+                    break
+            position = end
+        return index, removed, len(head) - index
+
+    def spans(self) -> Iterator[Span]:
+        """
+        Yield the spans of all tokens with positions from the start.
+        """
+        length = len(self.source_code)
+        yield from self.head
+        for code, start, end in reversed(self.tail):
+            yield code, length - start, length - end
+
+    def __iter__(self) -> Iterator[CompactToken]:
+        source_code = self.source_code
+        for code, start, end in self.spans():
+            yield CompactToken(code, span_literal(source_code, code, start, end))
+        yield CompactToken(TokenCode.EOF, None)
+
+    def token_buffer(self) -> TokenBuffer:
+        codes = array("B")
+        starts = array("Q")
+        ends = array("Q")
+        for code, start, end in self.spans():
+            codes.append(code)
+            starts.append(start)
+            ends.append(end)
+        return TokenBuffer(self.source_code, codes, starts, ends)
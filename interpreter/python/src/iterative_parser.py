@@ -0,0 +1,309 @@
+"""
+A Parser that does not recurse.
+
+The Parser descends into sub expressions and blocks with Python calls, so
+deeply nested programs raise a RecursionError. The IterativeParser builds
+the same ast nodes and reports the same errors, but keeps its state on
+explicit stacks:
+
+- chains of infix and prefix operators are parsed shunting-yard style in
+  a single loop, with a stack of operator nodes that still wait for their
+  right operand
+- the other constructs that contain expressions or blocks are written as
+  generators that yield the sub parse they need, the generators are run
+  from a stack by 'run' instead of calling each other
+"""
+from __future__ import annotations
+from src import ast
+from src import lexer
+from src import token
+from src.parser import Parser, Precedence, PRECEDENCES
+from typing import Any, Callable, Generator, Iterable, Iterator
+
+Steps = Generator["Steps", Any, Any]
+
+
+class IterativeParser(Parser):
+    @staticmethod
+    def new(l: lexer.Lexer | Iterable[token.Token]) -> IterativeParser:
+        return IterativeParser(l=l).reset(l)
+
+    @staticmethod
+    def run(steps: Steps) -> Any:
+        """
+        Run a generator to completion. Whenever a generator yields another
+        generator, that one is run first and its result is sent back.
+        """
+        stack = [steps]
+        value = None
+        while stack:
+            try:
+                child = stack[-1].send(value)
+            except StopIteration as stop:
+                stack.pop()
+                value = stop.value
+            else:
+                stack.append(child)
+                value = None
+        return value
+
+    def parse_statements(self) -> Iterator[ast.Statement]:
+        """
+        'Parser.parse_statements' without logging every statement, the repr
+        of a deeply nested statement is recursive.
+        """
+        while self.cur_token.Type != token.TokenTypes.EOF:
+            statement = self.parse_statement()
+            if statement is not None:
+                yield statement
+            del statement
+            self.next_token()
+
+    def parse_statement(self) -> ast.Statement:
+        return self.run(self.statement_steps())
+
+    def parse_expression(self, precedence: Precedence) -> ast.Expression:
+        return self.run(self.expression_steps(precedence))
+
+    def parse_block_statement(self) -> ast.BlockStatement:
+        return self.run(self.block_statement_steps())
+
+    def statement_steps(self) -> Steps:
+        match self.cur_token.Type:
+            case token.TokenTypes.LET:
+                return (yield from self.let_statement_steps())
+            case token.TokenTypes.RETURN:
+                return (yield from self.return_statement_steps())
+            case _:
+                return (yield from self.expression_statement_steps())
+
+    def let_statement_steps(self) -> Steps:
+        statement = ast.LetStatement(token=self.cur_token)
+
+        if not self.expect_peek(token.TokenTypes.IDENT):
+            return None
+
+        statement.name = ast.Identifier(
+            token=self.cur_token, value=self.cur_token.Literal
+        )
+
+        if not self.expect_peek(token.TokenTypes.ASSIGN):
+            return None
+        self.next_token()
+
+        statement.value = yield self.expression_steps(Precedence.LOWEST)
+        if self.peek_token_is(token.TokenTypes.SEMICOLON):
+            self.next_token()
+        return statement
+
+    def return_statement_steps(self) -> Steps:
+        statement = ast.ReturnStatement(token=self.cur_token)
+        self.next_token()
+
+        statement.return_value = yield self.expression_steps(Precedence.LOWEST)
+        if self.peek_token_is(token.TokenTypes.SEMICOLON):
+            self.next_token()
+        return statement
+
+    def expression_statement_steps(self) -> Steps:
+        statement = ast.ExpressionStatement(token=self.cur_token)
+        statement.expression = yield self.expression_steps(Precedence.LOWEST)
+
+        if self.peek_token_is(token.TokenTypes.SEMICOLON):
+            self.next_token()
+
+        return statement
+
+    def expression_steps(self, precedence: Precedence) -> Steps:
+        """
+        'Parser.parse_expression' without recursion for operators.
+
+        Where the Parser calls 'parse_expression' for the right operand of
+        an operator, the operator node is pushed on 'waiting' together with
+        the precedence of the loop it was found in. Once the operand is
+        complete the node is popped, gets the operand as 'right' and
+        becomes the left expression of that loop again.
+        """
+        parse_prefix_expression = Parser.parse_prefix_expression
+        parse_infix_expression = Parser.parse_infix_expression
+        prefix_parse_function = self.prefix_parse_function
+        infix_parse_function = self.infix_parse_function
+        semicolon = token.TokenTypes.SEMICOLON
+        waiting: list[tuple[ast.Expression, Precedence]] = []
+
+        while True:
+            # parse an operand, the prefix of 'parse_expression(precedence)'
+            prefix = prefix_parse_function.get(self.cur_token.code)
+            if prefix is parse_prefix_expression:
+                expression = ast.PrefixExpression(
+                    token=self.cur_token, operator=self.cur_token.Literal, right=None
+                )
+                self.next_token()
+                waiting.append((expression, precedence))
+                precedence = Precedence.PREFIX
+                continue
+
+            if prefix is None:
+                self.no_prefix_parse_function_error(self.cur_token)
+                left_expression = None
+            else:
+                steps = PREFIX_STEPS.get(prefix)
+                if steps is None:
+                    left_expression = prefix(self)
+                else:
+                    left_expression = yield steps(self)
+
+            # the infix loop of 'parse_expression(precedence)', it is skipped
+            # when the prefix is missing
+            operator_found = False
+            while True:
+                while (
+                    prefix is not None
+                    and self.peek_token.Type != semicolon
+                    and precedence
+                    < PRECEDENCES.get(self.peek_token.Type, Precedence.LOWEST)
+                ):
+                    infix = infix_parse_function.get(self.peek_token.code)
+                    if infix is None:
+                        break
+                    self.next_token()
+                    if infix is parse_infix_expression:
+                        expression = ast.InfixExpression(
+                            token=self.cur_token,
+                            operator=self.cur_token.Literal,
+                            left=left_expression,
+                            right=None,
+                        )
+                        waiting.append((expression, precedence))
+                        precedence = self.curr_precedence()
+                        self.next_token()
+                        operator_found = True
+                        break
+                    steps = INFIX_STEPS.get(infix)
+                    if steps is None:
+                        left_expression = infix(self, left_expression)
+                    else:
+                        left_expression = yield steps(self, left_expression)
+                if operator_found:
+                    break
+
+                # 'parse_expression(precedence)' returns, the operator that
+                # waited for it is complete and continues the loop it was in
+                if not waiting:
+                    return left_expression
+                expression, precedence = waiting.pop()
+                expression.right = left_expression
+                left_expression = expression
+                prefix = parse_prefix_expression
+
+    def grouped_expression_steps(self) -> Steps:
+        self.next_token()
+
+        expression = yield self.expression_steps(Precedence.LOWEST)
+
+        if not self.expect_peek(token.TokenTypes.RPAREN):
+            return None
+
+        return expression
+
+    def if_expression_steps(self) -> Steps:
+        expression = ast.IfExpression(token=self.cur_token)
+
+        if not self.expect_peek(token.TokenTypes.LPAREN):
+            return None
+        self.next_token()
+        expression.condition = yield self.expression_steps(Precedence.LOWEST)
+
+        if not self.expect_peek(token.TokenTypes.RPAREN):
+            return None
+        if not self.expect_peek(token.TokenTypes.LBRACE):
+            return None
+        expression.consequence = yield self.block_statement_steps()
+
+        if self.peek_token_is(token.TokenTypes.ELSE):
+            self.next_token()
+            if not self.expect_peek(token.TokenTypes.LBRACE):
+                return None
+            expression.alternative = yield self.block_statement_steps()
+        return expression
+
+    def block_statement_steps(self) -> Steps:
+        block = ast.BlockStatement(token=self.cur_token)
+        self.next_token()
+
+        while not self.cur_token_is(token.TokenTypes.RBRACE) and not self.cur_token_is(
+            token.TokenTypes.EOF
+        ):
+            statement = yield self.statement_steps()
+            if statement:
+                block.statements.append(statement)
+            self.next_token()
+        return block
+
+    def function_literal_steps(self) -> Steps:
+        literal = ast.FunctionLiteral(token=self.cur_token)
+
+        if not self.expect_peek(token.TokenTypes.LPAREN):
+            return None
+        literal.parameters = self.parse_function_parameters()
+
+        if not self.expect_peek(token.TokenTypes.LBRACE):
+            return None
+
+        literal.body = yield self.block_statement_steps()
+
+        return literal
+
+    def array_literal_steps(self) -> Steps:
+        array = ast.ArrayLiteral(token=self.cur_token, elements=[])
+        array.elements = yield self.expression_list_steps(token.TokenTypes.RBRACKET)
+        return array
+
+    def call_expression_steps(self, function: ast.Expression) -> Steps:
+        expression = ast.CallExpression(token=self.cur_token, function=function)
+        expression.arguments = yield self.expression_list_steps(token.TokenTypes.RPAREN)
+        return expression
+
+    def expression_list_steps(self, end: token.TokenTypes) -> Steps:
+        ret_list: list[ast.Expression] = []
+
+        if self.peek_token_is(end):
+            self.next_token()
+            return ret_list
+
+        self.next_token()
+        ret_list.append((yield self.expression_steps(Precedence.LOWEST)))
+
+        while self.peek_token_is(token.TokenTypes.COMMA):
+            self.next_token()
+            self.next_token()
+            ret_list.append((yield self.expression_steps(Precedence.LOWEST)))
+
+        if not self.expect_peek(end):
+            return None
+
+        return ret_list
+
+    def index_expression_steps(self, left: ast.Expression) -> Steps:
+        exp = ast.IndexExpression(token=self.cur_token, left=left)
+
+        self.next_token()
+
+        exp.index = yield self.expression_steps(Precedence.LOWEST)
+
+        if not self.expect_peek(token.TokenTypes.RBRACKET):
+            return None
+        return exp
+
+
+# the generator counterparts of the parse functions in the dispatch tables
+PREFIX_STEPS: dict[Callable, Callable[[IterativeParser], Steps]] = {
+    Parser.parse_grouped_expression: IterativeParser.grouped_expression_steps,
+    Parser.parse_if_expression: IterativeParser.if_expression_steps,
+    Parser.parse_function_literal: IterativeParser.function_literal_steps,
+    Parser.parse_array_literal: IterativeParser.array_literal_steps,
+}
+INFIX_STEPS: dict[Callable, Callable[[IterativeParser, ast.Expression], Steps]] = {
+    Parser.parse_call_expression: IterativeParser.call_expression_steps,
+    Parser.parse_index_expression: IterativeParser.index_expression_steps,
+}
@@ -1,7 +1,20 @@
 from __future__ import annotations
-from typing import Union
-from src.token import Token, TokenTypes, lookup_identifier
+from typing import BinaryIO, Generator, Iterator, Union
+from src.token import (
+    Token,
+    TokenTypes,
+    KEYWORDS,
+    lookup_identifier,
+    CompactToken,
+    TokenCode,
+    TOKEN_CODES,
+)
+from array import array
+import codecs
 import logging
+import os
+import re
+import sys
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
@@ -195,3 +208,372 @@ class Lexer:
 def new_token(tokenType: TokenTypes, char: str) -> TokenTypes:
     tok = Token(Type=tokenType, Literal=char)
     return tok
+
+
+# Single char and two char tokens, with the same Type values that
+# 'Lexer.next_token' assigns to them.
+OPERATOR_TOKEN_TYPES: dict[str, TokenTypes | str] = {
+    "==": TokenTypes.EQ.value,
+    "!=": TokenTypes.NOT_EQ.value,
+    "=": TokenTypes.ASSIGN.value,
+    ";": TokenTypes.SEMICOLON.value,
+    "(": TokenTypes.LPAREN.value,
+    ")": TokenTypes.RPAREN.value,
+    ",": TokenTypes.COMMA.value,
+    "+": TokenTypes.PLUS.value,
+    "-": TokenTypes.MINUS.value,
+    "!": TokenTypes.BANG.value,
+    "/": TokenTypes.SLASH.value,
+    "*": TokenTypes.ASTERISK.value,
+    "<": TokenTypes.LT.value,
+    ">": TokenTypes.GT,
+    "{": TokenTypes.LBRACE.value,
+    "}": TokenTypes.RBRACE.value,
+    "[": TokenTypes.LBRACKET.value,
+    "]": TokenTypes.RBRACKET.value,
+}
+
+IDENTIFIER_GROUP = 1
+INTEGER_GROUP = 2
+STRING_GROUP = 3
+OPERATOR_GROUP = 4
+OTHER_GROUP = 5
+
+# One pattern that skips whitespace and then matches a single token.
+# Only ASCII letters and digits are matched here, other chars end up in
+# the last group and are handled like 'Lexer.next_token' handles them.
+MASTER_PATTERN = re.compile(
+    r"""[ \t\n\r]*(?:
+      ([A-Za-z_]+)
+    | ([0-9]+)
+    | ("[^"]*"?)
+    | (==|!=|[=;(),+\-!/*<>{}\[\]])
+    | (.)
+    )?""",
+    re.VERBOSE | re.DOTALL,
+)
+
+
+# bytes read at a time by 'tokenize_file'
+CHUNK_SIZE = 1 << 16
+
+
+def scan_while(source: str, position: int, predicate) -> int:
+    """
+    Return the position of the first char from 'position' onwards
+    for which the predicate is false.
+    """
+    length = len(source)
+    while position < length and predicate(source[position]):
+        position += 1
+    return position
+
+
+def tokenize(source_code: str) -> Iterator[Token]:
+    """
+    Yield the same tokens as repeated calls to 'Lexer.next_token', ending
+    with the EOF token, by matching whole tokens with 'MASTER_PATTERN'
+    instead of reading one char at a time.
+    """
+    yield from scan_tokens(source_code)
+    yield Token(TokenTypes.EOF.value, None)
+
+
+def scan_tokens(source_code: str, final: bool = True) -> Generator[Token, None, int]:
+    """
+    Yield the tokens of 'source_code', without the EOF token.
+
+    When 'final' is false more input follows, so a token that reaches
+    the end of 'source_code' is not yielded because it might continue.
+    Returns the position of the first char that was not lexed.
+    """
+    if source_code.isascii():
+        return (yield from scan_ascii_tokens(source_code, final))
+
+    length = len(source_code)
+    position = 0
+    while True:
+        tok, _, end = match_token(source_code, position)
+        if tok is None:
+            return end
+        if end == length and not final:
+            return position
+        yield tok
+        position = end
+
+
+def match_token(source_code: str, position: int) -> tuple[Token | None, int, int]:
+    """
+    Match the token that starts at 'position', after skipping whitespace.
+
+    Returns the token with its start and end position, or None and the
+    end of the source twice when only whitespace is left.
+    """
+    m = MASTER_PATTERN.match(source_code, position)
+    group = m.lastindex
+    if group is None:
+        return None, m.end(), m.end()
+    start = m.start(group)
+    position = m.end()
+
+    if group == IDENTIFIER_GROUP or group == INTEGER_GROUP:
+        if position < len(source_code) and not source_code[position].isascii():
+            # the token continues with a non ASCII letter or digit
+            if group == IDENTIFIER_GROUP:
+                position = scan_while(source_code, position, Lexer.is_letter)
+            else:
+                position = scan_while(source_code, position, str.isdigit)
+        literal = source_code[start:position]
+        if group == IDENTIFIER_GROUP:
+            tok = Token(Literal=literal, Type=lookup_identifier(literal))
+        else:
+            tok = Token(Literal=literal, Type=TokenTypes.INT)
+        return tok, start, position
+    if group == OPERATOR_GROUP:
+        literal = m.group(group)
+        return Token(OPERATOR_TOKEN_TYPES[literal], literal), start, position
+    if group == STRING_GROUP:
+        # drop the opening quote and, if the string is terminated, the closing one
+        literal = m.group(group)[1:]
+        if literal.endswith('"'):
+            literal = literal[:-1]
+        return Token(Type=TokenTypes.STRING, Literal=literal), start, position
+
+    char = source_code[start]
+    if Lexer.is_letter(char):
+        position = scan_while(source_code, position, Lexer.is_letter)
+        literal = source_code[start:position]
+        tok = Token(Literal=literal, Type=lookup_identifier(literal))
+        return tok, start, position
+    if char.isdigit():
+        position = scan_while(source_code, position, str.isdigit)
+        tok = Token(Literal=source_code[start:position], Type=TokenTypes.INT)
+        return tok, start, position
+    return new_token(TokenTypes.ILLEGAL, char), start, position
+
+
+def scan_ascii_tokens(source_code: str, final: bool) -> Generator[Token, None, int]:
+    """
+    'scan_tokens' for ASCII input, where every token is exactly one match
+    so the matches can be taken straight from 'finditer'.
+    """
+    keyword = KEYWORDS.get
+    identifier = TokenTypes.IDENT
+    integer = TokenTypes.INT
+    length = len(source_code)
+    for m in MASTER_PATTERN.finditer(source_code):
+        group = m.lastindex
+        if group is None:
+            break
+        if not final and m.end() == length:
+            return m.start()
+        if group == IDENTIFIER_GROUP:
+            literal = m.group(group)
+            yield Token(keyword(literal, identifier), literal)
+        elif group == OPERATOR_GROUP:
+            literal = m.group(group)
+            yield Token(OPERATOR_TOKEN_TYPES[literal], literal)
+        elif group == INTEGER_GROUP:
+            yield Token(integer, m.group(group))
+        elif group == STRING_GROUP:
+            literal = m.group(group)[1:]
+            if literal.endswith('"'):
+                literal = literal[:-1]
+            yield Token(TokenTypes.STRING, literal)
+        else:
+            yield new_token(TokenTypes.ILLEGAL, m.group(group))
+    return length
+
+
+def tokenize_file(
+    source: str | os.PathLike | BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Token]:
+    """
+    Lazily yield the tokens of a UTF-8 encoded file, given as a path or as
+    an open binary stream, reading it 'chunk_size' bytes at a time.
+
+    A token that reaches the end of the chunks read so far might continue
+    in the next chunk, so it is carried over and matched again once more
+    input is available. Memory use is bounded by the chunk size and the
+    longest token, not by the size of the file.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as stream:
+            yield from tokenize_file(stream, chunk_size)
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    final = False
+    while not final:
+        data = source.read(chunk_size)
+        final = not data
+        buffer += decoder.decode(data, final=final)
+        position = yield from scan_tokens(buffer, final)
+        buffer = buffer[position:]
+    yield Token(TokenTypes.EOF.value, None)
+
+
+KEYWORD_CODES: dict[str, int] = {
+    keyword: TOKEN_CODES[token_type] for keyword, token_type in KEYWORDS.items()
+}
+OPERATOR_CODES: dict[str, int] = {
+    operator: TOKEN_CODES[token_type]
+    for operator, token_type in OPERATOR_TOKEN_TYPES.items()
+}
+
+
+def scan_spans(source_code: str) -> Iterator[tuple[int, int, int]]:
+    """
+    Yield the code, start and end position of every token, without EOF.
+
+    The span of a string token includes its quotes.
+    """
+    if not source_code.isascii():
+        position = 0
+        while True:
+            tok, start, position = match_token(source_code, position)
+            if tok is None:
+                return
+            yield TOKEN_CODES[tok.Type], start, position
+
+    keyword = KEYWORD_CODES.get
+    for m in MASTER_PATTERN.finditer(source_code):
+        group = m.lastindex
+        if group is None:
+            return
+        if group == IDENTIFIER_GROUP:
+            code = keyword(m.group(group), TokenCode.IDENT)
+        elif group == OPERATOR_GROUP:
+            code = OPERATOR_CODES[m.group(group)]
+        elif group == INTEGER_GROUP:
+            code = TokenCode.INT
+        elif group == STRING_GROUP:
+            code = TokenCode.STRING
+        else:
+            code = TokenCode.ILLEGAL
+        yield code, m.start(group), m.end()
+
+
+def span_literal(source_code: str, code: int, start: int, end: int) -> str:
+    """
+    The literal of the token with the span, a string loses its quotes.
+    """
+    if code != TokenCode.STRING:
+        return source_code[start:end]
+    literal = source_code[start + 1 : end]
+    if literal.endswith('"'):
+        literal = literal[:-1]
+    return literal
+
+
+def tokenize_compact(source_code: str) -> Iterator[CompactToken]:
+    """
+    'tokenize' producing CompactTokens. The literals of identifiers and
+    keywords are interned, so every occurrence of a name shares one string.
+    """
+    if not source_code.isascii():
+        for code, start, end in scan_spans(source_code):
+            literal = span_literal(source_code, code, start, end)
+            if code == TokenCode.IDENT or literal in KEYWORD_CODES:
+                literal = sys.intern(literal)
+            yield CompactToken(code, literal)
+        yield CompactToken(TokenCode.EOF, None)
+        return
+
+    intern = sys.intern
+    keyword = KEYWORD_CODES.get
+    identifier = TokenCode.IDENT
+    for m in MASTER_PATTERN.finditer(source_code):
+        group = m.lastindex
+        if group == IDENTIFIER_GROUP:
+            literal = intern(m.group(group))
+            yield CompactToken(keyword(literal, identifier), literal)
+        elif group == OPERATOR_GROUP:
+            literal = m.group(group)
+            yield CompactToken(OPERATOR_CODES[literal], literal)
+        elif group == INTEGER_GROUP:
+            yield CompactToken(TokenCode.INT, m.group(group))
+        elif group == STRING_GROUP:
+            literal = m.group(group)[1:]
+            if literal.endswith('"'):
+                literal = literal[:-1]
+            yield CompactToken(TokenCode.STRING, literal)
+        elif group == OTHER_GROUP:
+            yield CompactToken(TokenCode.ILLEGAL, m.group(group))
+        else:
+            break
+    yield CompactToken(TokenCode.EOF, None)
+
+
+class TokenBuffer:
+    """
+    The tokens of a whole source in columnar form: the codes, start and end
+    positions are stored in arrays, literals are sliced from the source on
+    demand.
+
+    Iterating over the buffer yields CompactTokens ending with EOF, so it
+    can be handed to the Parser.
+    """
+
+    def __init__(self, source_code: str, codes: array, starts: array, ends: array):
+        self.source_code = source_code
+        self.codes = codes
+        self.starts = starts
+        self.ends = ends
+
+    @staticmethod
+    def new(source_code: str) -> TokenBuffer:
+        codes = array("B")
+        starts = array("Q")
+        ends = array("Q")
+        for code, start, end in scan_spans(source_code):
+            codes.append(code)
+            starts.append(start)
+            ends.append(end)
+        return TokenBuffer(source_code, codes, starts, ends)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def literal(self, index: int) -> str:
+        return span_literal(
+            self.source_code, self.codes[index], self.starts[index], self.ends[index]
+        )
+
+    def __getitem__(self, index: int) -> CompactToken:
+        return CompactToken(self.codes[index], self.literal(index))
+
+    def __iter__(self) -> Iterator[CompactToken]:
+        for index in range(len(self.codes)):
+            yield self[index]
+        yield CompactToken(TokenCode.EOF, None)
+
+
+class RegexLexer:
+    """
+    Drop-in replacement for the Lexer that is backed by 'tokenize'.
+
+    Like the Lexer, it keeps returning the EOF token once the end of
+    the input is reached.
+    """
+
+    def __init__(self, tokens: Iterator[Token]):
+        self.tokens = tokens
+        self.eof: Token | None = None
+
+    @staticmethod
+    def new(source_code: str) -> RegexLexer:
+        return RegexLexer(tokens=tokenize(source_code))
+
+    @staticmethod
+    def new_from_file(source: str | os.PathLike | BinaryIO) -> RegexLexer:
+        return RegexLexer(tokens=tokenize_file(source))
+
+    def next_token(self) -> Token:
+        if self.eof is not None:
+            return Token(self.eof.Type, self.eof.Literal)
+        tok = next(self.tokens)
+        if tok.Type == TokenTypes.EOF:
+            self.eof = tok
+        return tok
@@ -2,6 +2,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
+from typing import Any
 from src import ast
 
 ObjectType = str
@@ -17,6 +18,7 @@ class Type(Enum):
     STRING_OBJ = "STRING"
     BUILTIN_OBJ = "BUILTIN"
     ARRAY_OBJ = "ARRAY"
+    TAIL_CALL_OBJ = "TAIL_CALL"
 
 
 class BuiltinFunction(ABC):
@@ -59,6 +61,53 @@ class String(Object):
         return str(self.value)
 
 
+# Integer and String objects are never changed once made, so the
+# evaluator shares them: 'new_integer' returns the same object for every
+# integer from SMALL_INTEGER_MIN up to SMALL_INTEGER_MAX, 'new_string'
+# the same object for equal strings of up to MAX_INTERNED_LENGTH chars,
+# until MAX_INTERNED_STRINGS are interned
+SMALL_INTEGER_MIN = -5
+SMALL_INTEGER_MAX = 1024
+MAX_INTERNED_LENGTH = 64
+MAX_INTERNED_STRINGS = 10_000
+
+SMALL_INTEGERS: list[Integer] = []
+STRINGS: dict[str, String] = {}
+
+
+def cache_small_integers(
+    low: int = SMALL_INTEGER_MIN, high: int = SMALL_INTEGER_MAX
+) -> None:
+    """
+    Make the shared Integer objects for the integers from 'low' up to
+    and including 'high'.
+    """
+    global SMALL_INTEGER_MIN, SMALL_INTEGER_MAX, SMALL_INTEGERS
+    SMALL_INTEGERS = [Integer(value=value) for value in range(low, high + 1)]
+    SMALL_INTEGER_MIN = low
+    SMALL_INTEGER_MAX = high
+
+
+def new_integer(value: int | float) -> Integer:
+    # a float from '/' is not shared, 2.0 would find the Integer of 2
+    if type(value) is int and SMALL_INTEGER_MIN <= value <= SMALL_INTEGER_MAX:
+        return SMALL_INTEGERS[value - SMALL_INTEGER_MIN]
+    return Integer(value=value)
+
+
+def new_string(value: str) -> String:
+    string = STRINGS.get(value)
+    if string is not None:
+        return string
+    string = String(value=value)
+    if len(value) <= MAX_INTERNED_LENGTH and len(STRINGS) < MAX_INTERNED_STRINGS:
+        STRINGS[value] = string
+    return string
+
+
+cache_small_integers()
+
+
 @dataclass
 class Boolean(Object):
     value: bool
@@ -93,6 +142,24 @@ class ReturnValue(Object):
         return self.value.inspect()
 
 
+@dataclass(slots=True)
+class TailCall(Object):
+    """
+    A call in tail position that is left to 'apply_function', which runs
+    it in its loop instead of in a nested call.
+    """
+
+    function: Object
+    arguments: list[Object]
+
+    @staticmethod
+    def object_type() -> Type:
+        return Type.TAIL_CALL_OBJ
+
+    def inspect(self) -> str:
+        return "tail call"
+
+
 @dataclass
 class Error(Object):
     message: str
@@ -121,6 +188,32 @@ class Environment:
         return val
 
 
+# where a variable of a function that went through 'resolver' is stored
+LOCAL = 0  # in a slot of the Frame of the call
+CELL = 1  # in a Cell, shared with the closures that use the variable
+GLOBAL = 2  # in the Environment of the top level, by name
+
+
+@dataclass(slots=True)
+class Cell:
+    value: Object | None = None
+
+
+@dataclass(slots=True)
+class Frame:
+    """
+    The environment of a call of a function that went through 'resolver'.
+
+    slots: the LOCAL variables, at the slot the resolver gave them
+    cells: the cells the function captured followed by the CELL variables
+    globals: the Environment of the top level
+    """
+
+    slots: list[Object | None]
+    cells: tuple[Cell, ...]
+    globals: Environment
+
+
 def new_environment() -> Environment:
     return Environment()
 
@@ -143,6 +236,9 @@ class Function(Object):
     body: ast.BlockStatement
     env: Environment
     parameters: list[ast.Identifier] = field(default_factory=list)
+    # the variables of enclosing calls that a function that went through
+    # 'resolver' uses, its 'env' is then the Environment of the top level
+    cells: tuple[Cell, ...] = ()
 
     @staticmethod
     def object_type() -> Type:
@@ -163,6 +259,16 @@ class Function(Object):
         return result
 
 
+@dataclass
+class CompiledFunction(Function):
+    """
+    A Function whose body has been compiled to a bytecode chunk
+    by the 'compiler' so it can be called by the 'vm'.
+    """
+
+    chunk: Any = None
+
+
 @dataclass
 class Builtin(Object):
     fn: BuiltinFunction
@@ -0,0 +1,213 @@
+"""
+Simplify a program before it is evaluated.
+
+'optimize' rewrites the ast in place, bottom up:
+
+- an operator whose operands are literals is replaced by the literal of
+  its value, computed with the operator functions of the evaluator, so
+  '2 + 5 * 5', '"a" + "b"' and '!true' become '27', '"ab"' and 'false'
+- an if expression whose condition is a literal keeps only the block
+  that runs, under a 'true' condition, or an empty block under a 'false'
+  condition when no block runs, so it stays an expression that every
+  backend compiles
+- 'x * 1', '1 * x', 'x + 0', '0 + x' and 'x - 0' become 'x', and '!!x'
+  becomes 'x'
+
+The evaluators and the compilers give the same results for the
+simplified program. An operator whose value is an error is left in
+place, so the error is made at run time as before. A division is not
+folded, its value is a float that has no literal. The identities only
+hold when 'x' is an integer, 'x + 0' is an error for a string, and '!!x'
+is only 'x' for a boolean, '!!0' is false while 0 is truthy. They are
+applied when the operand is known to have that type or to be an error,
+which the evaluator passes on unchanged: an expression that can only
+evaluate to an integer, such as '-x', 'x - y' or 'len(x)', or to a
+boolean, such as 'x < y' or '!x'.
+"""
+from __future__ import annotations
+from src import ast
+from src import object
+from src.evaluator import (
+    BUILTINS,
+    eval_infix_expression,
+    eval_prefix_expression,
+    native_bool_to_boolean_object,
+)
+from src.ast import NODE, NODES, SCHEMAS
+from src.token import Token, TokenTypes
+from typing import Any
+
+LITERALS = (ast.IntegerLiteral, ast.StringLiteral, ast.Boolean)
+
+# the operators whose value is an integer or an error
+INTEGER_OPERATORS = {"-", "*", "/"}
+# the operators whose value is a boolean or an error
+BOOLEAN_OPERATORS = {"<", ">", "==", "!="}
+INTEGER_BUILTINS = {"len"}
+
+
+def optimize(program: ast.Program) -> ast.Program:
+    """
+    Simplify a program in place, without recursion. Returns the program.
+    """
+    stack: list[tuple[Any, bool]] = [(program, False)]
+    while stack:
+        node, children_done = stack.pop()
+        schema = SCHEMAS[type(node)]
+        if not children_done:
+            stack.append((node, True))
+            for name, kind in schema:
+                value = getattr(node, name)
+                if kind == NODE and value is not None:
+                    stack.append((value, False))
+                elif kind == NODES and value is not None:
+                    stack.extend((item, False) for item in value if item is not None)
+            continue
+        # the children are simplified, simplify the nodes right below this one
+        for name, kind in schema:
+            value = getattr(node, name)
+            if kind == NODE and value is not None:
+                setattr(node, name, simplify(value))
+            elif kind == NODES and value is not None:
+                value[:] = [None if item is None else simplify(item) for item in value]
+    return program
+
+
+def simplify(node: Any) -> Any:
+    """
+    The simplified form of a node whose children are simplified.
+    """
+    match type(node):
+        case ast.PrefixExpression:
+            right = node.right
+            if type(right) in LITERALS:
+                return fold(eval_prefix_expression(node.operator, value(right)), node)
+            if (
+                node.operator == "!"
+                and type(right) is ast.PrefixExpression
+                and right.operator == "!"
+                and is_boolean(right.right)
+            ):
+                return right.right
+        case ast.InfixExpression:
+            left = node.left
+            right = node.right
+            operator = node.operator
+            if type(left) in LITERALS and type(right) in LITERALS:
+                if operator == "/":
+                    return node
+                return fold(
+                    eval_infix_expression(operator, value(left), value(right)), node
+                )
+            if operator in ("*", "+", "-") and is_integer(left):
+                if is_constant(right, 1 if operator == "*" else 0):
+                    return left
+            if operator in ("*", "+") and is_integer(right):
+                if is_constant(left, 1 if operator == "*" else 0):
+                    return right
+        case ast.IfExpression:
+            condition = node.condition
+            if type(condition) in LITERALS:
+                # integers and strings are truthy, whatever their value
+                if type(condition) is not ast.Boolean or condition.value:
+                    return pruned(node, True, node.consequence)
+                if node.alternative is not None:
+                    return pruned(node, True, node.alternative)
+                return pruned(node, False, ast.BlockStatement(token=node.token))
+    return node
+
+
+def pruned(
+    node: ast.IfExpression, runs: bool, block: ast.BlockStatement
+) -> ast.IfExpression:
+    """
+    The if expression that runs 'block' when 'runs' is true, and nothing
+    otherwise, whatever the condition of 'node' was.
+    """
+    if (
+        type(node.condition) is ast.Boolean
+        and node.condition.value is runs
+        and node.consequence is block
+        and node.alternative is None
+    ):
+        return node
+    return ast.IfExpression(
+        token=node.token,
+        condition=fold(native_bool_to_boolean_object(runs), node.condition),
+        consequence=block,
+        alternative=None,
+    )
+
+
+def value(literal: Any) -> object.Object:
+    match type(literal):
+        case ast.IntegerLiteral:
+            return object.new_integer(literal.value)
+        case ast.StringLiteral:
+            return object.new_string(literal.value)
+    return native_bool_to_boolean_object(literal.value)
+
+
+def fold(result: object.Object, node: Any) -> Any:
+    """
+    The literal of the value of an operator, or the operator when its
+    value has no literal.
+    """
+    result_type = type(result)
+    if result_type is object.Integer and type(result.value) is int:
+        return ast.IntegerLiteral(
+            token=Token(TokenTypes.INT, str(result.value)), value=result.value
+        )
+    if result_type is object.String:
+        return ast.StringLiteral(
+            token=Token(TokenTypes.STRING, result.value), value=result.value
+        )
+    if result_type is object.Boolean:
+        if result.value:
+            return ast.Boolean(token=Token(TokenTypes.TRUE, "true"), value=True)
+        return ast.Boolean(token=Token(TokenTypes.FALSE, "false"), value=False)
+    return node
+
+
+def is_constant(node: Any, constant: int) -> bool:
+    return (
+        type(node) is ast.IntegerLiteral
+        and type(node.value) is int
+        and node.value == constant
+    )
+
+
+def is_integer(node: Any) -> bool:
+    """
+    Whether the node can only evaluate to an integer or an error.
+    """
+    match type(node):
+        case ast.IntegerLiteral:
+            return True
+        case ast.PrefixExpression:
+            return node.operator == "-"
+        case ast.InfixExpression:
+            return node.operator in INTEGER_OPERATORS
+        case ast.CallExpression:
+            # builtins take precedence over bindings of the same name
+            function = node.function
+            return (
+                type(function) is ast.Identifier
+                and function.value in INTEGER_BUILTINS
+                and function.value in BUILTINS
+            )
+    return False
+
+
+def is_boolean(node: Any) -> bool:
+    """
+    Whether the node can only evaluate to a boolean or an error.
+    """
+    match type(node):
+        case ast.Boolean:
+            return True
+        case ast.PrefixExpression:
+            return node.operator == "!"
+        case ast.InfixExpression:
+            return node.operator in BOOLEAN_OPERATORS
+    return False
@@ -0,0 +1,220 @@
+"""
+Lexing and parsing on several processes.
+
+The source is split at newlines that are outside of string literals. A
+newline is whitespace everywhere else, so no token spans such a split
+point and the parts can be lexed independently.
+
+Many files are parsed by sending the files to a pool of processes. The
+workers send the ast back in the postorder records of the parse cache,
+which are cheaper to pickle than the nodes and do not recurse. Starting
+the pool costs tens of milliseconds with fork and over half a second with
+spawn, the default on macOS and Windows, and the parent still decodes
+every ast. So files that are small in total are parsed in-process.
+
+python -m src.parallel [--workers N] [--quiet] path ...
+
+Parses the files, and the .monkey files below the directories, and
+prints the parse errors. The exit status is 1 if there are any.
+"""
+from __future__ import annotations
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from src import ast
+from src.lexer import Lexer, TokenBuffer, scan_spans
+from src.parse_cache import decode_program, encode_program
+from src.parser import Parser
+from src.token import Token
+from typing import Iterable, Iterator
+import argparse
+import os
+import sys
+
+# sources smaller than this are not worth sending to other processes
+MIN_PART_SIZE = 1 << 20
+# files smaller than this in total are parsed in-process, their parse
+# takes about as long as starting the workers
+MIN_PARALLEL_SIZE = 256 << 10
+
+
+def find_split_points(source_code: str, parts: int) -> list[int]:
+    """
+    Return the positions at which the source can be split into at most
+    'parts' parts of roughly equal size, including 0 and the length of
+    the source.
+
+    A split point is right after a newline that is not inside a string.
+    Strings can not contain escaped quotes, so a position is inside a
+    string when an odd number of quotes precede it.
+    """
+    length = len(source_code)
+    points = [0]
+    quotes = 0
+    counted = 0
+    for part in range(1, parts):
+        position = max(length * part // parts, points[-1])
+        newline = source_code.find("\n", position)
+        while newline != -1:
+            quotes += source_code.count('"', counted, newline)
+            counted = newline
+            if quotes % 2 == 0:
+                break
+            newline = source_code.find("\n", newline + 1)
+        if newline == -1 or newline + 1 == length:
+            break
+        points.append(newline + 1)
+    points.append(length)
+    return points
+
+
+def lex_part(part: str, offset: int) -> tuple[array, array, array]:
+    """
+    Lex part of a source, the positions are made absolute with 'offset'.
+    """
+    codes = array("B")
+    starts = array("Q")
+    ends = array("Q")
+    for code, start, end in scan_spans(part):
+        codes.append(code)
+        starts.append(start + offset)
+        ends.append(end + offset)
+    return codes, starts, ends
+
+
+def lex_parallel(source_code: str, workers: int | None = None) -> TokenBuffer:
+    """
+    Lex the source into a TokenBuffer using a pool of 'workers' processes,
+    by default one for every CPU.
+    """
+    workers = workers or os.cpu_count() or 1
+    parts = min(workers, len(source_code) // MIN_PART_SIZE)
+    if parts <= 1:
+        return TokenBuffer.new(source_code)
+
+    points = find_split_points(source_code, parts)
+    codes = array("B")
+    starts = array("Q")
+    ends = array("Q")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(lex_part, source_code[start:end], start)
+            for start, end in zip(points, points[1:])
+        ]
+        for future in futures:
+            part_codes, part_starts, part_ends = future.result()
+            codes.extend(part_codes)
+            starts.extend(part_starts)
+            ends.extend(part_ends)
+    return TokenBuffer(source_code, codes, starts, ends)
+
+
+def tokenize_parallel(source_code: str, workers: int | None = None) -> Iterator[Token]:
+    """
+    Yield the same tokens as 'lexer.tokenize', lexed by 'lex_parallel'.
+    """
+    return iter(lex_parallel(source_code, workers))
+
+
+@dataclass(slots=True)
+class ParsedFile:
+    """
+    path: the file that was parsed
+    program: the ast, or its records when parsed with 'serialized'
+    errors: the errors of the parser
+    """
+
+    path: str
+    program: ast.Program | list[tuple]
+    errors: list[str]
+
+
+def parse_file(path: str) -> tuple[str, list[tuple], list[str]]:
+    """
+    Parse a file, the ast is returned as the records of 'encode_program'.
+    """
+    with open(path, encoding="utf-8") as f:
+        source_code = f.read()
+    p = Parser.new(Lexer.new(source_code))
+    program = p.parse_program()
+    return path, encode_program(program), p.errors
+
+
+def parse_files(
+    paths: Iterable[str], workers: int | None = None, serialized: bool = False
+) -> list[ParsedFile]:
+    """
+    Parse files on a pool of 'workers' processes, by default one for every
+    CPU. The results are in the order of 'paths', whatever the order the
+    workers finish in. With 'serialized' the programs are left as records
+    for 'parse_cache.decode_program'.
+
+    Files that are smaller than MIN_PARALLEL_SIZE in total are parsed in
+    this process.
+    """
+    paths = [os.fspath(path) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    if (
+        workers <= 1
+        or len(paths) <= 1
+        or sum(os.path.getsize(path) for path in paths) < MIN_PARALLEL_SIZE
+    ):
+        results = [parse_file(path) for path in paths]
+    else:
+        # hand out the files in batches, so small files do not cost a round
+        # trip each, but with a few batches per worker to even out the load
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(parse_file, paths, chunksize=chunksize))
+    return [
+        ParsedFile(path, records if serialized else decode_program(records), errors)
+        for path, records, errors in results
+    ]
+
+
+def find_files(paths: Iterable[str], suffix: str = ".monkey") -> list[str]:
+    """
+    The paths that are files, and the files ending in 'suffix' below the
+    paths that are directories, sorted per directory.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for directory, _, names in sorted(os.walk(path)):
+            files.extend(
+                os.path.join(directory, name)
+                for name in sorted(names)
+                if name.endswith(suffix)
+            )
+    return files
+
+
+def main(argv: list[str] | None = None) -> int:
+    arguments = argparse.ArgumentParser(
+        prog="python -m src.parallel", description="Parse Monkey files in parallel."
+    )
+    arguments.add_argument("paths", nargs="+", help="files or directories")
+    arguments.add_argument("--workers", type=int, default=None)
+    arguments.add_argument(
+        "--quiet", action="store_true", help="only print the files with errors"
+    )
+    options = arguments.parse_args(argv)
+
+    failed = 0
+    for parsed in parse_files(
+        find_files(options.paths), workers=options.workers, serialized=True
+    ):
+        if parsed.errors:
+            failed += 1
+            print(f"{parsed.path}: {len(parsed.errors)} errors")
+            for error in parsed.errors:
+                print(f"  {error}")
+        elif not options.quiet:
+            print(f"{parsed.path}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
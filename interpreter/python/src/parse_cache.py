@@ -0,0 +1,265 @@
+"""
+On disk cache of parsed programs.
+
+Entries are keyed by a hash of the source and of the interpreter version,
+which is a hash of the modules that turn source into an ast. An entry
+stores the ast as a flat list of records in postorder, serialized with
+'marshal', so loading it skips the lexer and the parser. The records
+hold the fields in 'ast.SCHEMAS'.
+
+Entries are written to a temporary file that is renamed into place, so a
+reader never sees half an entry. The cache is bounded in bytes, the least
+recently used entries are removed first.
+"""
+from __future__ import annotations
+from src import ast
+from src.ast import NODE, NODES, SCALAR, SCHEMAS
+from src import lexer
+from src import parser
+from src import token
+from functools import lru_cache
+from typing import Any
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+# bump when the format of the records changes
+FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = ".ast"
+
+# a SCALAR field is stored in the record of its node, a NODE as a record of
+# its own before its parent, and the length of NODES in the record
+NONE_RECORD = (-1,)
+
+NODE_CLASSES: list[type] = list(SCHEMAS)
+CLASS_INDEX: dict[type, int] = {cls: index for index, cls in enumerate(NODE_CLASSES)}
+
+
+@lru_cache(maxsize=None)
+def interpreter_version() -> str:
+    """
+    A hash of the modules that determine the ast of a source.
+    """
+    digest = hashlib.sha256()
+    for module in (token, lexer, parser, ast):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def encode_program(program: ast.Program) -> list[tuple]:
+    """
+    Flatten a program into records in postorder, every record holds the
+    class index, the token code and literal, and the scalar fields and
+    list lengths of a node.
+    """
+    intern = sys.intern
+    records: list[tuple] = []
+    stack: list[tuple[Any, bool]] = [(program, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if node is None:
+            records.append(NONE_RECORD)
+            continue
+        schema = SCHEMAS[type(node)]
+        if children_done:
+            tok = getattr(node, "token", None)
+            record = [CLASS_INDEX[type(node)]]
+            if tok is None:
+                record += (None, None)
+            elif type(tok.Literal) is str:
+                # equal strings are interned, so marshal stores them once
+                record += (int(tok.code), intern(tok.Literal))
+            else:
+                record += (int(tok.code), tok.Literal)
+            for name, kind in schema:
+                value = getattr(node, name)
+                if kind == SCALAR:
+                    record.append(intern(value) if type(value) is str else value)
+                elif kind == NODES:
+                    record.append(-1 if value is None else len(value))
+            records.append(tuple(record))
+            continue
+        stack.append((node, True))
+        children = []
+        for name, kind in schema:
+            value = getattr(node, name)
+            if kind == NODE:
+                children.append(value)
+            elif kind == NODES and value is not None:
+                children.extend(value)
+        stack.extend((child, False) for child in reversed(children))
+    return records
+
+
+def decode_program(records: list[tuple]) -> ast.Program:
+    """
+    Rebuild the program from its records, raises an exception when they do
+    not describe a single tree.
+
+    The fields in SCHEMAS are in the order of the dataclass fields, so the
+    nodes are constructed with positional arguments.
+    """
+    types = token.TOKEN_TYPES
+    Token = token.Token
+    kinds = [tuple(kind for _, kind in reversed(SCHEMAS[cls])) for cls in NODE_CLASSES]
+    stack: list[Any] = []
+    pop = stack.pop
+    for record in records:
+        index = record[0]
+        if index < 0:
+            stack.append(None)
+            continue
+        # children are on the stack in field order, so pop them in reverse
+        values = []
+        position = len(record)
+        for kind in kinds[index]:
+            if kind == NODE:
+                values.append(pop())
+                continue
+            position -= 1
+            value = record[position]
+            if kind == SCALAR:
+                values.append(value)
+            elif value < 0:
+                values.append(None)
+            elif value == 0:
+                values.append([])
+            elif value > len(stack):
+                raise ValueError("a list of nodes is longer than the records")
+            else:
+                values.append(stack[-value:])
+                del stack[-value:]
+        values.reverse()
+        code = record[1]
+        if code is None:
+            stack.append(NODE_CLASSES[index](*values))
+        else:
+            stack.append(NODE_CLASSES[index](Token(types[code], record[2]), *values))
+    if len(stack) != 1:
+        raise ValueError(f"the records hold {len(stack)} nodes at the top")
+    return pop()
+
+
+class ParseCache:
+    """
+    directory: where the entries are stored
+    max_bytes: the total size of the entries that is kept
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def new(
+        directory: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> ParseCache:
+        """
+        A cache in 'directory', by default $MONKEY_PARSE_CACHE or
+        ~/.cache/monkey/parse.
+        """
+        if directory is None:
+            directory = os.environ.get("MONKEY_PARSE_CACHE") or os.path.join(
+                os.path.expanduser("~"), ".cache", "monkey", "parse"
+            )
+        os.makedirs(directory, exist_ok=True)
+        return ParseCache(directory=directory, max_bytes=max_bytes)
+
+    def key(self, source_code: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{interpreter_version()}:{FORMAT_VERSION}:".encode())
+        digest.update(source_code.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key: str) -> tuple[ast.Program, list[str]] | None:
+        """
+        Return the program and parse errors of an entry, or None when there
+        is no entry for the key. An entry that cannot be read back, a
+        truncated one or one in another format, is removed and is a miss.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            records, errors = marshal.loads(data)
+            program = decode_program(records)
+            if type(program) is not ast.Program:
+                raise ValueError(f"entry holds a {type(program)}")
+        except Exception:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        try:
+            # mark the entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return program, errors
+
+    def store(self, key: str, program: ast.Program, errors: list[str]) -> None:
+        """
+        Write an entry atomically and evict entries when the cache is full.
+        """
+        data = marshal.dumps((encode_program(program), list(errors)))
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the entries fit in
+        'max_bytes'.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def parse(self, source_code: str) -> tuple[ast.Program, list[str]]:
+        """
+        Return the program and parse errors of the source, from the cache
+        if possible.
+        """
+        key = self.key(source_code)
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+        p = parser.Parser.new(lexer.RegexLexer.new(source_code))
+        program = p.parse_program()
+        self.store(key, program, p.errors)
+        return program, p.errors
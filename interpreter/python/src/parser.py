@@ -3,7 +3,7 @@ from src import ast
 from src import lexer
 from src import token
 import logging
-from typing import Callable
+from typing import Callable, Iterable, Iterator
 from enum import IntEnum
 
 logging.basicConfig(level=logging.INFO)
@@ -11,6 +11,10 @@ LOGGER = logging.getLogger(__name__)
 
 PrefixParseFunction = Callable[[], ast.Expression]
 InfixParseFunction = Callable[[ast.Expression], ast.Expression]
+# the entries of the dispatch tables take the parser as their first argument,
+# so the tables can be shared by all parsers
+PrefixParseMethod = Callable[["Parser"], ast.Expression]
+InfixParseMethod = Callable[["Parser", ast.Expression], ast.Expression]
 
 
 class Precedence(IntEnum):
@@ -39,74 +43,47 @@ PRECEDENCES: dict[token.TokenTypes, int] = {
 
 
 class Parser:
+    # Dispatch tables shared by all parsers, keyed by TokenCode. They are
+    # filled in below the class, 'register_prefix_function' and
+    # 'register_infix_function' give a single parser its own copy.
+    prefix_parse_function: dict[int, PrefixParseMethod] = {}
+    infix_parse_function: dict[int, InfixParseMethod] = {}
+
     def __init__(self, l: lexer.Lexer):
         self.l: lexer.Lexer = l
         self.cur_token: token.Token | None = None
         self.peek_token: token.Token | None = None
         self.errors: list[str] = []
-        self.prefix_parse_function: dict[str, PrefixParseFunction] = {}
-        self.register_prefix_function(token.TokenTypes.IDENT, self.parse_identifier)
-        self.register_prefix_function(token.TokenTypes.INT, self.parse_integer_literal)
-        self.register_prefix_function(
-            token.TokenTypes.STRING, self.parse_string_literal
-        )
-        self.register_prefix_function(
-            token.TokenTypes.BANG, self.parse_prefix_expression
-        )
-        self.register_prefix_function(
-            token.TokenTypes.MINUS, self.parse_prefix_expression
-        )
-        self.register_prefix_function(token.TokenTypes.TRUE, self.parse_boolean)
-        self.register_prefix_function(token.TokenTypes.FALSE, self.parse_boolean)
-        self.register_prefix_function(
-            token.TokenTypes.LPAREN, self.parse_grouped_expression
-        )
-        self.register_prefix_function(token.TokenTypes.IF, self.parse_if_expression)
-        self.register_prefix_function(
-            token.TokenTypes.FUNCTION, self.parse_function_literal
-        )
-        self.register_prefix_function(
-            token.TokenTypes.LBRACKET, self.parse_array_literal
-        )
-        # register infix operators
-        self.infix_parse_function: dict[str, InfixParseFunction] = {}
-        self.register_infix_function(token.TokenTypes.PLUS, self.parse_infix_expression)
-        self.register_infix_function(
-            token.TokenTypes.MINUS, self.parse_infix_expression
-        )
-        self.register_infix_function(
-            token.TokenTypes.SLASH, self.parse_infix_expression
-        )
-        self.register_infix_function(
-            token.TokenTypes.ASTERISK, self.parse_infix_expression
-        )
-        self.register_infix_function(token.TokenTypes.EQ, self.parse_infix_expression)
-        self.register_infix_function(
-            token.TokenTypes.NOT_EQ, self.parse_infix_expression
-        )
-        self.register_infix_function(token.TokenTypes.LT, self.parse_infix_expression)
-        self.register_infix_function(token.TokenTypes.GT, self.parse_infix_expression)
-        self.register_infix_function(
-            token.TokenTypes.LPAREN, self.parse_call_expression
-        )
-        self.register_infix_function(
-            token.TokenTypes.LBRACKET, self.parse_index_expression
-        )
 
     @staticmethod
-    def new(l: lexer.Lexer) -> Parser:
+    def new(l: lexer.Lexer | Iterable[token.Token]) -> Parser:
         """
         Creates a new instance of the Parser and sets the cur_token and
         peek_token to the proper starting position.
 
+        Besides a lexer, 'l' can be any iterable of tokens, for instance
+        the generator returned by 'lexer.tokenize_file'.
+
         The __init__ takes care of the setup of the individual attributes of the
          instance of the Parser.
         """
-        p = Parser(l=l)
+        return Parser(l=l).reset(l)
 
-        p.next_token()
-        p.next_token()
-        return p
+    def reset(self, l: lexer.Lexer | Iterable[token.Token]) -> Parser:
+        """
+        Start parsing the tokens of another lexer, so that a single parser
+        can be reused for many small inputs.
+        """
+        if not hasattr(l, "next_token"):
+            l = lexer.RegexLexer(tokens=iter(l))
+        self.l = l
+        self.cur_token = None
+        self.peek_token = None
+        self.errors = []
+
+        self.next_token()
+        self.next_token()
+        return self
 
     def next_token(self) -> None:
         """
@@ -133,13 +110,23 @@ class Parser:
         - when EOF is encountered, return the program
         """
         program = ast.Program()
+        program.statements.extend(self.parse_statements())
+        return program
+
+    def parse_statements(self) -> Iterator[ast.Statement]:
+        """
+        Yield the top-level statements of the program one at a time, as they
+        are parsed. The parser keeps no reference to a statement once it is
+        yielded.
+        """
         while self.cur_token.Type != token.TokenTypes.EOF:
             statement = self.parse_statement()
             LOGGER.info(f"parsed {statement}")
             if statement is not None:
-                program.statements.append(statement)
+                yield statement
+            # the next statement is parsed without this one kept alive
+            del statement
             self.next_token()
-        return program
 
     def parse_statement(self) -> ast.Statement:
         """
@@ -190,28 +177,32 @@ class Parser:
 
         - return the 'ast.Expression'
         """
-        prefix = self.prefix_parse_function.get(self.cur_token.Type)
+        prefix = self.prefix_parse_function.get(self.cur_token.code)
 
         LOGGER.info(f"parse_expression prefix {prefix} for {self.cur_token.Type}")
         LOGGER.info(f"{self.prefix_parse_function.keys()}")
         if prefix is None:
             self.no_prefix_parse_function_error(self.cur_token)
             return None
-        left_expression = prefix()
+        left_expression = prefix(self)
         while (
             not self.peek_token_is(token.TokenTypes.SEMICOLON)
             and precedence < self.peek_precedence()
         ):
-            infix = self.infix_parse_function.get(self.peek_token.Type)
+            infix = self.infix_parse_function.get(self.peek_token.code)
             if infix is None:
                 return left_expression
             self.next_token()
-            left_expression = infix(left_expression)
+            left_expression = infix(self, left_expression)
 
         return left_expression
 
-    def no_prefix_parse_function_error(self, t: token.TokenTypes) -> None:
-        message = f"no prefix parse function for {t} found"
+    def no_prefix_parse_function_error(self, t: token.Token) -> None:
+        """
+        The message shows the Type and Literal of the token, the same for a
+        token.Token and a token.CompactToken.
+        """
+        message = f"no prefix parse function for {token.Token(t.Type, t.Literal)} found"
         self.errors.append(message)
 
     def parse_let_statement(self) -> ast.LetStatement:
@@ -289,9 +280,14 @@ class Parser:
     ) -> None:
         """
         Register a PrefixParseFunction to the 'prefix_parse_function'
-        register in the Parser.
+        register of this parser only. As before, the function takes no
+        arguments, a bound method of the parser for instance.
         """
-        self.prefix_parse_function[token_type] = function
+        if "prefix_parse_function" not in self.__dict__:
+            self.prefix_parse_function = dict(self.prefix_parse_function)
+        self.prefix_parse_function[token.TOKEN_CODES[token_type]] = (
+            lambda parser: function()
+        )
 
     def register_infix_function(
         self,
@@ -300,9 +296,14 @@ class Parser:
     ) -> None:
         """
         Register an InfixParseFunction to the 'infix_parse_function'
-        register in the Parser.
+        register of this parser only. As before, the function takes the
+        left expression only, a bound method of the parser for instance.
         """
-        self.infix_parse_function[token_type] = function
+        if "infix_parse_function" not in self.__dict__:
+            self.infix_parse_function = dict(self.infix_parse_function)
+        self.infix_parse_function[token.TOKEN_CODES[token_type]] = (
+            lambda parser, left: function(left)
+        )
 
     def parse_identifier(self) -> ast.Expression:
         """
@@ -530,3 +531,31 @@ class Parser:
         if not self.expect_peek(token.TokenTypes.RBRACKET):
             return None
         return exp
+
+
+Parser.prefix_parse_function = {
+    token.TokenCode.IDENT: Parser.parse_identifier,
+    token.TokenCode.INT: Parser.parse_integer_literal,
+    token.TokenCode.STRING: Parser.parse_string_literal,
+    token.TokenCode.BANG: Parser.parse_prefix_expression,
+    token.TokenCode.MINUS: Parser.parse_prefix_expression,
+    token.TokenCode.TRUE: Parser.parse_boolean,
+    token.TokenCode.FALSE: Parser.parse_boolean,
+    token.TokenCode.LPAREN: Parser.parse_grouped_expression,
+    token.TokenCode.IF: Parser.parse_if_expression,
+    token.TokenCode.FUNCTION: Parser.parse_function_literal,
+    token.TokenCode.LBRACKET: Parser.parse_array_literal,
+}
+
+Parser.infix_parse_function = {
+    token.TokenCode.PLUS: Parser.parse_infix_expression,
+    token.TokenCode.MINUS: Parser.parse_infix_expression,
+    token.TokenCode.SLASH: Parser.parse_infix_expression,
+    token.TokenCode.ASTERISK: Parser.parse_infix_expression,
+    token.TokenCode.EQ: Parser.parse_infix_expression,
+    token.TokenCode.NOT_EQ: Parser.parse_infix_expression,
+    token.TokenCode.LT: Parser.parse_infix_expression,
+    token.TokenCode.GT: Parser.parse_infix_expression,
+    token.TokenCode.LPAREN: Parser.parse_call_expression,
+    token.TokenCode.LBRACKET: Parser.parse_index_expression,
+}
@@ -1,29 +1,37 @@
 """
 ipython -i .\src\repl.py
 ipython .\src\repl.py
+ipython .\src\repl.py --unboxed
+ipython .\src\repl.py --optimize
 """
 from src.token import Token, TokenType, TokenTypes
 from src import lexer
 from src import parser
 from src import evaluator
 from src import object
+from src import optimizer
+from src import unboxed as unboxed_evaluator
+import sys
 
 PROMPT = ">> "
 
 
-def main():
+def main(unboxed: bool = False, optimize: bool = False):
     print(
         "Hello, welcome to the REPL for the Monkey \
           programming language."
     )
     env = object.new_environment()
     while True:
-        parse_line(env)
+        parse_line(env, unboxed, optimize)
 
 
-def parse_line(env: object.Environment):
+def parse_line(
+    env: object.Environment, unboxed: bool = False, optimize: bool = False
+):
     """
-    Parse and evaluate a single line
+    Parse and evaluate a single line, with the 'unboxed' evaluator if
+    'unboxed' is set, after the 'optimizer' if 'optimize' is set.
     """
     line = input(PROMPT)
 
@@ -31,8 +39,13 @@ def parse_line(env: object.Environment):
     p: parser.Parser = parser.Parser.new(l)
 
     program = p.parse_program()
+    if optimize:
+        optimizer.optimize(program)
 
-    result = evaluator.eval(program, env)
+    if unboxed:
+        result = unboxed_evaluator.box(unboxed_evaluator.eval(program, env))
+    else:
+        result = evaluator.eval(program, env)
     if result is not None:
         print(result.inspect())
 
@@ -80,4 +93,4 @@ True
 >> fullName(firstName, lastName);
 """
 if __name__ == "__main__":
-    main()
+    main(unboxed="--unboxed" in sys.argv, optimize="--optimize" in sys.argv)
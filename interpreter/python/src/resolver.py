@@ -0,0 +1,215 @@
+"""
+Resolve the variables of a program before it is evaluated.
+
+'evaluator.eval_identifier' looks a name up in every Environment from the
+innermost one outwards, with a dict lookup at every level, and then looks
+for a builtin of that name. The resolver does that work once per
+identifier:
+
+- the parameters and 'let' names of every function get a place in the
+  object.Frame of a call: a slot in a list, or a Cell when a function
+  inside it uses the variable
+- a function captures the cells of the variables of enclosing functions
+  that it, or a function inside it, uses, and nothing else, so a closure
+  does not keep the other variables of the calls around it alive
+- every identifier gets an address, a builtin is resolved to the builtin
+  itself, any other name to the places it can be bound in
+
+The top level has no slots, its variables stay in the store of the
+Environment the program is evaluated in, so a REPL can keep adding to it.
+"""
+from __future__ import annotations
+from src import ast
+from src import object
+from src.evaluator import BUILTINS
+from src.object import CELL, GLOBAL, LOCAL
+from src.ast import children
+from typing import Any
+
+# a (kind, index) pair: a LOCAL slot or a CELL of the Frame, or the GLOBAL
+# Environment with an index of None
+Place = tuple[int, int | None]
+# the places a variable can be bound in, innermost first
+Address = tuple[Place, ...]
+
+
+class Scope:
+    """
+    names: the variables of a function, its parameters first
+    parameters: the names of the parameters
+    outer: the scope of the enclosing function, None at the top level
+    celled: the variables that functions inside this one use
+    free: the variables of enclosing functions that this function captures,
+          by (scope, name), with the index of their cell
+    slots: the number of LOCAL slots of a call
+    places: where a call stores every variable in 'names'
+    parameter_places: the places of the parameters, in order
+    padding: the empty slots after the parameters, when the parameters are
+             the first slots and a call has no cells, None otherwise
+    captures: the index of every variable in 'free' in the cells of a call
+              of the enclosing function
+    """
+
+    def __init__(
+        self, names: dict[str, None], parameters: list[str], outer: Scope | None
+    ):
+        self.names = names
+        self.parameters = parameters
+        self.outer = outer
+        self.celled: set[str] = set()
+        self.free: dict[tuple[Scope, str], int] = {}
+        self.slots = 0
+        self.places: dict[str, Place] = {}
+        self.parameter_places: tuple[Place, ...] = ()
+        self.padding: list[None] | None = None
+        self.captures: tuple[int, ...] = ()
+
+    @staticmethod
+    def new(function: ast.FunctionLiteral, outer: Scope | None) -> Scope:
+        """
+        The scope of a function: its parameters and the names of the 'let'
+        statements in its body, not those in the functions inside it.
+        """
+        parameters = [parameter.value for parameter in function.parameters]
+        names = dict.fromkeys(parameters)
+        stack: list[Any] = [function.body]
+        while stack:
+            node = stack.pop()
+            if node is None or type(node) is ast.FunctionLiteral:
+                continue
+            if type(node) is ast.LetStatement:
+                names.setdefault(node.name.value)
+            push_children(stack, node)
+        return Scope(names=names, parameters=parameters, outer=outer)
+
+    @property
+    def cells(self) -> int:
+        """
+        The number of cells of a call, the captured ones first.
+        """
+        return len(self.free) + len(self.celled)
+
+    def new_slot(self) -> int:
+        """
+        Add a LOCAL slot to the calls of the function, for a value that is
+        not a variable. Returns its index.
+        """
+        if self.padding is not None:
+            self.padding.append(None)
+        self.slots += 1
+        return self.slots - 1
+
+    def capture(self, owner: Scope, name: str) -> None:
+        """
+        Capture a variable of the enclosing function 'owner' in this
+        function and in every function between the two.
+        """
+        owner.celled.add(name)
+        scope = self
+        while scope is not owner:
+            scope.free.setdefault((owner, name), len(scope.free))
+            scope = scope.outer
+
+    def place_variables(self) -> None:
+        """
+        Give every variable a place and find the captured cells in the
+        enclosing function, which must have its places already.
+        """
+        cell = len(self.free)
+        for name in self.names:
+            if name in self.celled:
+                self.places[name] = (CELL, cell)
+                cell += 1
+            else:
+                self.places[name] = (LOCAL, self.slots)
+                self.slots += 1
+        self.parameter_places = tuple(self.places[name] for name in self.parameters)
+        if self.cells == 0 and len(self.parameters) == len(set(self.parameters)):
+            self.padding = [None] * (self.slots - len(self.parameters))
+        captures = []
+        for owner, name in self.free:
+            if owner is self.outer:
+                captures.append(owner.places[name][1])
+            else:
+                captures.append(self.outer.free[(owner, name)])
+        self.captures = tuple(captures)
+
+
+def push_children(stack: list[Any], node: Any) -> None:
+    stack.extend(children(node))
+
+
+def address(name: str, scope: Scope | None) -> Address | object.Builtin:
+    """
+    A builtin, or every scope that binds the name, ending with the top
+    level. A place can still be empty when it is read, the variable is then
+    looked up further out, like 'Environment.get' does.
+    """
+    builtin = BUILTINS.get(name)
+    if builtin is not None:
+        return builtin
+    places = []
+    owner = scope
+    while owner is not None:
+        if name in owner.names:
+            if owner is scope:
+                places.append(owner.places[name])
+            else:
+                places.append((CELL, scope.free[(owner, name)]))
+        owner = owner.outer
+    places.append((GLOBAL, None))
+    return tuple(places)
+
+
+def resolve(program: ast.Program) -> ast.Program:
+    """
+    Give every identifier in the program an address and every function
+    body a Scope, in place. Returns the program.
+    """
+    scopes: list[Scope] = []
+    identifiers: list[tuple[ast.Identifier, Scope | None]] = []
+    definitions: list[tuple[ast.Identifier, Scope | None]] = []
+    stack: list[tuple[Any, Scope | None]] = [
+        (statement, None) for statement in program.statements
+    ]
+    while stack:
+        node, scope = stack.pop()
+        match type(node):
+            case ast.Identifier:
+                identifiers.append((node, scope))
+            case ast.LetStatement:
+                definitions.append((node.name, scope))
+                stack.append((node.value, scope))
+            case ast.FunctionLiteral:
+                inner = Scope.new(node, scope)
+                scopes.append(inner)
+                if node.body is not None:
+                    node.body.scope = inner
+                    stack.append((node.body, inner))
+            case _:
+                if node is not None:
+                    children: list[Any] = []
+                    push_children(children, node)
+                    stack.extend((child, scope) for child in children)
+
+    # the variables of enclosing functions that are used
+    for identifier, scope in identifiers:
+        if identifier.value in BUILTINS or scope is None:
+            continue
+        owner = scope.outer
+        while owner is not None:
+            if identifier.value in owner.names:
+                scope.capture(owner, identifier.value)
+            owner = owner.outer
+
+    # an enclosing function is found before the functions inside it
+    for scope in scopes:
+        scope.place_variables()
+    for identifier, scope in identifiers:
+        identifier.address = address(identifier.value, scope)
+    for name, scope in definitions:
+        if scope is None:
+            name.address = ((GLOBAL, None),)
+        else:
+            name.address = (scope.places[name.value],)
+    return program
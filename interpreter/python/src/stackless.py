@@ -0,0 +1,300 @@
+"""
+An evaluator that does not recurse.
+
+'evaluator.eval' evaluates the sub nodes of a node and the body of a
+called function with Python calls, so a deep Monkey recursion raises a
+RecursionError, tail calls aside. The stackless evaluator gives the same
+results and output, but keeps the pending evaluations on a list:
+
+- every node that has sub nodes is evaluated by a generator that yields
+  a (node, env) pair for every sub node it needs, or the generator of a
+  call or of a list of arguments
+- 'Evaluation.run' runs the innermost generator on the stack, pushes the
+  generators of the nodes it asks for and sends their values back
+
+The depth of a recursion is then only bounded by memory. The state of an
+evaluation is its stack, so 'run' can stop after a number of steps and
+be called again later to continue where it stopped.
+
+The builtins are called as Python functions, as in the evaluator.
+"""
+from __future__ import annotations
+from src import ast
+from src import evaluator
+from src import object
+from src.evaluator import (
+    common_value,
+    eval_identifier,
+    eval_index_expression,
+    eval_infix_expression,
+    eval_prefix_expression,
+    extended_function_env,
+    is_error,
+    is_truthy,
+    new_closure,
+    release_function_env,
+    set_common_value,
+    set_variable,
+    unwrap_return_value,
+)
+from typing import Any, Callable, Generator
+
+Steps = Generator[Any, Any, Any]
+
+
+class Evaluation:
+    """
+    stack: the generators of the nodes that are being evaluated, the
+           innermost last
+    value: the value that is sent to the innermost generator next
+    steps: the number of steps taken so far
+    """
+
+    def __init__(self, stack: list[Steps], value: Any = None, steps: int = 0):
+        self.stack = stack
+        self.value = value
+        self.steps = steps
+
+    @staticmethod
+    def new(program: ast.Program, env: object.Environment) -> Evaluation:
+        return Evaluation(stack=[program_steps(program, env)])
+
+    @property
+    def done(self) -> bool:
+        return not self.stack
+
+    @property
+    def result(self) -> object.Object | None:
+        """
+        The value of the program, once the evaluation is done.
+        """
+        if self.stack:
+            raise ValueError("the evaluation is not done")
+        return self.value
+
+    def run(self, steps: int | None = None) -> bool:
+        """
+        Take at most 'steps' steps, or run to the end without a limit.
+        Returns whether the evaluation is done.
+        """
+        stack = self.stack
+        value = self.value
+        limit = None if steps is None else self.steps + steps
+        taken = self.steps
+        try:
+            while stack:
+                if taken == limit:
+                    return False
+                taken += 1
+                try:
+                    request = stack[-1].send(value)
+                except StopIteration as stop:
+                    stack.pop()
+                    value = stop.value
+                    continue
+                if type(request) is not tuple:
+                    # the generator of a call or of a list of arguments
+                    stack.append(request)
+                    value = None
+                    continue
+                node, env = request
+                leaf = LEAVES.get(type(node))
+                if leaf is not None:
+                    value = leaf(node, env)
+                    continue
+                node_steps = STEPS.get(type(node))
+                if node_steps is None:
+                    value = None
+                    continue
+                stack.append(node_steps(node, env))
+                value = None
+            return True
+        finally:
+            self.value = value
+            self.steps = taken
+
+
+def eval_stackless(
+    program: ast.Program, env: object.Environment
+) -> object.Object | None:
+    """
+    'evaluator.eval_program' without recursion.
+    """
+    evaluation = Evaluation.new(program, env)
+    evaluation.run()
+    return evaluation.result
+
+
+def program_steps(program: ast.Program, env: object.Environment) -> Steps:
+    """
+    The top level statements, the evaluation stops after a return
+    statement or an error, as in 'evaluator.eval_each'.
+    """
+    result = None
+    for statement in program.statements:
+        result = yield statement, env
+        if type(result) == object.ReturnValue:
+            return result.value
+        if type(result) == object.Error:
+            return result
+    return result
+
+
+def block_steps(block: ast.BlockStatement, env: object.Environment) -> Steps:
+    result = None
+    for statement in block.statements:
+        result = yield statement, env
+        if type(result) == object.ReturnValue:
+            return result.value
+    return result
+
+
+def let_statement_steps(node: ast.LetStatement, env: object.Environment) -> Steps:
+    val = yield node.value, env
+    if is_error(val):
+        return val
+    set_variable(node.name, val, env)
+    return None
+
+
+def return_statement_steps(node: ast.ReturnStatement, env: object.Environment) -> Steps:
+    val = yield node.return_value, env
+    if is_error(val):
+        return val
+    return object.ReturnValue(value=val)
+
+
+def expression_statement_steps(
+    node: ast.ExpressionStatement, env: object.Environment
+) -> Steps:
+    return (yield node.expression, env)
+
+
+def prefix_expression_steps(
+    node: ast.PrefixExpression, env: object.Environment
+) -> Steps:
+    right = yield node.right, env
+    if is_error(right):
+        return right
+    return eval_prefix_expression(node.operator, right)
+
+
+def infix_expression_steps(node: ast.InfixExpression, env: object.Environment) -> Steps:
+    left = yield node.left, env
+    if is_error(left):
+        return left
+    right = yield node.right, env
+    if is_error(right):
+        return right
+    return eval_infix_expression(node.operator, left, right)
+
+
+def if_expression_steps(node: ast.IfExpression, env: object.Environment) -> Steps:
+    condition = yield node.condition, env
+    if is_error(condition):
+        return condition
+    if is_truthy(condition):
+        return (yield node.consequence, env)
+    elif node.alternative is not None:
+        return (yield node.alternative, env)
+    return None
+
+
+def expressions_steps(exps: list[ast.Expression], env: object.Environment) -> Steps:
+    """
+    'evaluator.eval_expressions', an error is handled the same way.
+    """
+    result: list[object.Object] = []
+    for e in exps:
+        evaluated = yield e, env
+        if is_error(evaluated):
+            return [object.Object(evaluated)]
+        result.append(evaluated)
+    return result
+
+
+def call_expression_steps(node: ast.CallExpression, env: object.Environment) -> Steps:
+    func = yield node.function, env
+    if is_error(func):
+        return func
+    args = yield expressions_steps(node.arguments, env)
+    if len(args) == 1 and is_error(args[0]):
+        return args[0]
+    if node.tail:
+        return object.TailCall(function=func, arguments=args)
+    return (yield call_steps(func, args))
+
+
+def call_steps(func: object.Object, args: list[object.Object]) -> Steps:
+    """
+    'evaluator.apply_function', the body of the function is evaluated on
+    the stack of the evaluation.
+    """
+    while True:
+        if type(func) == object.Builtin:
+            return func.fn(*args)
+        extended_env = extended_function_env(func, args)
+        evaluated = yield func.body, extended_env
+        release_function_env(func, extended_env)
+        if type(evaluated) is not object.TailCall:
+            return unwrap_return_value(evaluated)
+        func = evaluated.function
+        args = evaluated.arguments
+
+
+def array_literal_steps(node: ast.ArrayLiteral, env: object.Environment) -> Steps:
+    elements = yield expressions_steps(node.elements, env)
+    if len(elements) == 1 and is_error(elements[0]):
+        return elements[0]
+    return object.Array(elements=elements)
+
+
+def index_expression_steps(node: ast.IndexExpression, env: object.Environment) -> Steps:
+    left = yield node.left, env
+    if is_error(left):
+        return left
+    index = yield node.index, env
+    if is_error(index):
+        return index
+    return eval_index_expression(left, index)
+
+
+def common_expression_steps(
+    node: ast.CommonExpression, env: object.Environment
+) -> Steps:
+    val = common_value(node, env)
+    if val is None:
+        val = yield node.expression, env
+        set_common_value(node, env, val)
+    return val
+
+
+def function_literal(
+    node: ast.FunctionLiteral, env: object.Environment
+) -> object.Function:
+    if getattr(node.body, "scope", None) is not None:
+        return new_closure(node, env)
+    return object.Function(parameters=node.parameters, env=env, body=node.body)
+
+
+# the nodes that are evaluated without a generator
+LEAVES: dict[type, Callable[[Any, object.Environment], Any]] = {
+    ast.IntegerLiteral: evaluator.eval,
+    ast.StringLiteral: evaluator.eval,
+    ast.Boolean: evaluator.eval,
+    ast.Identifier: eval_identifier,
+    ast.FunctionLiteral: function_literal,
+}
+STEPS: dict[type, Callable[[Any, object.Environment], Steps]] = {
+    ast.BlockStatement: block_steps,
+    ast.LetStatement: let_statement_steps,
+    ast.ReturnStatement: return_statement_steps,
+    ast.ExpressionStatement: expression_statement_steps,
+    ast.PrefixExpression: prefix_expression_steps,
+    ast.InfixExpression: infix_expression_steps,
+    ast.IfExpression: if_expression_steps,
+    ast.CallExpression: call_expression_steps,
+    ast.ArrayLiteral: array_literal_steps,
+    ast.IndexExpression: index_expression_steps,
+    ast.CommonExpression: common_expression_steps,
+}
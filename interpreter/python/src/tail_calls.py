@@ -0,0 +1,55 @@
+"""
+Find the calls in tail position.
+
+The value of a call in tail position is the value of the call of the
+function it is in, so the evaluator does not have to call it from within
+that call. A marked call evaluates its function and arguments and hands
+them to 'apply_function' as an object.TailCall, which runs it in a loop
+after the current call returned. Tail recursion then runs in constant
+Python stack, instead of raising a RecursionError after a few hundred
+calls.
+
+A call is in tail position when it is, or is returned by, the last
+statement of the body of a function, or of a block of an if expression
+in tail position. A return statement that is not the last statement of
+its block is not: an error it evaluates to does not stop the block, so
+the statements after it still run.
+"""
+from __future__ import annotations
+from src import ast
+from src.escape_analysis import nodes
+from typing import Iterator
+
+
+def tail_calls(function: ast.FunctionLiteral) -> Iterator[ast.CallExpression]:
+    """
+    Yield the calls in tail position in the body of the function.
+    """
+    blocks = [function.body]
+    while blocks:
+        block = blocks.pop()
+        if block is None or not block.statements:
+            continue
+        statement = block.statements[-1]
+        if type(statement) is ast.ExpressionStatement:
+            expression = statement.expression
+        elif type(statement) is ast.ReturnStatement:
+            expression = statement.return_value
+        else:
+            continue
+        if type(expression) is ast.CallExpression:
+            yield expression
+        elif type(expression) is ast.IfExpression:
+            blocks.append(expression.consequence)
+            blocks.append(expression.alternative)
+
+
+def mark(program: ast.Program) -> ast.Program:
+    """
+    Mark every call in tail position, in place. Returns the program.
+    """
+    for node in nodes(program):
+        if type(node) is ast.FunctionLiteral:
+            for call in tail_calls(node):
+                call.tail = True
+    return program
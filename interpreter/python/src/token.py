@@ -1,19 +1,26 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
 
 
 TokenType = str  # the type of the token
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     """
     The way a token is represented by our Lexer.
+
+    'code' is the TokenCode of its Type, looked up once when the token is
+    made, so the parser can dispatch on it.
     """
 
     Type: TokenType
     Literal: str
+    code: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.code = TOKEN_CODES[self.Type]
 
 
 class TokenTypes(str, Enum):
@@ -77,3 +84,96 @@ def lookup_identifier(identifier: str) -> TokenTypes:
         return result
     else:
         return TokenTypes.IDENT
+
+
+class TokenCode(IntEnum):
+    """
+    Small integer codes for the token types, used by the compact token
+    representations.
+    """
+
+    ILLEGAL = 0
+    EOF = 1
+    IDENT = 2
+    INT = 3
+    ASSIGN = 4
+    PLUS = 5
+    MINUS = 6
+    BANG = 7
+    ASTERISK = 8
+    SLASH = 9
+    LT = 10
+    GT = 11
+    EQ = 12
+    NOT_EQ = 13
+    COMMA = 14
+    SEMICOLON = 15
+    LPAREN = 16
+    RPAREN = 17
+    LBRACE = 18
+    RBRACE = 19
+    LBRACKET = 20
+    RBRACKET = 21
+    FUNCTION = 22
+    LET = 23
+    TRUE = 24
+    FALSE = 25
+    IF = 26
+    ELSE = 27
+    RETURN = 28
+    STRING = 29
+
+
+# The code of a token Type, TokenTypes members and their values map to
+# the same code.
+TOKEN_CODES: dict[TokenType, TokenCode] = {
+    TokenTypes[code.name]: code for code in TokenCode
+}
+
+# Codes of the tokens for which the Lexer uses the value of the TokenTypes
+# member as Type, instead of the member itself.
+VALUE_TYPED_CODES = frozenset(
+    {
+        TokenCode.EOF,
+        TokenCode.ASSIGN,
+        TokenCode.PLUS,
+        TokenCode.MINUS,
+        TokenCode.BANG,
+        TokenCode.ASTERISK,
+        TokenCode.SLASH,
+        TokenCode.LT,
+        TokenCode.EQ,
+        TokenCode.NOT_EQ,
+        TokenCode.COMMA,
+        TokenCode.SEMICOLON,
+        TokenCode.LPAREN,
+        TokenCode.RPAREN,
+        TokenCode.LBRACE,
+        TokenCode.RBRACE,
+        TokenCode.LBRACKET,
+        TokenCode.RBRACKET,
+    }
+)
+
+# The Type that the Lexer gives to a token, indexed by its code.
+TOKEN_TYPES: tuple[TokenType, ...] = tuple(
+    TokenTypes[code.name].value if code in VALUE_TYPED_CODES else TokenTypes[code.name]
+    for code in TokenCode
+)
+
+
+@dataclass(slots=True)
+class CompactToken:
+    """
+    A token that stores its TokenCode instead of its Type.
+
+    It has the same 'Type' and 'Literal' as the Token that the Lexer
+    produces, so the parser accepts both.
+    """
+
+    code: int
+    Literal: str | None
+
+    @property
+    def Type(self) -> TokenType:
+        return TOKEN_TYPES[self.code]
@@ -0,0 +1,639 @@
+"""
+Transpile an ast.Program to Python source code and run it with exec.
+
+Monkey values are represented by native Python values inside the generated
+code (int, str, bool, list and Python functions) and are boxed into
+object.* types when they leave the program. Errors are raised as a
+'MonkeyError' and handled with try/except at the same statement boundaries
+where 'evaluator.eval' stops passing an error on.
+
+Every 'let' becomes a Python local of the function it appears in. Because
+object.Environment.get falls back to the enclosing environment while a
+binding is missing or None, those locals start out as None and every read
+of one falls back to the next enclosing binding of the same name. A 'let'
+of the program itself is also written to the object.Environment, so the
+next program that runs in it sees the binding, as with the evaluator.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from types import CodeType
+from typing import Any, Callable
+from src import ast
+from src import object
+from src import evaluator
+from src.lexer import Lexer
+from src.parser import Parser
+
+
+class TranspileError(Exception):
+    pass
+
+
+class MonkeyError(Exception):
+    """
+    Carries an object.Error through the generated Python code.
+    """
+
+    def __init__(self, error: object.Error):
+        super().__init__(error.message)
+        self.error = error
+
+
+PROGRAM_FUNCTION = "__program"
+FAST_INFIX_OPERATORS = {"+", "-", "*", "/", "<", ">", "==", "!="}
+
+
+# runtime support for the generated code
+
+
+def box(
+    value: Any,
+    literals: dict[CodeType, ast.FunctionLiteral] | None = None,
+    env: object.Environment | None = None,
+):
+    """
+    Convert a native value of the generated code to an object.Object.
+
+    A function of the program becomes an object.Function of its literal,
+    in 'env' or in a new environment.
+    """
+    value_type = type(value)
+    if value_type is bool:
+        return evaluator.TRUE if value else evaluator.FALSE
+    if value_type is int or value_type is float:
+        return object.Integer(value=value)
+    if value_type is str:
+        return object.String(value=value)
+    if value_type is list:
+        return object.Array(elements=[box(item, literals, env) for item in value])
+    if value is None or isinstance(value, object.Object):
+        return value
+    builtin = getattr(value, "builtin", None)
+    if builtin is not None:
+        return builtin
+    code = getattr(value, "__code__", None)
+    literal = literals.get(code) if literals and code is not None else None
+    if literal is not None:
+        return object.Function(
+            parameters=literal.parameters,
+            body=literal.body,
+            env=env if env is not None else object.new_environment(),
+        )
+    return object.Builtin(
+        fn=lambda *args: box(value(*[unbox(a, literals) for a in args]), literals, env)
+    )
+
+
+def unbox(obj: Any, literals: dict[CodeType, ast.FunctionLiteral] | None = None):
+    """
+    Convert an object.Object to a native value, raising errors.
+    """
+    obj_type = type(obj)
+    if obj_type is object.Integer or obj_type is object.String:
+        return obj.value
+    if obj_type is object.Boolean:
+        return obj.value
+    if obj_type is object.Error:
+        raise MonkeyError(obj)
+    if obj_type is object.Array:
+        return [unbox(item, literals) for item in obj.elements]
+    if obj_type is object.Builtin:
+        return wrap_builtin(obj, literals)
+    if isinstance(obj, object.Function):
+
+        def call_evaluated_function(*args):
+            evaluated = evaluator.apply_function(obj, [box(a, literals) for a in args])
+            return unbox(evaluated, literals)
+
+        return call_evaluated_function
+    return obj
+
+
+def wrap_builtin(
+    builtin: object.Builtin,
+    literals: dict[CodeType, ast.FunctionLiteral] | None = None,
+) -> Callable:
+    def call_builtin(*args):
+        return unbox(builtin.fn(*[box(a, literals) for a in args]), literals)
+
+    call_builtin.builtin = builtin
+    return call_builtin
+
+
+def infix(operator: str, left: Any, right: Any, literals=None) -> Any:
+    return unbox(
+        evaluator.eval_infix_expression(
+            operator, box(left, literals), box(right, literals)
+        ),
+        literals,
+    )
+
+
+def prefix(operator: str, right: Any, literals=None) -> Any:
+    return unbox(
+        evaluator.eval_prefix_expression(operator, box(right, literals)), literals
+    )
+
+
+def index(left: Any, idx: Any, literals=None) -> Any:
+    if type(left) is list and type(idx) is int:
+        if idx < 0 or idx > len(left):
+            return None
+        return left[idx]
+    return unbox(
+        evaluator.eval_index_expression(box(left, literals), box(idx, literals)),
+        literals,
+    )
+
+
+def lookup_global(env: object.Environment, name: str, literals=None) -> Any:
+    value = env.get(name)
+    if value is None:
+        raise MonkeyError(evaluator.new_error(f"identifier not found: {name}"))
+    return unbox(value, literals)
+
+
+def initial_value(env: object.Environment, name: str, literals=None) -> Any:
+    value = env.get(name)
+    if value is None:
+        return None
+    return unbox(value, literals)
+
+
+def define(env: object.Environment, name: str, value: Any, literals=None) -> None:
+    """
+    Bind a 'let' of the program in its environment, like 'evaluator.eval'.
+    """
+    env.set(name, box(value, literals, env))
+
+
+def runtime(literals: dict[CodeType, ast.FunctionLiteral]) -> dict[str, Any]:
+    """
+    The names the generated code of a program uses. The helpers box the
+    functions of the program with its literals, so they are reported as
+    functions and not as builtins.
+    """
+    return {
+        "_MonkeyError": MonkeyError,
+        "_FALSE": False,
+        "_infix": partial(infix, literals=literals),
+        "_prefix": partial(prefix, literals=literals),
+        "_index": partial(index, literals=literals),
+        "_global": partial(lookup_global, literals=literals),
+        "_initial": partial(initial_value, literals=literals),
+        "_define": partial(define, literals=literals),
+        **{
+            f"_builtin_{name}": wrap_builtin(b, literals)
+            for name, b in evaluator.BUILTINS.items()
+        },
+    }
+
+
+# code generation
+
+
+@dataclass
+class Scope:
+    """
+    The bindings of one Monkey function, or of the program itself.
+    """
+
+    id: int
+    parameters: set[str] = field(default_factory=set)
+    lets: set[str] = field(default_factory=set)
+
+    def python_name(self, name: str) -> str:
+        return f"v{self.id}_{name}"
+
+
+def child_nodes(node: ast.Node) -> list[ast.Node]:
+    match type(node):
+        case ast.LetStatement:
+            return [node.value]
+        case ast.ReturnStatement:
+            return [node.return_value]
+        case ast.ExpressionStatement:
+            return [node.expression]
+        case ast.BlockStatement:
+            return list(node.statements)
+        case ast.PrefixExpression:
+            return [node.right]
+        case ast.InfixExpression:
+            return [node.left, node.right]
+        case ast.IfExpression:
+            return [node.condition, node.consequence, node.alternative]
+        case ast.CallExpression:
+            return [node.function, *node.arguments]
+        case ast.ArrayLiteral:
+            return list(node.elements)
+        case ast.IndexExpression:
+            return [node.left, node.index]
+        case ast.CommonExpression:
+            return [node.expression]
+    return []
+
+
+def collect_lets(node: ast.Node | None, names: set[str]) -> set[str]:
+    """
+    Collect the names bound by 'let' in a node, without entering
+    function literals, which get a scope of their own.
+    """
+    if node is None or type(node) == ast.FunctionLiteral:
+        return names
+    if type(node) == ast.LetStatement:
+        names.add(node.name.value)
+    for child in child_nodes(node):
+        collect_lets(child, names)
+    return names
+
+
+class Transpiler:
+    def __init__(self):
+        self.lines: list[str] = []
+        self.indent = 0
+        self.scopes: list[Scope] = []
+        self.counter = 0
+        self.literals: dict[str, ast.FunctionLiteral] = {}
+
+    @staticmethod
+    def new() -> Transpiler:
+        return Transpiler()
+
+    def emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def transpile_program(self, program: ast.Program) -> str:
+        """
+        Return the Python source of a module that defines the program
+        as a function taking an object.Environment.
+        """
+        scope = Scope(id=0)
+        for statement in program.statements:
+            collect_lets(statement, scope.lets)
+        self.scopes.append(scope)
+
+        self.emit(f"def {PROGRAM_FUNCTION}(_env):")
+        self.indent += 1
+        for name in sorted(scope.lets):
+            self.emit(f"{scope.python_name(name)} = _initial(_env, {name!r})")
+        self.emit("try:")
+        self.indent += 1
+        statements = program.statements
+        for idx, statement in enumerate(statements):
+            if idx == len(statements) - 1 or type(statement) == ast.ReturnStatement:
+                self.compile_statement(statement, "return")
+                break
+            self.compile_statement(statement, None)
+        else:
+            self.emit("return None")
+        self.indent -= 1
+        self.emit("except _MonkeyError as err:")
+        self.emit("    return err.error")
+        self.indent -= 1
+        self.scopes.pop()
+        return "\n".join(self.lines) + "\n"
+
+    def compile_block(self, statements: list[ast.Statement], target: str | None):
+        """
+        Emit the statements of a block. The value of the block is handed to
+        the target: 'return', the name of a variable, or None to discard it.
+
+        An error in a statement that is not the last one is discarded, and
+        a 'return' that is not the last statement skips the rest of the
+        block unless its value is an error.
+        """
+        if not statements:
+            self.emit_target(target, "None")
+            return
+        for idx, statement in enumerate(statements):
+            if idx == len(statements) - 1:
+                self.compile_statement(statement, target)
+                return
+            if is_constant(statement):
+                continue
+            self.emit("try:")
+            self.indent += 1
+            if type(statement) == ast.ReturnStatement:
+                self.compile_statement(statement, target)
+                self.indent -= 1
+                self.emit("except _MonkeyError:")
+                self.indent += 1
+                self.compile_block(statements[idx + 1 :], target)
+                self.indent -= 1
+                return
+            self.compile_statement(statement, None)
+            self.indent -= 1
+            self.emit("except _MonkeyError:")
+            self.emit("    pass")
+
+    def compile_statement(self, node: ast.Statement, target: str | None) -> None:
+        match type(node):
+            case ast.LetStatement:
+                scope = self.scopes[-1]
+                name = scope.python_name(node.name.value)
+                self.compile_value(node.value, name)
+                if scope.id == 0:
+                    self.emit(f"_define(_env, {node.name.value!r}, {name})")
+                if target is not None:
+                    self.emit_target(target, "None")
+            case ast.ReturnStatement:
+                self.compile_value(node.return_value, target)
+            case ast.ExpressionStatement:
+                self.compile_value(node.expression, target)
+            case _:
+                self.compile_value(node, target)
+
+    def compile_value(self, node: ast.Expression | None, target: str | None):
+        if type(node) == ast.IfExpression and not self.is_inline_if(node):
+            self.compile_if_statement(node, target)
+        else:
+            self.emit_target(target, self.compile_expression(node))
+
+    def emit_target(self, target: str | None, value: str) -> None:
+        if target == "return":
+            self.emit(f"return {value}")
+        elif target is not None:
+            self.emit(f"{target} = {value}")
+        elif value == "None":
+            self.emit("pass")
+        else:
+            self.emit(value)
+
+    def compile_if_statement(self, node: ast.IfExpression, target: str | None):
+        self.emit(f"if {self.compile_condition(node.condition)}:")
+        self.indent += 1
+        self.compile_block(block_statements(node.consequence), target)
+        self.indent -= 1
+        self.emit("else:")
+        self.indent += 1
+        if node.alternative is not None:
+            self.compile_block(node.alternative.statements, target)
+        else:
+            self.emit_target(target, "None")
+        self.indent -= 1
+
+    def is_inline_if(self, node: ast.IfExpression) -> bool:
+        """
+        An if expression can be a Python conditional expression when its
+        blocks hold at most a single expression.
+        """
+        for block in (node.consequence, node.alternative):
+            statements = block_statements(block)
+            if len(statements) > 1:
+                return False
+            if statements and type(statements[0]) == ast.LetStatement:
+                return False
+            if statements and type(statement_value(statements[0])) == ast.IfExpression:
+                if not self.is_inline_if(statement_value(statements[0])):
+                    return False
+        return True
+
+    def compile_expression(self, node: ast.Expression | None) -> str:
+        match type(node):
+            case ast.IntegerLiteral:
+                return repr(node.value)
+            case ast.StringLiteral:
+                return repr(node.value)
+            case ast.Boolean:
+                return "True" if node.value else "False"
+            case ast.Identifier:
+                return self.compile_identifier(node.value)
+            case ast.PrefixExpression:
+                return self.compile_prefix_expression(node)
+            case ast.InfixExpression:
+                return self.compile_infix_expression(node)
+            case ast.IfExpression:
+                return self.compile_if_expression(node)
+            case ast.FunctionLiteral:
+                return self.compile_function_literal(node)
+            case ast.CallExpression:
+                function = self.compile_expression(node.function)
+                arguments = [self.compile_expression(a) for a in node.arguments]
+                return f"{function}({', '.join(arguments)})"
+            case ast.ArrayLiteral:
+                elements = [self.compile_expression(e) for e in node.elements]
+                return f"[{', '.join(elements)}]"
+            case ast.IndexExpression:
+                left = self.compile_expression(node.left)
+                idx = self.compile_expression(node.index)
+                return f"_index({left}, {idx})"
+            case ast.CommonExpression:
+                # the expression is pure, the generated code computes it at
+                # every use
+                return self.compile_expression(node.expression)
+        if node is not None:
+            raise TranspileError(f"cannot transpile {type(node).__name__}")
+        # missing nodes, left behind by parse errors, evaluate to None
+        return "None"
+
+    def compile_identifier(self, name: str) -> str:
+        """
+        Resolve a name the way object.Environment.get does: the innermost
+        scope that has a binding for it wins, and a 'let' that has not run
+        yet falls back to the enclosing scopes.
+        """
+        if name in evaluator.BUILTINS:
+            return f"_builtin_{name}"
+        fallback = f"_global(_env, {name!r})"
+        lookups: list[str] = []
+        for scope in reversed(self.scopes):
+            if name in scope.parameters:
+                fallback = scope.python_name(name)
+                break
+            if name in scope.lets:
+                lookups.append(scope.python_name(name))
+        result = fallback
+        for python_name in reversed(lookups):
+            result = f"({python_name} if {python_name} is not None else {result})"
+        return result
+
+    def compile_prefix_expression(self, node: ast.PrefixExpression) -> str:
+        right = self.compile_expression(node.right)
+        temp = self.unique("_t")
+        if node.operator == "-":
+            return (
+                f"(-{temp} if type({temp} := {right}) is int else _prefix('-', {temp}))"
+            )
+        if node.operator == "!":
+            return (
+                f"((not {temp}) if type({temp} := {right}) in (bool, int)"
+                f" else _prefix('!', {temp}))"
+            )
+        return f"_prefix({node.operator!r}, {right})"
+
+    def compile_infix_expression(self, node: ast.InfixExpression) -> str:
+        left = self.compile_expression(node.left)
+        right = self.compile_expression(node.right)
+        operator = node.operator
+        if operator not in FAST_INFIX_OPERATORS:
+            return f"_infix({operator!r}, {left}, {right})"
+        # integer literals need neither a temporary nor a type check
+        checks: list[str] = []
+        operands: list[str] = []
+        for operand, source in ((node.left, left), (node.right, right)):
+            if type(operand) == ast.IntegerLiteral:
+                operands.append(source)
+                continue
+            temp = self.unique("_t")
+            checks.append(f"(type({temp} := {source}) is int)")
+            operands.append(temp)
+        left, right = operands
+        if not checks:
+            return f"({left} {operator} {right})"
+        return (
+            f"({left} {operator} {right} if {' & '.join(checks)}"
+            f" else _infix({operator!r}, {left}, {right}))"
+        )
+
+    def compile_condition(self, node: ast.Expression | None) -> str:
+        """
+        A Python test that follows 'evaluator.is_truthy': only false is falsy.
+        """
+        if type(node) in (ast.IntegerLiteral, ast.StringLiteral, ast.Boolean):
+            return "False" if node.value is False else "True"
+        # a name and not the literal, 'is not' with a literal is a SyntaxWarning
+        return f"({self.compile_expression(node)}) is not _FALSE"
+
+    def compile_if_expression(self, node: ast.IfExpression) -> str:
+        if self.is_inline_if(node):
+            condition = self.compile_condition(node.condition)
+            consequence = self.compile_inline_block(node.consequence)
+            alternative = self.compile_inline_block(node.alternative)
+            return f"({consequence} if {condition} else {alternative})"
+
+        # an if expression with statements inside a larger expression becomes
+        # a nested function that shares the bindings of the current scope
+        name = self.unique("_if")
+        self.emit(f"def {name}():")
+        self.indent += 1
+        lets = collect_lets(node, set())
+        if lets:
+            scope = self.scopes[-1]
+            self.emit(
+                f"nonlocal {', '.join(scope.python_name(n) for n in sorted(lets))}"
+            )
+        self.compile_if_statement(node, "return")
+        self.indent -= 1
+        return f"{name}()"
+
+    def compile_inline_block(self, block: ast.BlockStatement | None) -> str:
+        statements = block_statements(block)
+        if not statements:
+            return "None"
+        return self.compile_expression(statement_value(statements[0]))
+
+    def compile_function_literal(self, node: ast.FunctionLiteral) -> str:
+        parameters = [parameter.value for parameter in node.parameters]
+        if len(set(parameters)) != len(parameters):
+            raise TranspileError("duplicate parameter names")
+        scope = Scope(id=len(self.literals) + 1, parameters=set(parameters))
+        collect_lets(node.body, scope.lets)
+        scope.lets -= scope.parameters
+
+        name = self.unique("_fn")
+        self.literals[name] = node
+        arguments = [scope.python_name(p) for p in parameters] + ["*_"]
+        self.emit(f"def {name}({', '.join(arguments)}):")
+        self.indent += 1
+        for let_name in sorted(scope.lets):
+            self.emit(f"{scope.python_name(let_name)} = None")
+        self.scopes.append(scope)
+        self.compile_block(block_statements(node.body), "return")
+        self.scopes.pop()
+        self.indent -= 1
+        return name
+
+
+def block_statements(block: ast.BlockStatement | None) -> list[ast.Statement]:
+    return block.statements if block is not None else []
+
+
+def statement_value(statement: ast.Statement) -> ast.Expression | None:
+    if type(statement) == ast.ReturnStatement:
+        return statement.return_value
+    if type(statement) == ast.ExpressionStatement:
+        return statement.expression
+    return statement
+
+
+def is_constant(statement: ast.Statement) -> bool:
+    """
+    Statements that can neither fail nor bind a name can be left out
+    when their value is discarded.
+    """
+    return type(statement) == ast.ExpressionStatement and type(
+        statement.expression
+    ) in (ast.IntegerLiteral, ast.StringLiteral, ast.Boolean)
+
+
+@dataclass
+class CompiledProgram:
+    """
+    A transpiled program: the generated source, its code object and the
+    function literals that the nested code objects were generated from.
+    """
+
+    source: str
+    code: CodeType
+    literals: dict[CodeType, ast.FunctionLiteral]
+
+    def run(self, env: object.Environment) -> object.Object:
+        namespace = runtime(self.literals)
+        exec(self.code, namespace)
+        return box(namespace[PROGRAM_FUNCTION](env), self.literals)
+
+
+def nested_code_objects(code: CodeType):
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield const
+            yield from nested_code_objects(const)
+
+
+def compile_program(program: ast.Program) -> CompiledProgram:
+    """
+    Transpile a program and compile the generated source.
+    """
+    transpiler = Transpiler.new()
+    source = transpiler.transpile_program(program)
+    try:
+        code = compile(source, "<monkey>", "exec")
+    except (SyntaxError, RecursionError, MemoryError) as err:
+        raise TranspileError(f"generated code does not compile: {err}") from err
+    literals = {
+        nested: transpiler.literals[nested.co_name]
+        for nested in nested_code_objects(code)
+        if nested.co_name in transpiler.literals
+    }
+    return CompiledProgram(source=source, code=code, literals=literals)
+
+
+@lru_cache(maxsize=128)
+def compile_source(source_code: str) -> CompiledProgram:
+    """
+    Lex, parse and transpile Monkey source code, caching the result
+    so that running the same source again skips all of that.
+    """
+    l: Lexer = Lexer.new(source_code)
+    p: Parser = Parser.new(l)
+    return compile_program(p.parse_program())
+
+
+def interpret(program: ast.Program, env: object.Environment) -> object.Object:
+    """
+    Transpile and run a program, the counterpart of 'evaluator.eval_program'.
+
+    Programs that cannot be transpiled are run by the closure compiler.
+    """
+    try:
+        compiled = compile_program(program)
+    except TranspileError:
+        from src import closure_compiler
+
+        return closure_compiler.interpret(program, env)
+    return compiled.run(env)
@@ -0,0 +1,278 @@
+"""
+An evaluator that does not box integers, strings and booleans.
+
+'evaluator.eval' wraps every integer, string and boolean in an object.*
+instance, so every literal it visits and every sum it computes allocates.
+This evaluator keeps them as Python values instead:
+
+- a Monkey integer is an int, or a float after a '/'
+- a string is a str, a boolean is a bool
+- null, arrays, functions, builtins and errors stay the object.* types,
+  an array holds unboxed elements
+
+Values are boxed with 'box' where they leave the evaluator: the result
+of 'eval_program', the REPL output and the arguments of builtins. An
+Environment holds unboxed values, so it is used with this evaluator
+only.
+
+The results are those of 'evaluator.eval', including the errors: the
+operations on integers, strings and booleans are done here, all others
+are handed to the evaluator with boxed operands.
+"""
+from __future__ import annotations
+from src import ast
+from src import evaluator
+from src import object
+from src.evaluator import (
+    BUILTINS,
+    NULL,
+    common_value,
+    eval_resolved_identifier,
+    extended_function_env,
+    new_closure,
+    new_error,
+    release_function_env,
+    set_common_value,
+    set_variable,
+    unwrap_return_value,
+)
+from typing import Any
+
+TRUE = evaluator.TRUE
+FALSE = evaluator.FALSE
+Error = object.Error
+ReturnValue = object.ReturnValue
+TailCall = object.TailCall
+
+NUMBERS = (int, float)
+
+
+def box(value: Any) -> Any:
+    """
+    The object.* counterpart of an unboxed value.
+    """
+    value_type = type(value)
+    if value_type is bool:
+        return TRUE if value else FALSE
+    if value_type is int or value_type is float:
+        return object.new_integer(value)
+    if value_type is str:
+        return object.new_string(value)
+    if value_type is object.Array:
+        return object.Array(elements=[box(element) for element in value.elements])
+    return value
+
+
+def unbox(obj: Any) -> Any:
+    """
+    The unboxed counterpart of an object.* value.
+    """
+    obj_type = type(obj)
+    if obj_type is object.Integer or obj_type is object.String:
+        return obj.value
+    if obj_type is object.Boolean:
+        return obj.value
+    if obj_type is object.Array:
+        return object.Array(elements=[unbox(element) for element in obj.elements])
+    return obj
+
+
+def eval(node: ast.Node, env: object.Environment) -> Any:
+    """
+    'evaluator.eval' with unboxed values.
+    """
+    match type(node):
+        # statements
+        case ast.Program:
+            return eval_statements(node.statements, env)
+        case ast.LetStatement:
+            val = eval(node.value, env)
+            if type(val) is Error:
+                return val
+            set_variable(node.name, val, env)
+
+        # expression
+        case ast.ExpressionStatement:
+            return eval(node.expression, env)
+        case ast.PrefixExpression:
+            right = eval(node.right, env)
+            if type(right) is Error:
+                return right
+            return eval_prefix_expression(node.operator, right)
+        case ast.InfixExpression:
+            left = eval(node.left, env)
+            if type(left) is Error:
+                return left
+            right = eval(node.right, env)
+            if type(right) is Error:
+                return right
+            return eval_infix_expression(node.operator, left, right)
+        case ast.IntegerLiteral | ast.StringLiteral | ast.Boolean:
+            return node.value
+        case ast.BlockStatement:
+            return eval_statements(node.statements, env)
+        case ast.IfExpression:
+            condition = eval(node.condition, env)
+            if type(condition) is Error:
+                return condition
+            if condition is not False and condition is not NULL:
+                return eval(node.consequence, env)
+            elif node.alternative is not None:
+                return eval(node.alternative, env)
+            return None
+        case ast.ReturnStatement:
+            val = eval(node.return_value, env)
+            if type(val) is Error:
+                return val
+            return ReturnValue(value=val)
+        case ast.Identifier:
+            return eval_identifier(node, env)
+        case ast.CallExpression:
+            func = eval(node.function, env)
+            if type(func) is Error:
+                return func
+            args = eval_expressions(node.arguments, env)
+            if len(args) == 1 and type(args[0]) is Error:
+                return args[0]
+            if node.tail:
+                return TailCall(function=func, arguments=args)
+            return apply_function(func, args)
+        case ast.FunctionLiteral:
+            if getattr(node.body, "scope", None) is not None:
+                return new_closure(node, env)
+            return object.Function(parameters=node.parameters, env=env, body=node.body)
+        case ast.ArrayLiteral:
+            elements = eval_expressions(node.elements, env)
+            if len(elements) == 1 and type(elements[0]) is Error:
+                return elements[0]
+            return object.Array(elements=elements)
+        case ast.IndexExpression:
+            left = eval(node.left, env)
+            if type(left) is Error:
+                return left
+            index = eval(node.index, env)
+            if type(index) is Error:
+                return index
+            return eval_index_expression(left, index)
+        case ast.CommonExpression:
+            val = common_value(node, env)
+            if val is None:
+                val = eval(node.expression, env)
+                set_common_value(node, env, val)
+            return val
+
+    return None
+
+
+def eval_program(program: ast.Program, env: object.Environment) -> object.Object:
+    """
+    'evaluator.eval_program' with unboxed values, the result is boxed.
+    """
+    result = None
+    for statement in program.statements:
+        result = eval(statement, env)
+        if type(result) is ReturnValue:
+            return box(result.value)
+        if type(result) is Error:
+            break
+    return box(result)
+
+
+def eval_statements(statements: list[ast.Statement], env: object.Environment) -> Any:
+    result = None
+    for statement in statements:
+        result = eval(statement, env)
+        if type(result) is ReturnValue:
+            return result.value
+    return result
+
+
+def eval_prefix_expression(operator: str, right: Any) -> Any:
+    right_type = type(right)
+    if operator == "!" and (right_type in NUMBERS or right_type is str):
+        return not right
+    if operator == "!" and right_type is bool:
+        return not right
+    if operator == "-" and right_type in NUMBERS:
+        return -right
+    return unbox(evaluator.eval_prefix_expression(operator, box(right)))
+
+
+def eval_infix_expression(operator: str, left: Any, right: Any) -> Any:
+    left_type = type(left)
+    right_type = type(right)
+    if left_type in NUMBERS and right_type in NUMBERS:
+        match operator:
+            case "+":
+                return left + right
+            case "-":
+                return left - right
+            case "*":
+                return left * right
+            case "/":
+                return left / right
+            case "<":
+                return left < right
+            case ">":
+                return left > right
+            case "==":
+                return left == right
+            case "!=":
+                return left != right
+    elif left_type is str and right_type is str and operator == "+":
+        return left + right
+    elif left_type is bool and right_type is bool:
+        if operator == "==":
+            return left == right
+        if operator == "!=":
+            return left != right
+    # errors, and the operands that are not unboxed
+    return unbox(evaluator.eval_infix_expression(operator, box(left), box(right)))
+
+
+def eval_identifier(node: ast.Identifier, env: object.Environment) -> Any:
+    if node.address is not None:
+        return eval_resolved_identifier(node, env)
+    builtin = BUILTINS.get(node.value)
+    if builtin:
+        return builtin
+    val = env.get(name=node.value)
+    if val is None:
+        return new_error(f"identifier not found: {node.value}")
+    return val
+
+
+def eval_expressions(exps: list[ast.Expression], env: object.Environment) -> list:
+    result = []
+    for e in exps:
+        evaluated = eval(e, env)
+        if type(evaluated) is Error:
+            # as in 'evaluator.eval_expressions'
+            return [object.Object(evaluated)]
+        result.append(evaluated)
+    return result
+
+
+def eval_index_expression(left: Any, index: Any) -> Any:
+    if type(left) is object.Array and type(index) in NUMBERS:
+        elements = left.elements
+        if index < 0 or index > len(elements):
+            return None
+        return elements[index]
+    return unbox(evaluator.eval_index_expression(box(left), box(index)))
+
+
+def apply_function(func: Any, args: list) -> Any:
+    """
+    'evaluator.apply_function', builtins get boxed arguments.
+    """
+    while True:
+        if type(func) == object.Builtin:
+            return unbox(func.fn(*[box(arg) for arg in args]))
+        extended_env = extended_function_env(func, args)
+        evaluated = eval(func.body, extended_env)
+        release_function_env(func, extended_env)
+        if type(evaluated) is not TailCall:
+            return unwrap_return_value(evaluated)
+        func = evaluated.function
+        args = evaluated.arguments
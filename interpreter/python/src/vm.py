@@ -0,0 +1,270 @@
+"""
+Stack based virtual machine that runs the chunks produced by the 'compiler'.
+
+Calls to Monkey functions push a frame on the frame stack of the vm instead
+of recursing in Python, so the depth of Monkey recursion is not bounded by
+the recursion limit of the interpreter.
+"""
+from __future__ import annotations
+from src import ast
+from src import object
+from src import evaluator
+from src.chunk import Chunk, OpCode
+from src.compiler import FunctionPrototype, compile_program
+
+Integer = object.Integer
+Error = object.Error
+TRUE = evaluator.TRUE
+FALSE = evaluator.FALSE
+NULL = evaluator.NULL
+
+# plain int copies of the opcodes, cheaper to compare in the dispatch loop
+OP_CONSTANT = int(OpCode.CONSTANT)
+OP_POP = int(OpCode.POP)
+OP_POP_OR_HALT = int(OpCode.POP_OR_HALT)
+OP_GET_NAME = int(OpCode.GET_NAME)
+OP_DEFINE = int(OpCode.DEFINE)
+OP_ADD = int(OpCode.ADD)
+OP_SUBTRACT = int(OpCode.SUBTRACT)
+OP_MULTIPLY = int(OpCode.MULTIPLY)
+OP_DIVIDE = int(OpCode.DIVIDE)
+OP_LESS = int(OpCode.LESS)
+OP_GREATER = int(OpCode.GREATER)
+OP_EQUAL = int(OpCode.EQUAL)
+OP_NOT_EQUAL = int(OpCode.NOT_EQUAL)
+OP_NEGATE = int(OpCode.NEGATE)
+OP_BANG = int(OpCode.BANG)
+OP_JUMP = int(OpCode.JUMP)
+OP_JUMP_IF_FALSE = int(OpCode.JUMP_IF_FALSE)
+OP_EXIT_BLOCK = int(OpCode.EXIT_BLOCK)
+OP_CLOSURE = int(OpCode.CLOSURE)
+OP_CALL = int(OpCode.CALL)
+OP_ARRAY = int(OpCode.ARRAY)
+OP_INDEX = int(OpCode.INDEX)
+OP_RETURN = int(OpCode.RETURN)
+OP_JUMP_IF_ERROR = int(OpCode.JUMP_IF_ERROR)
+
+INFIX_OPERATORS: dict[int, str] = {
+    OpCode.ADD: "+",
+    OpCode.SUBTRACT: "-",
+    OpCode.MULTIPLY: "*",
+    OpCode.DIVIDE: "/",
+    OpCode.LESS: "<",
+    OpCode.GREATER: ">",
+    OpCode.EQUAL: "==",
+    OpCode.NOT_EQUAL: "!=",
+}
+
+
+def binary_op(op: int, left: object.Object, right: object.Object) -> object.Object:
+    """
+    Slow path for the infix instructions, used whenever the operands are not
+    both object.Integer.
+    """
+    if evaluator.is_error(left):
+        return left
+    if evaluator.is_error(right):
+        return right
+    return evaluator.eval_infix_expression(INFIX_OPERATORS[op], left, right)
+
+
+class VM:
+    """
+    The vm.
+
+    stack: the value stack that is shared by all frames
+    frames: the code, instruction pointer, constants and environment of
+     every caller that is waiting for a call to return
+    """
+
+    def __init__(self):
+        self.stack: list[object.Object] = []
+        self.frames: list[tuple] = []
+
+    @staticmethod
+    def new() -> VM:
+        return VM()
+
+    def reset_stack(self) -> None:
+        self.stack = []
+        self.frames = []
+
+    def run(self, chunk: Chunk, env: object.Environment) -> object.Object:
+        """
+        Execute a chunk in the given environment and return its result.
+        """
+        self.reset_stack()
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        frames = self.frames
+        code = chunk.code
+        constants = chunk.constants
+        ip = 0
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == OP_CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == OP_GET_NAME:
+                name = constants[code[ip]]
+                ip += 1
+                value = env.get(name)
+                if value is None:
+                    value = evaluator.new_error(f"identifier not found: {name}")
+                push(value)
+            elif op <= OP_NOT_EQUAL and op >= OP_ADD:
+                right = pop()
+                left = stack[-1]
+                if type(left) is Integer and type(right) is Integer:
+                    if op == OP_ADD:
+                        stack[-1] = Integer(value=left.value + right.value)
+                    elif op == OP_SUBTRACT:
+                        stack[-1] = Integer(value=left.value - right.value)
+                    elif op == OP_MULTIPLY:
+                        stack[-1] = Integer(value=left.value * right.value)
+                    elif op == OP_DIVIDE:
+                        stack[-1] = Integer(value=left.value / right.value)
+                    elif op == OP_LESS:
+                        stack[-1] = TRUE if left.value < right.value else FALSE
+                    elif op == OP_GREATER:
+                        stack[-1] = TRUE if left.value > right.value else FALSE
+                    elif op == OP_EQUAL:
+                        stack[-1] = TRUE if left.value == right.value else FALSE
+                    else:
+                        stack[-1] = TRUE if left.value != right.value else FALSE
+                else:
+                    stack[-1] = binary_op(op, left, right)
+            elif op == OP_JUMP_IF_FALSE:
+                condition = pop()
+                if type(condition) is Error:
+                    push(condition)
+                    ip = code[ip + 1]
+                elif condition is FALSE or condition is NULL:
+                    ip = code[ip]
+                else:
+                    ip += 2
+            elif op == OP_JUMP:
+                ip = code[ip]
+            elif op == OP_JUMP_IF_ERROR:
+                if type(stack[-1]) is Error:
+                    depth = code[ip + 1]
+                    if depth:
+                        del stack[-1 - depth : -1]
+                    ip = code[ip]
+                else:
+                    ip += 2
+            elif op == OP_CALL:
+                argument_count = code[ip]
+                ip += 1
+                start = len(stack) - argument_count
+                function = stack[start - 1]
+                args = stack[start:]
+                del stack[start - 1 :]
+                error = first_error(function, *args)
+                if error is not None:
+                    push(error)
+                elif type(function) is object.CompiledFunction:
+                    frames.append((code, ip, constants, env))
+                    env = function_env(function, args)
+                    code = function.chunk.code
+                    constants = function.chunk.constants
+                    ip = 0
+                elif type(function) is object.Builtin:
+                    push(function.fn(*args))
+                else:
+                    push(evaluator.not_a_function_error(function))
+            elif op == OP_RETURN:
+                if not frames:
+                    return pop()
+                code, ip, constants, env = frames.pop()
+            elif op == OP_POP:
+                pop()
+            elif op == OP_POP_OR_HALT:
+                if type(stack[-1]) is Error:
+                    ip = code[ip]
+                else:
+                    pop()
+                    ip += 1
+            elif op == OP_DEFINE:
+                value = stack[-1]
+                if type(value) is not Error:
+                    env.set(constants[code[ip]], value)
+                    stack[-1] = None
+                ip += 1
+            elif op == OP_EXIT_BLOCK:
+                if type(stack[-1]) is Error:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == OP_CLOSURE:
+                prototype: FunctionPrototype = constants[code[ip]]
+                ip += 1
+                push(
+                    object.CompiledFunction(
+                        parameters=prototype.parameters,
+                        body=prototype.body,
+                        env=env,
+                        chunk=prototype.chunk,
+                    )
+                )
+            elif op == OP_NEGATE:
+                right = stack[-1]
+                if type(right) is Integer:
+                    stack[-1] = Integer(value=-right.value)
+                elif not evaluator.is_error(right):
+                    stack[-1] = evaluator.eval_prefix_expression("-", right)
+            elif op == OP_BANG:
+                right = stack[-1]
+                if not evaluator.is_error(right):
+                    stack[-1] = evaluator.eval_bang_operator_expression(right)
+            elif op == OP_ARRAY:
+                element_count = code[ip]
+                ip += 1
+                start = len(stack) - element_count
+                elements = stack[start:]
+                del stack[start:]
+                error = first_error(*elements)
+                push(error if error is not None else object.Array(elements=elements))
+            elif op == OP_INDEX:
+                index = pop()
+                left = stack[-1]
+                error = first_error(left, index)
+                if error is not None:
+                    stack[-1] = error
+                else:
+                    stack[-1] = evaluator.eval_index_expression(left, index)
+            else:
+                raise RuntimeError(f"unknown opcode {op}")
+
+
+def function_env(
+    function: object.CompiledFunction, args: list[object.Object]
+) -> object.Environment:
+    """
+    The Environment of a call. The chunks read and define names, so the
+    Frame that 'evaluator.extended_function_env' builds for a function that
+    went through 'resolver' would not do.
+    """
+    env = object.new_enclosed_environment(function.env)
+    for idx, parameter in enumerate(function.parameters):
+        env.set(parameter.value, args[idx])
+    return env
+
+
+def first_error(*values: object.Object) -> object.Error | None:
+    for value in values:
+        if type(value) is Error:
+            return value
+    return None
+
+
+def interpret(program: ast.Program, env: object.Environment) -> object.Object:
+    """
+    Compile and run a program, the bytecode counterpart of
+    'evaluator.eval_program'.
+    """
+    return VM.new().run(compile_program(program), env)
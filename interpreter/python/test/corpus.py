@@ -0,0 +1,221 @@
+"""
+Programs and helpers that the tests of the evaluators, the passes over the
+ast and the parsers share.
+"""
+
+from src import ast
+from src import closure_compiler
+from src import object
+from src import transpiler
+from src import unboxed
+from src import vm
+from src.evaluator import eval_program
+from src.lexer import Lexer
+from src.parser import Parser
+from src.stackless import eval_stackless
+from typing import Any, Callable
+
+# every way to run a program, each called as 'run(program, env)'
+BACKENDS = [
+    eval_program,
+    eval_stackless,
+    unboxed.eval_program,
+    vm.interpret,
+    closure_compiler.interpret,
+    transpiler.interpret,
+]
+
+
+def parse(source: str) -> ast.Program:
+    return Parser.new(Lexer.new(source)).parse_program()
+
+
+def evaluate(
+    program: ast.Program,
+    env: object.Environment | None = None,
+    evaluate_program: Callable = eval_program,
+) -> Any:
+    return evaluate_program(program, env or object.new_environment())
+
+
+def outcome(evaluate_program: Callable, program: ast.Program) -> Any:
+    """
+    The result of a program, or the type of the exception it raises, so the
+    evaluators can be compared on programs that crash the evaluator too.
+    """
+    try:
+        return evaluate(program, evaluate_program=evaluate_program)
+    except Exception as err:
+        return type(err)
+
+
+EVALUATION_CASES = [
+    # array
+    ("[1, 2, 3][0]", 1),
+    ("[1, 2, 3][1]", 2),
+    ("[1, 2, 3][2]", 3),
+    ("let myArray = [1, 2, 3]; myArray[2];", 3),
+    # builtins
+    ('len("one", "two")', "wrong number of arguments. got = 2, want = 1"),
+    ("len(1)", "argument to 'len' not supported, got <class 'src.object.Integer'>"),
+    ('len("")', 0),
+    ('len("four")', 4),
+    ('len("hello world")', 11),
+    # function application
+    ("let identity = fn(x) { x; }; identity(5);", 5),
+    ("let identity = fn(x) { return x; }; identity(5);", 5),
+    ("let double = fn(x) { x * 2; }; double(5);", 10),
+    ("let add = fn(x, y) { x + y; }; add(5, 5);", 10),
+    ("let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));", 20),
+    ("fn(x) { x; }(5)", 5),
+    # end function application tests
+    ("-5", -5),
+    ("5", 5),
+    ("10", 10),
+    ("1214315", 1214315),
+    ("!!5", True),
+    ("true", True),
+    ("false", False),
+    ("!false", True),
+    ("!true", False),
+    ("!5", False),
+    ("!!true", True),
+    ("!!false", False),
+    ("!!5", True),
+    ("-10", -10),
+    ("5 + 5 + 5 + 5 - 10", 10),
+    ("2 * 2 * 2 * 2 * 2", 32),
+    ("-50 + 100 + -50", 0),
+    ("5 * 2 + 10", 20),
+    ("5 + 2 * 10", 25),
+    ("20 + 2 * -10", 0),
+    ("50 / 2 * 2 + 10", 60),
+    ("2 * (5 + 10)", 30),
+    ("3 * 3 * 3 + 10", 37),
+    ("3 * (3 * 3) + 10", 37),
+    ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
+    ("true", True),
+    ("false", False),
+    ("1 < 2", True),
+    ("1 > 2", False),
+    ("1 < 1", False),
+    ("1 > 1", False),
+    ("1 == 1", True),
+    ("1 != 1", False),
+    ("1 == 2", False),
+    ("1 != 2", True),
+    ("true == true", True),
+    ("false == false", True),
+    ("true == false", False),
+    ("true != false", True),
+    ("false != true", True),
+    ("(1 < 2) == true", True),
+    ("(1 < 2) == false", False),
+    ("(1 > 2) == true", False),
+    ("(1 > 2) == false", True),
+    ("if (1 < 2) { 10} else { 20}", 10),
+    ("if (false) { 10}", None),
+    ("if (1) { 10}", 10),
+    ("if (1 < 2) { 10 }", 10),
+    ("if (1 > 2) { 10 }", None),
+    ("if (1 > 2) { 10 } else { 20}", 20),
+    ("if (1 < 2) { 10 } else { 20}", 10),
+    ("return 10;", 10),
+    ("return 10; 9;", 10),
+    ("return 2 * 5; 9;", 10),
+    ("9; return 2 * 5; 9;", 10),
+    # binding
+    ("let a = 5; a;", 5),
+    ("let a = 5 * 5; a;", 25),
+    ("let a = 5; let b = a; b;", 5),
+    ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
+]
+
+
+ERROR_CASES = [
+    (
+        '"Hello" - "World"',
+        "unknown operator: Type.STRING_OBJ - Type.STRING_OBJ",
+    ),
+    (
+        "foobar",
+        "identifier not found: foobar",
+    ),
+    (
+        """
+if (10 > 1) {
+  if (10 > 1) {
+    return true + false;
+  }
+}
+
+  return 1;""",
+        "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
+    ),
+    (
+        "if (10 > 1) { true + false; }",
+        "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
+    ),
+    (
+        "5; true + false; 5",
+        "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
+    ),
+    ("5 + true;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
+    ("5 + true;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
+    ("5 + true; 5;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
+    (
+        "-true",
+        "unknown operator: -Type.BOOLEAN_OBJ",
+    ),
+    (
+        "true + false;",
+        "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
+    ),
+    (
+        "true + false + true + false;",
+        "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
+    ),
+]
+
+
+# programs that exercise scoping: closures, recursion, lets that shadow
+PROGRAMS = [
+    "let newAdder = fn(x) { fn(y) { x + y } }; let addTwo = newAdder(2); addTwo(3);",
+    "let f = fn(n) { if (n < 1) { 0 } else { n + f(n - 1) } }; f(20);",
+    # reading a local before its 'let' falls back to the variable outside
+    "let x = 1; let f = fn() { let a = x; let x = 10; a + x }; f();",
+    "let f = fn() { if (true) { let y = 5; }; y }; f();",
+    # a builtin wins from a binding of the same name
+    'let len = fn(x) { 99 }; len("four");',
+    "let f = fn(x, x) { x }; f(1, 2);",
+    "let f = fn(a) { fn(b) { fn(c) { fn(d) { a + b + c + d } } } }; f(1)(2)(3)(4);",
+    "let f = fn() { g() }; let g = fn() { 7 }; f();",
+    "let f = fn() { z }; f();",
+    "let f = fn(x) { let x = x * 2; x }; f(4);",
+    # a captured variable is read when the closure runs, not when it is made
+    "let f = fn() { let g = fn(n) { if (n < 1) { 0 } else { g(n - 1) + 1 } }; g(5) }; f();",
+    "let f = fn() { let x = 1; let g = fn() { x }; let x = 2; g() }; f();",
+    "let x = 7; let f = fn() { let g = fn() { x }; let r = g(); let x = 1; r + g() }; f();",
+    "let f = fn(x) { fn() { let x = 3; x } }; f(1)();",
+]
+
+# every program above, for the tests that compare an evaluator or a pass
+# over the ast with 'evaluator.eval_program'
+ALL_PROGRAMS = PROGRAMS + [source for source, _ in EVALUATION_CASES + ERROR_CASES]
+
+# programs for the parsers, with parse errors
+PARSER_SOURCES = [source for source, _ in EVALUATION_CASES + ERROR_CASES] + [
+    "a + b * c + d / e - f",
+    "-a * b == !c != d < e > f",
+    "add(a + b, c * d, fn(x, y) { return x + y; }(1, 2))[0]",
+    "let f = fn() { if (x) { 1 } else { let y = [1, [2, 3]][1][0]; y } };",
+    # parse errors
+    "let 838383;",
+    "let x 5;",
+    "if (x { 1 }",
+    "fn(x, y { x }",
+    "(1 + 2",
+    "[1, 2",
+    "a[1",
+    "+ 1; ) 2",
+]
@@ -0,0 +1,56 @@
+import pytest
+from src.lexer import Lexer
+from src.parser import Parser
+from src import closure_compiler
+from src import object
+from corpus import EVALUATION_CASES, ERROR_CASES
+
+
+def closure_helper(source: str) -> object.Object:
+    l: Lexer = Lexer.new(source)
+    p: Parser = Parser.new(l)
+
+    program = p.parse_program()
+    env = object.new_environment()
+    return closure_compiler.interpret(program, env)
+
+
+@pytest.mark.parametrize("source, expected", EVALUATION_CASES)
+def test_evaluations(source, expected):
+    evaluated = closure_helper(source)
+    if evaluated is None:
+        assert evaluated is expected
+    elif type(evaluated) == object.Error:
+        assert evaluated.message == expected
+    else:
+        assert evaluated.value == expected
+
+
+@pytest.mark.parametrize("source, expected_message", ERROR_CASES)
+def test_error_handling(source, expected_message):
+    evaluated = closure_helper(source)
+    assert evaluated.message == expected_message
+
+
+def test_closures():
+    source = """
+    let newAdder = fn(x) {
+    fn(y) { x + y };
+    };
+    let addTwo = newAdder(2);
+    addTwo(2);
+    """
+    assert closure_helper(source).value == 4
+
+
+def test_function_body_is_compiled_once():
+    source = "let double = fn(x) { x * 2 }; double(1); double;"
+    l: Lexer = Lexer.new(source)
+    program = Parser.new(l).parse_program()
+    env = object.new_environment()
+    compiled = closure_compiler.compile_program(program)
+
+    first = compiled(env)
+    second = compiled(env)
+    assert first.body is second.body
+    assert first.body.compiled is closure_compiler.compile_block(second.body)
@@ -0,0 +1,139 @@
+import pytest
+from src import ast
+from src import closure_compiler
+from src import evaluator
+from src import object
+from src import unboxed
+from src.common_subexpressions import common_expressions, eliminate
+from src.escape_analysis import analyze
+from src.evaluator import eval_program
+from src.flat_ast import FlatProgram
+from src.parse_cache import decode_program, encode_program
+from src.resolver import resolve
+from src.stackless import eval_stackless
+from src.tail_calls import mark
+from corpus import ALL_PROGRAMS, BACKENDS, outcome, parse
+
+CSE_SOURCES = [
+    "let f = fn(a) { [len(a) - 1, len(a) - 1, a[len(a) - 1]] }; f([1, 2, 3]);",
+    "let f = fn(a, i) { if (a[i] > 1) { a[i] * 2 } else { a[i] } }; [f([1, 2], 0), f([1, 2], 1)];",
+    "let f = fn(x) { let y = x * 2; let x = 10; [x * 2, y] }; f(3);",
+    "let x = 7; let f = fn() { let a = x * 2; let x = 1; a + x * 2 }; f();",
+    "let f = fn(a) { a[5] + a[5] }; f([1]);",
+    "let f = fn(a) { a[1] + a[1] }; f([1]);",
+    "let f = fn(x) { (x + true) + (x + true) }; f(1);",
+    "let f = fn(x) { (y - x) * (y - x) }; f(1);",
+    "let f = fn(x) { if (x > 2) { let z = x * x; z } else { x * x } }; [f(1), f(3)];",
+    'let f = fn(s) { len(s) + len(s) }; f("four");',
+    "let f = fn(n) { let g = fn(m) { n * m + n * m }; g(n * 2) + n * 2 }; f(3);",
+    "let f = fn(x) { x / 0 + x / 0 }; f(1);",
+    "let f = fn(a) { [-a, -a, !a, !a] }; f(3);",
+    "let f = fn(a) { len(a) + len(a) }; f([1, 2]);",
+]
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("fn(a) { len(a) - 1 + len(a) };", 1),
+        ("fn(a) { [len(a) - 1, len(a) - 1] };", 2),
+        ("fn(a) { a[0] + a[0] };", 1),
+        ("fn(a) { let b = a[0]; let a = [1]; a[0] };", 0),
+        ("fn(a) { f(a) + f(a) };", 0),
+        ("fn(a) { a + a };", 0),
+        ("fn(a) { fn() { a * 2 }; a * 2 };", 0),
+        ("fn(a) { if (a > 1) { a > 1 } };", 1),
+    ],
+)
+def test_common_expressions(source, expected):
+    function = parse(source).statements[0].expression
+    assert len(common_expressions(function.body)) == expected
+
+
+@pytest.mark.parametrize(
+    "source",
+    CSE_SOURCES + ALL_PROGRAMS,
+)
+def test_eliminated_programs_evaluate_the_same(source):
+    expected = outcome(eval_program, parse(source))
+    assert outcome(eval_program, eliminate(parse(source))) == expected
+    program = mark(analyze(eliminate(resolve(parse(source)))))
+    assert outcome(eval_program, program) == expected
+    assert outcome(eval_stackless, program) == expected
+    assert outcome(unboxed.eval_program, eliminate(parse(source))) == expected
+
+
+@pytest.fixture
+def len_calls(monkeypatch) -> list:
+    """
+    The arguments of every call of the builtin 'len' from now on.
+    """
+    calls = []
+    builtin_len = evaluator.BUILTINS["len"].fn
+
+    def counted_len(*args):
+        calls.append(args)
+        return builtin_len(*args)
+
+    monkeypatch.setitem(evaluator.BUILTINS, "len", object.Builtin(fn=counted_len))
+    return calls
+
+
+# the backends that keep the value of a common expression, the others
+# compute it at every occurrence
+SHARING_BACKENDS = [
+    eval_program,
+    eval_stackless,
+    unboxed.eval_program,
+    closure_compiler.interpret,
+]
+
+
+@pytest.mark.parametrize("run", SHARING_BACKENDS)
+def test_common_expressions_are_evaluated_once(run, len_calls):
+    source = "let f = fn(a) { [len(a) - 1, len(a) - 1, len(a)] }; f([1, 2, 3]);"
+    assert outcome(run, parse(source)).elements[1].value == 2
+    assert len(len_calls) == 3
+    for program in [eliminate(parse(source)), eliminate(resolve(parse(source)))]:
+        len_calls.clear()
+        assert outcome(run, program).elements[1].value == 2
+        assert len(len_calls) == 1
+
+
+def test_values_are_kept_per_call():
+    source = """
+    let f = fn(a) { if (len(a) > 1) { f([len(a) - 1]) + len(a) } else { len(a) } };
+    f([1, 2, 3]);
+    """
+    for program in [eliminate(parse(source)), eliminate(resolve(parse(source)))]:
+        assert outcome(eval_program, program).value == 4
+
+
+@pytest.mark.parametrize("run", BACKENDS)
+@pytest.mark.parametrize("source", CSE_SOURCES + ALL_PROGRAMS)
+def test_eliminated_programs_run_the_same_on_every_backend(run, source, capsys):
+    expected = outcome(eval_program, parse(source))
+    assert outcome(run, eliminate(parse(source))) == expected
+    assert outcome(run, eliminate(resolve(parse(source)))) == expected
+
+
+def places(program: ast.Program) -> list:
+    result = []
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if type(node) is ast.CommonExpression:
+            result.append(node.place)
+        stack.extend(child for child in ast.children(node) if child is not None)
+    return result
+
+
+def test_places_are_stored():
+    source = "let f = fn(a) { len(a) + len(a) }; f([1, 2]);"
+    for program in [eliminate(parse(source)), eliminate(resolve(parse(source)))]:
+        expected = places(program)
+        assert len(expected) == 2
+        assert places(decode_program(encode_program(program))) == expected
+        assert places(FlatProgram.from_program(program).to_program()) == expected
+    program = decode_program(encode_program(eliminate(parse(source))))
+    assert outcome(eval_program, program).value == 4
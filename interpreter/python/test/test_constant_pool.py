@@ -0,0 +1,53 @@
+import pytest
+from src import object
+from src.constant_pool import attach_constants
+from src.escape_analysis import analyze
+from src.evaluator import TRUE
+from src.resolver import resolve
+from src.stackless import eval_stackless
+from corpus import ALL_PROGRAMS, evaluate, parse
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_constants_evaluate_the_same(source):
+    expected = evaluate(parse(source))
+    program = parse(source)
+    attach_constants(program)
+    assert evaluate(program) == expected
+    program = analyze(resolve(parse(source)))
+    attach_constants(program)
+    assert evaluate(program) == expected
+    assert eval_stackless(program, object.new_environment()) == expected
+
+
+def test_equal_literals_share_a_constant():
+    program = parse('[5000, 5000, "a long enough string", "a long enough string"];')
+    pool = attach_constants(program)
+    large, other_large, string, other_string = program.statements[0].expression.elements
+    assert large.constant is other_large.constant
+    assert string.constant is other_string.constant
+    assert len(pool) == 2
+    elements = evaluate(program).elements
+    assert elements[0] is elements[1] is large.constant
+
+
+def test_constants_keep_their_type():
+    program = parse("[1, true, 1 == 1];")
+    pool = attach_constants(program)
+    assert pool[(int, 1)] == object.Integer(value=1)
+    assert pool[(bool, True)] is TRUE
+    assert len(pool) == 2
+
+
+def test_pool_is_shared_across_programs():
+    first = parse("let a = 123456;")
+    second = parse("a + 123456;")
+    pool = attach_constants(first)
+    assert attach_constants(second, pool) is pool
+    assert (
+        first.statements[0].value.constant
+        is second.statements[0].expression.right.constant
+    )
+    env = object.new_environment()
+    evaluate(first, env)
+    assert evaluate(second, env).value == 246912
@@ -0,0 +1,57 @@
+import pytest
+from src import object
+from src.escape_analysis import MAX_FREE_FRAMES, analyze, escapes
+from src.resolver import resolve
+from corpus import ALL_PROGRAMS, evaluate, parse
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("fn(x, y) { x + y };", False),
+        ("fn(x) { let y = [x, len(x)]; if (y) { y[0] } };", False),
+        ("fn(x) { fn(y) { x + y } };", True),
+        ("fn(x) { if (x) { let f = fn() { 1 }; f() } };", True),
+        ("fn(x) { map(x, fn(y) { y }) };", True),
+    ],
+)
+def test_escapes(source, expected):
+    assert escapes(parse(source).statements[0].expression) == expected
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_reused_frames_evaluate_the_same(source):
+    assert evaluate(analyze(resolve(parse(source)))) == evaluate(parse(source))
+
+
+def test_leaf_frames_are_reused():
+    program = analyze(resolve(parse("let add = fn(x, y) { let z = x + y; z };")))
+    env = object.new_environment()
+    evaluate(program, env)
+    add = env.get("add")
+    assert add.body.frames == []
+
+    assert evaluate(analyze(resolve(parse("add(1, 2);"))), env).value == 3
+    assert len(add.body.frames) == 1
+    frame = add.body.frames[0]
+    assert frame.slots == [None, None, None]
+    assert evaluate(analyze(resolve(parse("add(3, 4) + add(5, 6);"))), env).value == 18
+    assert add.body.frames == [frame]
+
+
+def test_recursive_leaf_functions():
+    source = """
+    let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+    fib(12);
+    """
+    env = object.new_environment()
+    assert evaluate(analyze(resolve(parse(source))), env).value == 144
+    assert 1 < len(env.get("fib").body.frames) <= MAX_FREE_FRAMES
+
+
+def test_escaping_frames_are_not_reused():
+    source = "let newAdder = fn(x) { fn(y) { x + y } }; let a = newAdder(1);"
+    env = object.new_environment()
+    evaluate(analyze(resolve(parse(source))), env)
+    assert env.get("newAdder").body.frames is None
+    assert evaluate(parse("[a(1), newAdder(5)(5)];"), env).elements[1].value == 10
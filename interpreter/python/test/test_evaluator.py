@@ -1,8 +1,9 @@
 import pytest
 from src.lexer import Lexer
 from src.parser import Parser
-from src.evaluator import eval_program
+from src.evaluator import eval_each, eval_program, eval_stream
 from src import object
+from corpus import EVALUATION_CASES, ERROR_CASES
 import pdb
 
 
@@ -15,90 +16,7 @@ def eval_helper(source: str) -> object.Object:
     return eval_program(program, env)
 
 
-@pytest.mark.parametrize(
-    "source, expected",
-    [
-        # array
-        ("[1, 2, 3][0]", 1),
-        ("[1, 2, 3][1]", 2),
-        ("[1, 2, 3][2]", 3),
-        ("let myArray = [1, 2, 3]; myArray[2];", 3),
-        # builtins
-        ('len("one", "two")', "wrong number of arguments. got = 2, want = 1"),
-        ("len(1)", "argument to 'len' not supported, got <class 'src.object.Integer'>"),
-        ('len("")', 0),
-        ('len("four")', 4),
-        ('len("hello world")', 11),
-        # function application
-        ("let identity = fn(x) { x; }; identity(5);", 5),
-        ("let identity = fn(x) { return x; }; identity(5);", 5),
-        ("let double = fn(x) { x * 2; }; double(5);", 10),
-        ("let add = fn(x, y) { x + y; }; add(5, 5);", 10),
-        ("let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));", 20),
-        ("fn(x) { x; }(5)", 5),
-        # end function application tests
-        ("-5", -5),
-        ("5", 5),
-        ("10", 10),
-        ("1214315", 1214315),
-        ("!!5", True),
-        ("true", True),
-        ("false", False),
-        ("!false", True),
-        ("!true", False),
-        ("!5", False),
-        ("!!true", True),
-        ("!!false", False),
-        ("!!5", True),
-        ("-10", -10),
-        ("5 + 5 + 5 + 5 - 10", 10),
-        ("2 * 2 * 2 * 2 * 2", 32),
-        ("-50 + 100 + -50", 0),
-        ("5 * 2 + 10", 20),
-        ("5 + 2 * 10", 25),
-        ("20 + 2 * -10", 0),
-        ("50 / 2 * 2 + 10", 60),
-        ("2 * (5 + 10)", 30),
-        ("3 * 3 * 3 + 10", 37),
-        ("3 * (3 * 3) + 10", 37),
-        ("(5 + 10 * 2 + 15 / 3) * 2 + -10", 50),
-        ("true", True),
-        ("false", False),
-        ("1 < 2", True),
-        ("1 > 2", False),
-        ("1 < 1", False),
-        ("1 > 1", False),
-        ("1 == 1", True),
-        ("1 != 1", False),
-        ("1 == 2", False),
-        ("1 != 2", True),
-        ("true == true", True),
-        ("false == false", True),
-        ("true == false", False),
-        ("true != false", True),
-        ("false != true", True),
-        ("(1 < 2) == true", True),
-        ("(1 < 2) == false", False),
-        ("(1 > 2) == true", False),
-        ("(1 > 2) == false", True),
-        ("if (1 < 2) { 10} else { 20}", 10),
-        ("if (false) { 10}", None),
-        ("if (1) { 10}", 10),
-        ("if (1 < 2) { 10 }", 10),
-        ("if (1 > 2) { 10 }", None),
-        ("if (1 > 2) { 10 } else { 20}", 20),
-        ("if (1 < 2) { 10 } else { 20}", 10),
-        ("return 10;", 10),
-        ("return 10; 9;", 10),
-        ("return 2 * 5; 9;", 10),
-        ("9; return 2 * 5; 9;", 10),
-        # binding
-        ("let a = 5; a;", 5),
-        ("let a = 5 * 5; a;", 25),
-        ("let a = 5; let b = a; b;", 5),
-        ("let a = 5; let b = a; let c = a + b + 5; c;", 15),
-    ],
-)
+@pytest.mark.parametrize("source, expected", EVALUATION_CASES)
 def test_evaluations(source, expected):
     evaluated = eval_helper(source)
     import pdb
@@ -114,53 +32,7 @@ def test_evaluations(source, expected):
             assert evaluated.value == expected
 
 
-@pytest.mark.parametrize(
-    "source, expected_message",
-    [
-        (
-            '"Hello" - "World"',
-            "unknown operator: Type.STRING_OBJ - Type.STRING_OBJ",
-        ),
-        (
-            "foobar",
-            "identifier not found: foobar",
-        ),
-        (
-            """
-if (10 > 1) {
-  if (10 > 1) {
-    return true + false;
-  }
-}
-
-  return 1;""",
-            "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
-        ),
-        (
-            "if (10 > 1) { true + false; }",
-            "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
-        ),
-        (
-            "5; true + false; 5",
-            "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
-        ),
-        ("5 + true;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
-        ("5 + true;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
-        ("5 + true; 5;", "type mismatch: Type.INTEGER_OBJ + Type.BOOLEAN_OBJ"),
-        (
-            "-true",
-            "unknown operator: -Type.BOOLEAN_OBJ",
-        ),
-        (
-            "true + false;",
-            "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
-        ),
-        (
-            "true + false + true + false;",
-            "unknown operator: Type.BOOLEAN_OBJ + Type.BOOLEAN_OBJ",
-        ),
-    ],
-)
+@pytest.mark.parametrize("source, expected_message", ERROR_CASES)
 def test_error_handling(source, expected_message):
     evaluated = eval_helper(source)
     import pdb
@@ -219,3 +91,31 @@ def test_array():
     assert evaluated.elements[0].value == 1
     assert evaluated.elements[1].value == 4
     assert evaluated.elements[2].value == 6
+
+
+@pytest.mark.parametrize("source, expected", EVALUATION_CASES + ERROR_CASES)
+def test_eval_stream_matches_eval_program(source, expected):
+    streamed = eval_stream(
+        Parser.new(Lexer.new(source)).parse_statements(), object.new_environment()
+    )
+    assert streamed == eval_helper(source)
+
+
+def test_eval_each_runs_statements_as_they_are_parsed():
+    p = Parser.new(Lexer.new("let a = 1; a + 1; return a; 99; b;"))
+    results = eval_each(p.parse_statements(), object.new_environment())
+    assert next(results) is None
+    assert p.cur_token.Literal == ";"
+    assert next(results).value == 2
+    assert next(results).value == 1
+    assert p.cur_token.Literal == ";"
+    assert list(results) == []
+    assert p.peek_token.Literal == "99"
+
+
+def test_eval_each_stops_at_an_error():
+    statements = Parser.new(Lexer.new("1; foo; 2;")).parse_statements()
+    results = list(eval_each(statements, object.new_environment()))
+    assert results[0].value == 1
+    assert results[1].message == "identifier not found: foo"
+    assert len(results) == 2
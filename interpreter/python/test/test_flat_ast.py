@@ -0,0 +1,84 @@
+import pytest
+from src import ast
+from src.flat_ast import FlatProgram
+from src.iterative_parser import IterativeParser
+from src.lexer import Lexer
+from src.optimizer import optimize
+from corpus import PARSER_SOURCES, parse
+
+
+@pytest.mark.parametrize("source", PARSER_SOURCES)
+def test_flat_ast_round_trip(source):
+    program = parse(source)
+    assert FlatProgram.from_program(program).to_program() == program
+
+
+def test_flat_ast_load_maps_the_file(tmp_path):
+    program = parse('let add = fn(x, y) { x + y; }; add(-1, [2, "ü"][0]); let 5;')
+    path = str(tmp_path / "program.flat")
+    FlatProgram.from_program(program).save(path)
+
+    flat = FlatProgram.load(path)
+    assert isinstance(flat.children, memoryview)
+    assert flat.mapped is not None
+    assert flat.to_program() == program
+
+
+def test_flat_ast_big_integers(tmp_path):
+    program = parse(
+        "99999999999999999999999; -9223372036854775808; 9223372036854775807;"
+    )
+    program.statements.extend(optimize(parse("4294967296 * 4294967296;")).statements)
+    path = str(tmp_path / "program.flat")
+    FlatProgram.from_program(program).save(path)
+
+    values = [
+        statement.expression
+        for statement in FlatProgram.load(path).to_program().statements
+    ]
+    assert values[0].value == 99999999999999999999999
+    assert values[1].right.value == 9223372036854775808
+    assert values[2].value == 9223372036854775807
+    assert values[3].value == 1 << 64
+
+
+def test_flat_ast_load_rejects_other_files(tmp_path):
+    path = tmp_path / "program.flat"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        FlatProgram.load(str(path))
+
+
+def test_flat_ast_walk():
+    flat = FlatProgram.from_program(parse("let x = 1 + y; f(x, true);"))
+    classes = [flat.node_class(index) for index in flat.walk()]
+    assert classes == [
+        ast.Program,
+        ast.LetStatement,
+        ast.Identifier,
+        ast.InfixExpression,
+        ast.IntegerLiteral,
+        ast.Identifier,
+        ast.ExpressionStatement,
+        ast.CallExpression,
+        ast.Identifier,
+        ast.Identifier,
+        ast.Boolean,
+    ]
+    infix = next(i for i in flat.walk() if flat.node_class(i) is ast.InfixExpression)
+    fields = flat.fields(infix)
+    assert fields["operator"] == "+"
+    assert flat.value(fields["left"]) == 1
+    assert flat.value(fields["right"]) == "y"
+    assert flat.token(infix).Literal == "+"
+
+
+def test_flat_ast_deep_program():
+    depth = 5_000
+    program = IterativeParser.new(Lexer.new("!" * depth + "1;")).parse_program()
+    flat = FlatProgram.from_program(program)
+    assert len(list(flat.walk())) == depth + 3
+    node = flat.to_program().statements[0].expression
+    for _ in range(depth):
+        node = node.right
+    assert node.value == 1
@@ -0,0 +1,54 @@
+import random
+import pytest
+from src.incremental import IncrementalLexer
+from src.lexer import scan_spans, tokenize
+from src.parser import Parser
+
+SOURCE = """let greeting = "hello world";
+let add = fn(x, y) { x + y; };
+add(1, 22) == 3 != 4;
+"""
+
+
+@pytest.mark.parametrize(
+    "offset, deleted, inserted",
+    [
+        (0, 0, ""),
+        (4, 8, "name"),  # rename greeting
+        (5, 0, "x"),  # extend an identifier
+        (13, 1, "=="),  # turn '=' into '=='
+        (15, 0, '"'),  # open a string that runs to the next quote
+        (len(SOURCE), 0, " add"),
+        (0, len(SOURCE), "1"),
+    ],
+)
+def test_edit_matches_full_scan(offset, deleted, inserted):
+    lexer = IncrementalLexer.new(SOURCE)
+    lexer.edit(offset, deleted, inserted)
+    source_code = SOURCE[:offset] + inserted + SOURCE[offset + deleted :]
+    assert lexer.source_code == source_code
+    assert list(lexer.spans()) == list(scan_spans(source_code))
+    tokens = [(tok.Type, tok.Literal) for tok in tokenize(source_code)]
+    assert [(tok.Type, tok.Literal) for tok in lexer] == tokens
+
+
+def test_random_edits_match_full_scan():
+    rng = random.Random(8)
+    lexer = IncrementalLexer.new(SOURCE * 3)
+    for _ in range(300):
+        length = len(lexer.source_code)
+        offset = rng.randint(0, length)
+        deleted = rng.randint(0, min(3, length - offset))
+        inserted = "".join(rng.choice('ab1 =!"\n;{}') for _ in range(rng.randint(0, 3)))
+        lexer.edit(offset, deleted, inserted)
+        assert list(lexer.spans()) == list(scan_spans(lexer.source_code))
+
+
+def test_edit_only_relexes_around_the_edit():
+    lexer = IncrementalLexer.new(SOURCE * 1000)
+    offset = len(SOURCE) * 500 + 4
+    index, removed, added = lexer.edit(offset, 8, "name")
+    assert (removed, added) == (1, 1)
+    assert lexer.token_buffer().literal(index) == "name"
+    program = Parser.new(iter(lexer)).parse_program()
+    assert len(program.statements) == 3000
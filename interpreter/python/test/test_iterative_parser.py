@@ -0,0 +1,59 @@
+import random
+import pytest
+from src.lexer import Lexer
+from src.parser import Parser
+from src.iterative_parser import IterativeParser
+from src import ast
+from corpus import PARSER_SOURCES
+
+TOKENS = "1 x true + - * / < > == != ! ( ) [ ] , { } fn if else let return = ; y"
+
+
+def parse(parser_class: type[Parser], source: str) -> tuple[list, list[str]]:
+    p = parser_class.new(Lexer.new(source))
+    return p.parse_program().statements, p.errors
+
+
+@pytest.mark.parametrize("source", PARSER_SOURCES)
+def test_same_ast_and_errors(source):
+    assert parse(IterativeParser, source) == parse(Parser, source)
+
+
+def test_same_ast_and_errors_for_random_tokens():
+    rng = random.Random(9)
+    tokens = TOKENS.split()
+    for _ in range(500):
+        source = " ".join(rng.choice(tokens) for _ in range(rng.randint(1, 12)))
+        assert parse(IterativeParser, source) == parse(Parser, source), source
+
+
+def test_nested_parentheses_deeper_than_recursion_limit():
+    depth = 20_000
+    source = "(" * depth + "1" + ")" * depth + " + 2"
+    statements, errors = parse(IterativeParser, source)
+    assert errors == []
+    expression = statements[0].expression
+    assert expression.operator == "+"
+    assert expression.left.value == 1
+
+
+def test_prefix_chain_deeper_than_recursion_limit():
+    depth = 20_000
+    statements, errors = parse(IterativeParser, "-" * depth + "1")
+    assert errors == []
+    expression = statements[0].expression
+    for _ in range(depth):
+        assert type(expression) == ast.PrefixExpression
+        expression = expression.right
+    assert expression.value == 1
+
+
+def test_nested_blocks_deeper_than_recursion_limit():
+    depth = 5_000
+    source = "if (x) {" * depth + "1" + "}" * depth
+    statements, errors = parse(IterativeParser, source)
+    assert errors == []
+    expression = statements[0].expression
+    for _ in range(depth - 1):
+        expression = expression.consequence.statements[0].expression
+    assert expression.consequence.statements[0].expression.value == 1
@@ -1,6 +1,14 @@
 import pytest
-from src.token import Token, TokenType, TokenTypes
-from src.lexer import Lexer
+from src.token import Token, TokenType, TokenTypes, TokenCode
+from src.lexer import (
+    Lexer,
+    RegexLexer,
+    TokenBuffer,
+    tokenize,
+    tokenize_compact,
+    tokenize_file,
+)
+from src.parser import Parser
 
 
 def test_next_token_simple():
@@ -191,3 +199,130 @@ def test_lexer_read_identifier():
     lexer.read_char()
     another_identifier = lexer.read_identifier()
     assert another_identifier == "another_identifier"
+
+
+def lexer_tokens(source_code: str) -> list[tuple]:
+    lexer = Lexer.new(source_code)
+    tokens = []
+    while True:
+        tok = lexer.next_token()
+        tokens.append((tok.Type, type(tok.Type), tok.Literal))
+        if tok.Type == TokenTypes.EOF:
+            return tokens
+
+
+@pytest.mark.parametrize(
+    "source_code",
+    [
+        "",
+        "let add = fn(x, y) { x + y; }; add(1, 2) == 3 != !-/*5 < 10 > 5;",
+        'if (5 < 10) { return true; } else { return false; } "foo bar" [1, 2];',
+        '"unterminated',
+        '"a"b"',
+        "x1 y\u00b2z \u0663\u0664 \u00e9a _a",
+        "== = != ! !== ===",
+        "? . \x0b\xa0",
+    ],
+)
+def test_tokenize_matches_lexer(source_code):
+    tokens = [(tok.Type, type(tok.Type), tok.Literal) for tok in tokenize(source_code)]
+    assert tokens == lexer_tokens(source_code)
+
+
+def test_regex_lexer_feeds_parser():
+    source_code = "let add = fn(x, y) { x + y; }; add(1, 2);"
+    program = Parser.new(RegexLexer.new(source_code)).parse_program()
+    expected = Parser.new(Lexer.new(source_code)).parse_program()
+    assert str(program) == str(expected)
+    assert len(program.statements) == 2
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_tokenize_file_matches_tokenize(tmp_path, chunk_size):
+    source_code = (
+        'let sé = "a long string\nwith a newline";\n'
+        "let add = fn(x, y) { x + y; }; add(12345, 6) == 7 != !-/*5;\n"
+        '٣٤ x² ? "unterminated'
+    )
+    path = tmp_path / "program.monkey"
+    path.write_text(source_code, encoding="utf-8")
+    tokens = [(tok.Type, tok.Literal) for tok in tokenize(source_code)]
+    from_path = [(tok.Type, tok.Literal) for tok in tokenize_file(path, chunk_size)]
+    assert from_path == tokens
+    with open(path, "rb") as stream:
+        from_stream = [
+            (tok.Type, tok.Literal) for tok in tokenize_file(stream, chunk_size)
+        ]
+    assert from_stream == tokens
+
+
+def test_parser_consumes_token_generator(tmp_path):
+    source_code = "let add = fn(x, y) { x + y; }; add(1, 2);"
+    path = tmp_path / "program.monkey"
+    path.write_text(source_code)
+    program = Parser.new(tokenize_file(path, chunk_size=4)).parse_program()
+    assert str(program) == str(Parser.new(Lexer.new(source_code)).parse_program())
+
+
+@pytest.mark.parametrize(
+    "source_code",
+    [
+        "",
+        'let add = fn(x, y) { x + y; }; add(1, 2) != "foo" "unterminated',
+        "x\u00b2 \u0663 ? == !",
+    ],
+)
+def test_compact_tokens_match_tokenize(source_code):
+    tokens = [(tok.Type, type(tok.Type), tok.Literal) for tok in tokenize(source_code)]
+    compact = [
+        (tok.Type, type(tok.Type), tok.Literal) for tok in tokenize_compact(source_code)
+    ]
+    buffered = [
+        (tok.Type, type(tok.Type), tok.Literal)
+        for tok in TokenBuffer.new(source_code)
+    ]
+    assert compact == tokens
+    assert buffered == tokens
+    codes = [tok.code for tok in tokenize(source_code)]
+    assert [tok.code for tok in tokenize_compact(source_code)] == codes
+
+
+def test_compact_tokens_intern_identifiers():
+    first, second, _ = tokenize_compact("".join(["ab", "c"]) + " abc")
+    assert first.code == TokenCode.IDENT
+    assert first.Literal is second.Literal
+
+
+def test_tokens_store_their_code():
+    tok = Token(TokenTypes.PLUS.value, "+")
+    assert tok.code == TokenCode.PLUS
+    assert tok == Token(TokenTypes.PLUS, "+")
+    assert repr(tok) == "Token(Type='+', Literal='+')"
+
+
+@pytest.mark.parametrize("source_code", ["let = 5;", "if (x { 1 }", "return ;", "@"])
+def test_compact_tokens_give_the_same_parse_errors(source_code):
+    expected = Parser.new(Lexer.new(source_code))
+    expected.parse_program()
+    assert "no prefix parse function for Token(" in expected.errors[-1]
+    for tokens in (tokenize_compact(source_code), TokenBuffer.new(source_code)):
+        parser = Parser.new(tokens)
+        parser.parse_program()
+        assert parser.errors == expected.errors
+
+
+def test_token_buffer_columns():
+    buffer = TokenBuffer.new('let s = "hi";')
+    assert list(buffer.codes) == [
+        TokenCode.LET,
+        TokenCode.IDENT,
+        TokenCode.ASSIGN,
+        TokenCode.STRING,
+        TokenCode.SEMICOLON,
+    ]
+    assert list(buffer.starts) == [0, 4, 6, 8, 12]
+    assert list(buffer.ends) == [3, 5, 7, 12, 13]
+    assert buffer.literal(3) == "hi"
+    statement = Parser.new(buffer).parse_program().statements[0]
+    assert statement.name.value == "s"
+    assert statement.value.value == "hi"
@@ -0,0 +1,41 @@
+from src import object
+from corpus import evaluate, parse
+
+
+def test_small_integers_are_shared():
+    assert object.new_integer(7) is object.new_integer(7)
+    assert object.new_integer(-5) is object.new_integer(-5)
+    assert object.new_integer(1024) is object.new_integer(1024)
+    assert object.new_integer(1025) is not object.new_integer(1025)
+    assert object.new_integer(-6) == object.Integer(value=-6)
+
+
+def test_floats_are_not_shared():
+    integer = object.new_integer(2.0)
+    assert integer.value == 2.0 and type(integer.value) is float
+    assert integer.inspect() == "2.0"
+
+
+def test_cache_small_integers():
+    try:
+        object.cache_small_integers(0, 10)
+        assert object.new_integer(10) is object.new_integer(10)
+        assert object.new_integer(-1) is not object.new_integer(-1)
+    finally:
+        object.cache_small_integers()
+    assert object.new_integer(-1) is object.new_integer(-1)
+
+
+def test_strings_are_interned():
+    assert object.new_string("monkey") is object.new_string("monkey")
+    long = "x" * (object.MAX_INTERNED_LENGTH + 1)
+    assert object.new_string(long) is not object.new_string(long)
+    assert object.new_string(long) == object.String(value=long)
+
+
+def test_evaluator_shares_objects():
+    result = evaluate(parse('let a = 5; [a * 2, 10, 5000, 5000, "ab", "a" + "b"];'))
+    ten, other_ten, large, other_large, ab, other_ab = result.elements
+    assert ten is other_ten
+    assert large == other_large and large is not other_large
+    assert ab is other_ab
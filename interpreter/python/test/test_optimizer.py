@@ -0,0 +1,121 @@
+import pytest
+from src import ast
+from src import object
+from src.escape_analysis import analyze
+from src.evaluator import eval_program
+from src.optimizer import optimize
+from src.resolver import resolve
+from src.stackless import eval_stackless
+from src.tail_calls import mark
+from corpus import ALL_PROGRAMS, BACKENDS, outcome, parse
+
+OPTIMIZER_SOURCES = [
+    "2 + 5 * 5;",
+    '"a" + "b" + "c";',
+    "!true; !!false; !5; -(-7);",
+    "1 + true;",
+    '"a" - "b";',
+    "-true;",
+    "!!(1 < 2) == true;",
+    "10 / 4;",
+    "let x = 5; [x * 1, x + 0, (x - 2) * 1, 1 * (x * 3), 0 + -x, (x - 1) - 0];",
+    'let s = "a"; s + 0;',
+    'let s = "a"; [s * 1, ("b" - s) * 1];',
+    "let x = 0; if (!!x) { 1 } else { 2 };",
+    "let x = 3; if (!!(x > 2)) { 1 } else { 2 };",
+    'len("four") * 1 + 0;',
+    "if (1 > 2) { 10 } else { 20 };",
+    "if (0) { 10 } else { 20 };",
+    "if (false) { 10 };",
+    'if ("") { return 1; 2 } else { 3 }; 4;',
+    "let f = fn(n) { if (true) { n * 1 } else { f(n) } }; f(3 - 1);",
+    "let f = fn(n) { if (n < 1) { 0 } else { if (true) { f(n - 1) } } }; f(50);",
+    "let f = fn(x) { if (true) { x + 1 } }; f(1);",
+    "let f = fn(x) { 1 + if (false) { x } }; f(1);",
+]
+
+
+def evaluate(program):
+    return outcome(eval_program, program)
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("2 + 5 * 5", ast.IntegerLiteral),
+        ('"a" + "b"', ast.StringLiteral),
+        ("!true", ast.Boolean),
+        ("-(3 - 10)", ast.IntegerLiteral),
+        ("1 < 2 == true", ast.Boolean),
+        ("10 / 2", ast.InfixExpression),
+        ("1 + true", ast.InfixExpression),
+        ('"a" == "a"', ast.InfixExpression),
+        ("-x * 1", ast.PrefixExpression),
+        ("0 + (x - 1)", ast.InfixExpression),
+        ("x * 1", ast.InfixExpression),
+        ("!!(x == y)", ast.InfixExpression),
+        ("!!x", ast.PrefixExpression),
+        ("if (1 < 2) { x }", ast.IfExpression),
+        ("if (false) { x }", ast.IfExpression),
+    ],
+)
+def test_optimize(source, expected):
+    program = optimize(parse(source))
+    assert type(program.statements[0].expression) is expected
+
+
+def test_folded_values():
+    program = optimize(
+        parse('2 + 5 * 5; "a" + "b"; !true; -7; if (false) { 1 } else { 2 };')
+    )
+    expressions = [statement.expression for statement in program.statements]
+    assert [expression.value for expression in expressions[:4]] == [27, "ab", False, -7]
+    assert expressions[4].condition.value is True
+    assert expressions[4].consequence.statements[0].expression.value == 2
+    assert expressions[4].alternative is None
+
+
+@pytest.mark.parametrize(
+    "source, runs, statements",
+    [
+        ("if (1) { 1 } else { 2 }", True, 1),
+        ('if ("") { 1; 2 }', True, 2),
+        ("if (false) { 1 } else { 2 }", True, 1),
+        ("if (false) { 1 }", False, 0),
+        ("if (true) { 1 }", True, 1),
+    ],
+)
+def test_pruned_ifs(source, runs, statements):
+    expression = optimize(parse(source)).statements[0].expression
+    assert expression.condition.value is runs
+    assert len(expression.consequence.statements) == statements
+    assert expression.alternative is None
+
+
+@pytest.mark.parametrize(
+    "source",
+    OPTIMIZER_SOURCES + ALL_PROGRAMS,
+)
+def test_optimized_programs_evaluate_the_same(source, capsys):
+    expected = evaluate(parse(source))
+    expected_output = capsys.readouterr().out
+    assert evaluate(optimize(parse(source))) == expected
+    assert capsys.readouterr().out == expected_output
+    assert evaluate(mark(analyze(resolve(optimize(parse(source)))))) == expected
+
+
+def test_tail_calls_through_pruned_ifs():
+    source = (
+        "let f = fn(n) { if (n < 1) { 0 } else { if (true) { f(n - 1) } } }; f(2000);"
+    )
+    assert evaluate(mark(optimize(parse(source)))).value == 0
+    program = mark(resolve(optimize(parse(source))))
+    assert eval_stackless(program, object.new_environment()).value == 0
+
+
+@pytest.mark.parametrize("run", BACKENDS)
+@pytest.mark.parametrize("source", OPTIMIZER_SOURCES + ALL_PROGRAMS)
+def test_optimized_programs_run_the_same_on_every_backend(run, source, capsys):
+    expected = outcome(run, parse(source))
+    assert outcome(run, optimize(parse(source))) == expected
+    assert outcome(run, resolve(optimize(parse(source)))) == expected
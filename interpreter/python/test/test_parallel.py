@@ -0,0 +1,93 @@
+import pytest
+from src import parallel
+from src.lexer import Lexer, tokenize
+from src.parser import Parser
+from src.parse_cache import decode_program
+
+SOURCE = """let greeting = "hello
+world";
+let add = fn(x, y) {
+x + y;
+};
+let s = "a
+b
+c"; add(1, 2) == 3;
+"""
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 8, 100])
+def test_split_points_are_outside_strings(parts):
+    points = parallel.find_split_points(SOURCE, parts)
+    assert points[0] == 0
+    assert points[-1] == len(SOURCE)
+    assert points == sorted(set(points))
+    for point in points[1:-1]:
+        assert SOURCE[point - 1] == "\n"
+        assert SOURCE.count('"', 0, point) % 2 == 0
+
+
+def test_lex_parallel_matches_tokenize(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PART_SIZE", 16)
+    source_code = SOURCE * 20
+    buffer = parallel.lex_parallel(source_code, workers=4)
+    tokens = [(tok.Type, tok.Literal) for tok in tokenize(source_code)]
+    assert [(tok.Type, tok.Literal) for tok in buffer] == tokens
+    assert [buffer.literal(i) for i in range(3)] == ["let", "greeting", "="]
+    program = Parser.new(parallel.tokenize_parallel(source_code, workers=4))
+    assert len(program.parse_program().statements) == 20 * 4
+
+
+def write_files(directory, sources):
+    paths = []
+    for index, source in enumerate(sources):
+        path = directory / f"script{index}.monkey"
+        path.write_text(source, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def test_parse_files_matches_parser(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_SIZE", 0)
+    sources = [SOURCE * index for index in range(1, 6)] + ["let 5;", ""]
+    paths = write_files(tmp_path, sources)
+    for workers in [1, 3]:
+        results = parallel.parse_files(paths, workers=workers)
+        assert [result.path for result in results] == paths
+        for result, source in zip(results, sources):
+            p = Parser.new(Lexer.new(source))
+            assert result.program == p.parse_program()
+            assert result.errors == p.errors
+    assert results[-2].errors
+
+
+def test_parse_files_serialized(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARALLEL_SIZE", 0)
+    paths = write_files(tmp_path, [SOURCE, "let x = 1;"])
+    serialized = parallel.parse_files(paths, workers=2, serialized=True)
+    programs = parallel.parse_files(paths, workers=2)
+    assert [decode_program(r.program) for r in serialized] == [
+        r.program for r in programs
+    ]
+
+
+def test_small_files_are_parsed_in_process(tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started")
+
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", no_pool)
+    paths = write_files(tmp_path, [SOURCE, "let x = 1;"])
+    results = parallel.parse_files(paths, workers=4)
+    assert [result.program for result in results] == [
+        Parser.new(Lexer.new(source)).parse_program()
+        for source in [SOURCE, "let x = 1;"]
+    ]
+
+
+def test_parse_files_main(tmp_path, capsys):
+    write_files(tmp_path, [SOURCE, "let 5;"])
+    (tmp_path / "notes.txt").write_text("let 5;")
+    assert parallel.main([str(tmp_path), "--quiet"]) == 1
+    output = capsys.readouterr().out
+    assert "script1.monkey: 1 errors" in output
+    assert "script0.monkey" not in output
+    assert "notes.txt" not in output
@@ -0,0 +1,74 @@
+import marshal
+import os
+import pytest
+from src.lexer import Lexer
+from src.parser import Parser
+from src.parse_cache import ParseCache, decode_program, encode_program
+from corpus import PARSER_SOURCES
+
+
+def parse(source: str):
+    p = Parser.new(Lexer.new(source))
+    return p.parse_program(), p.errors
+
+
+@pytest.mark.parametrize("source", PARSER_SOURCES)
+def test_encode_decode_round_trip(source):
+    program, _ = parse(source)
+    assert decode_program(encode_program(program)) == program
+
+
+def test_parse_cache_hit(tmp_path):
+    cache = ParseCache.new(str(tmp_path))
+    source = "let add = fn(x, y) { x + y; }; add(1, [2, 3][0]); let 5;"
+    program, errors = cache.parse(source)
+    assert (program, errors) == parse(source)
+    assert len(os.listdir(tmp_path)) == 1
+
+    cached = cache.load(cache.key(source))
+    assert cached == (program, errors)
+    assert cache.parse(source) == (program, errors)
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    cache = ParseCache.new(str(tmp_path))
+    sources = [f"let x{i} = {i};" for i in range(3)]
+    for source in sources:
+        cache.parse(source)
+    sizes = [os.path.getsize(cache.path(cache.key(s))) for s in sources]
+    for age, source in enumerate([sources[1], sources[0], sources[2]]):
+        os.utime(cache.path(cache.key(source)), ns=(age, age))
+
+    cache.max_bytes = sum(sizes) - 1
+    cache.evict()
+    assert cache.load(cache.key(sources[1])) is None
+    assert cache.load(cache.key(sources[0])) is not None
+    assert cache.load(cache.key(sources[2])) is not None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda data: data[: len(data) // 2],
+        lambda data: marshal.dumps(([(999, None, None)], [])),
+        lambda data: marshal.dumps(([(0, None, None, 5)], [])),
+        lambda data: marshal.dumps(([], [])),
+        lambda data: marshal.dumps(([("x",)], [])),
+        lambda data: marshal.dumps(3),
+        lambda data: b"",
+    ],
+)
+def test_unreadable_entries_are_misses(tmp_path, corrupt):
+    cache = ParseCache.new(str(tmp_path))
+    source = "let add = fn(x, y) { x + y; }; add(1, 2);"
+    expected = cache.parse(source)
+    path = cache.path(cache.key(source))
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(corrupt(data))
+    assert cache.load(cache.key(source)) is None
+    assert not os.path.exists(path)
+    assert cache.parse(source) == expected
+    assert cache.load(cache.key(source)) == expected
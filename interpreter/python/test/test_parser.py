@@ -1,7 +1,9 @@
 import pytest
+import sys
 from src.token import Token, TokenType, TokenTypes
 from src.lexer import Lexer
 from src.parser import Parser
+from src.iterative_parser import IterativeParser
 from src.ast import (
     Program,
     Statement,
@@ -12,6 +14,7 @@ from src.ast import (
     Expression,
     InfixExpression,
     FunctionLiteral,
+    StringLiteral,
 )
 import pdb
 
@@ -323,3 +326,48 @@ def test_parsing_index_expression():
     statement = program.statements[0]
     # pdb.set_trace()
     assert statement.token.Literal == "myArray"
+
+
+def test_parser_reset():
+    p: Parser = Parser.new(Lexer.new("let x = ;"))
+    p.parse_program()
+    assert len(p.errors) == 1
+
+    program = p.reset(Lexer.new("let y = 10;")).parse_program()
+    check_parser_error(p)
+    assert program.statements[0].name.value == "y"
+    assert program.statements[0].value.value == 10
+
+
+def test_register_prefix_function_is_per_parser():
+    p: Parser = Parser.new(Lexer.new("x"))
+    p.register_prefix_function(TokenTypes.IDENT, lambda: IntegerLiteral(p.cur_token, 1))
+    assert p.parse_program().statements[0].expression.value == 1
+    other: Parser = Parser.new(Lexer.new("x"))
+    assert other.parse_program().statements[0].expression.value == "x"
+
+
+@pytest.mark.parametrize("parser_class", [Parser, IterativeParser])
+def test_register_bound_methods(parser_class):
+    p = parser_class.new(Lexer.new("a * b - c;"))
+    p.register_prefix_function(TokenTypes.IDENT, p.parse_string_literal)
+    p.register_infix_function(TokenTypes.MINUS, p.parse_infix_expression)
+    statement = p.parse_program().statements[0]
+    assert str(statement.expression) == "((a * b) - c)"
+    assert type(statement.expression.right) is StringLiteral
+
+
+@pytest.mark.parametrize("parser_class", [Parser, IterativeParser])
+def test_parse_statements_drops_yielded_statements(parser_class):
+    p = parser_class.new(Lexer.new("let a = 1; a; let b = 2;"))
+    held = []
+    parse_statement = p.parse_statement
+
+    def probe():
+        # the frame of 'parse_statements', while the next statement is parsed
+        held.append(sys._getframe(1).f_locals.get("statement"))
+        return parse_statement()
+
+    p.parse_statement = probe
+    assert len(list(p.parse_statements())) == 3
+    assert held == [None, None, None]
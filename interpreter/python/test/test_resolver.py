@@ -0,0 +1,77 @@
+import pytest
+from src import object
+from src.evaluator import BUILTINS, eval_program
+from src.object import CELL, GLOBAL, LOCAL
+from src.resolver import resolve
+from corpus import ALL_PROGRAMS, parse
+
+
+def eval_resolved(source: str) -> object.Object:
+    return eval_program(resolve(parse(source)), object.new_environment())
+
+
+def eval_unresolved(source: str) -> object.Object:
+    return eval_program(parse(source), object.new_environment())
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_resolved_evaluation_matches(source):
+    assert eval_resolved(source) == eval_unresolved(source)
+
+
+def test_addresses():
+    program = resolve(parse("let a = 1; let f = fn(x) { let y = x; fn() { a + y } };"))
+    function = program.statements[1].value
+    assert program.statements[0].name.address == ((GLOBAL, None),)
+    scope = function.body.scope
+    assert list(scope.names) == ["x", "y"]
+    assert scope.places == {"x": (LOCAL, 0), "y": (CELL, 0)}
+    let_y = function.body.statements[0]
+    assert let_y.name.address == ((CELL, 0),)
+    assert let_y.value.address == ((LOCAL, 0), (GLOBAL, None))
+    inner = function.body.statements[1].expression
+    assert inner.body.scope.captures == (0,)
+    sum = inner.body.statements[0].expression
+    assert sum.left.address == ((GLOBAL, None),)
+    assert sum.right.address == ((CELL, 0), (GLOBAL, None))
+    assert resolve(parse("len")).statements[0].expression.address is BUILTINS["len"]
+
+
+def test_variables_pass_through_functions_that_do_not_use_them():
+    program = resolve(parse("fn(a) { fn(b) { fn(c) { a + c } } };"))
+    outer = program.statements[0].expression
+    middle = outer.body.statements[0].expression
+    inner = middle.body.statements[0].expression
+    assert outer.body.scope.places == {"a": (CELL, 0)}
+    assert middle.body.scope.places == {"b": (LOCAL, 0)}
+    assert middle.body.scope.captures == (0,)
+    assert inner.body.scope.captures == (0,)
+    assert inner.body.scope.places == {"c": (LOCAL, 0)}
+
+
+def test_closures_capture_only_what_they_use():
+    source = """
+    let make = fn(x) { let big = [1, 2, 3]; let y = x * 2; fn() { y } };
+    make(5);
+    """
+    closure = eval_program(resolve(parse(source)), object.new_environment())
+    assert closure.env.get("make") is not None
+    assert closure.cells == (object.Cell(value=object.Integer(value=10)),)
+
+
+def test_top_level_stays_in_the_environment():
+    env = object.new_environment()
+    eval_program(resolve(parse("let add = fn(x, y) { x + y };")), env)
+    assert eval_program(resolve(parse("add(1, 2);")), env).value == 3
+    assert env.get("add") is not None
+
+
+def test_padding_only_for_functions_without_cells():
+    program = resolve(parse("fn(x, y) { let z = x + y; fn() { z } };"))
+    outer = program.statements[0].expression
+    assert outer.body.scope.padding is None
+    inner = outer.body.statements[1].expression
+    assert inner.body.scope.padding is None
+    leaf = resolve(parse("fn(x) { let y = x; let z = y; z };")).statements[0]
+    assert leaf.expression.body.scope.padding == [None, None]
+    assert resolve(parse("fn(x, x) { x };")).statements[0].expression.body.scope.padding is None
@@ -0,0 +1,65 @@
+import pytest
+from src import object
+from src.escape_analysis import analyze
+from src.evaluator import eval_program
+from src.resolver import resolve
+from src.stackless import Evaluation, eval_stackless
+from src.tail_calls import mark
+from corpus import ALL_PROGRAMS, parse
+
+SUM = """
+let sum = fn(n) { if (n == 0) { 0 } else { n + sum(n - 1) } };
+sum(3000);
+"""
+FIB = """
+let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(10);
+"""
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_stackless_evaluates_the_same(source, capsys):
+    expected = eval_program(parse(source), object.new_environment())
+    program = parse(source)
+    capsys.readouterr()
+    assert eval_stackless(program, object.new_environment()) == expected
+    # no program writes to stdout, 'eval_program' only prints a debug line
+    assert capsys.readouterr().out == ""
+    program = mark(analyze(resolve(parse(source))))
+    assert eval_stackless(program, object.new_environment()) == expected
+
+
+def test_deep_recursion():
+    with pytest.raises(RecursionError):
+        eval_program(parse(SUM), object.new_environment())
+    assert eval_stackless(parse(SUM), object.new_environment()).value == 4501500
+    program = analyze(resolve(parse(SUM)))
+    assert eval_stackless(program, object.new_environment()).value == 4501500
+
+
+def test_pause_and_resume():
+    env = object.new_environment()
+    evaluation = Evaluation.new(parse(FIB), env)
+    assert not evaluation.run(100)
+    assert evaluation.steps == 100
+    with pytest.raises(ValueError):
+        evaluation.result
+
+    runs = 1
+    while not evaluation.run(100):
+        runs += 1
+    assert runs > 10
+    assert evaluation.done
+    assert evaluation.result.value == 55
+    assert evaluation.run(100)
+    assert evaluation.result.value == 55
+
+
+def test_evaluations_are_independent():
+    first = Evaluation.new(parse(FIB), object.new_environment())
+    second = Evaluation.new(parse(SUM), object.new_environment())
+    while not (first.done and second.done):
+        first.run(50)
+        second.run(50)
+    assert first.result.value == 55
+    assert second.result.value == 4501500
@@ -0,0 +1,68 @@
+import pytest
+from src.escape_analysis import analyze
+from src.resolver import resolve
+from src.tail_calls import mark, tail_calls
+from corpus import ALL_PROGRAMS, evaluate, parse
+
+COUNT_DOWN = """
+let count = fn(n, total) { if (n == 0) { total } else { count(n - 1, total + 2) } };
+count(2000, 0);
+"""
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("fn(x) { f(x) };", ["f"]),
+        ("fn(x) { return f(x); };", ["f"]),
+        ("fn(x) { f(x) + 1 };", []),
+        ("fn(x) { f(g(x)) };", ["f"]),
+        ("fn(x) { return f(x); 1 };", []),
+        ("fn(x) { let y = f(x); };", []),
+        ("fn(x) { if (x) { f(x) } else { g(x) } };", ["f", "g"]),
+        ("fn(x) { if (x) { return f(x); } g(x) };", ["g"]),
+        ("fn(x) { if (f(x)) { if (x) { g(x) } } };", ["g"]),
+        ("fn(x) { fn(y) { f(y) } };", []),
+    ],
+)
+def test_tail_calls(source, expected):
+    function = parse(source).statements[0].expression
+    assert sorted(call.function.value for call in tail_calls(function)) == expected
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_tail_calls_evaluate_the_same(source, capsys):
+    expected = evaluate(parse(source))
+    expected_output = capsys.readouterr().out
+    assert evaluate(mark(parse(source))) == expected
+    assert capsys.readouterr().out == expected_output
+    assert evaluate(mark(analyze(resolve(parse(source))))) == expected
+
+
+def test_tail_recursion_does_not_grow_the_stack():
+    with pytest.raises(RecursionError):
+        evaluate(parse(COUNT_DOWN))
+    assert evaluate(mark(parse(COUNT_DOWN))).value == 4000
+    assert evaluate(mark(analyze(resolve(parse(COUNT_DOWN))))).value == 4000
+
+
+def test_mutual_recursion():
+    source = """
+    let even = fn(n) { if (n == 0) { true } else { return odd(n - 1); } };
+    let odd = fn(n) { if (n == 0) { false } else { return even(n - 1); } };
+    [even(1500), odd(1500), even(7)];
+    """
+    elements = evaluate(mark(analyze(resolve(parse(source))))).elements
+    assert [element.value for element in elements] == [True, False, False]
+
+
+def test_calls_that_are_not_in_tail_position():
+    source = """
+    let factorial = fn(n) { if (n == 0) { 1 } else { n * factorial(n - 1) } };
+    factorial(5);
+    """
+    program = mark(parse(source))
+    body = program.statements[0].value.body
+    call = body.statements[0].expression.alternative.statements[0].expression.right
+    assert not call.tail
+    assert evaluate(program).value == 120
@@ -0,0 +1,111 @@
+import pytest
+import warnings
+from src.lexer import Lexer
+from src.parser import Parser
+from src import transpiler
+from src import object
+from corpus import EVALUATION_CASES, ERROR_CASES
+
+
+def transpile_helper(source: str) -> object.Object:
+    l: Lexer = Lexer.new(source)
+    p: Parser = Parser.new(l)
+
+    program = p.parse_program()
+    env = object.new_environment()
+    return transpiler.compile_program(program).run(env)
+
+
+@pytest.mark.parametrize("source, expected", EVALUATION_CASES)
+def test_evaluations(source, expected):
+    evaluated = transpile_helper(source)
+    if evaluated is None:
+        assert evaluated is expected
+    elif type(evaluated) == object.Error:
+        assert evaluated.message == expected
+    else:
+        assert evaluated.value == expected
+
+
+@pytest.mark.parametrize("source, expected_message", ERROR_CASES)
+def test_error_handling(source, expected_message):
+    evaluated = transpile_helper(source)
+    assert evaluated.message == expected_message
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        # a 'let' that has not run yet falls back to the outer binding
+        ("let x = 1; let f = fn() { let y = x; let x = 2; y }; f()", 1),
+        ("let x = 1; let f = fn() { if (false) { let x = 2 }; x }; f()", 1),
+        # 'return' only leaves the innermost block
+        ("let f = fn(n) { if (n > 0) { return 1; }; 2 }; f(1)", 2),
+        ("let f = fn() { 1 + if (true) { let z = 3; return z; 9 } }; f()", 4),
+        # an error that is not the last statement of a block is discarded
+        ("let f = fn() { return true + false; 5 }; f()", 5),
+        ("let g = fn() { h() }; let h = fn() { 7 }; g()", 7),
+    ],
+)
+def test_scoping_matches_evaluator(source, expected):
+    assert transpile_helper(source).value == expected
+
+
+def test_function():
+    evaluated = transpile_helper("fn(x) { x + 2; };")
+    assert isinstance(evaluated, object.Function)
+    assert evaluated.parameters[0].value == "x"
+
+
+def test_closures():
+    source = """
+    let newAdder = fn(x) {
+    fn(y) { x + y };
+    };
+    let addTwo = newAdder(2);
+    addTwo(2);
+    """
+    assert transpile_helper(source).value == 4
+
+
+def test_compiled_source_is_cached():
+    source = "let double = fn(x) { x * 2 }; double(21);"
+    compiled = transpiler.compile_source(source)
+    assert transpiler.compile_source(source) is compiled
+    assert compiled.run(object.new_environment()).value == 42
+
+
+@pytest.mark.parametrize(
+    "source, expected_message",
+    [
+        ("fn(c) { 1 } - 3", "type mismatch: Type.FUNCTION_OBJ - Type.INTEGER_OBJ"),
+        ("-fn(c) { 1 }", "unknown operator: -Type.FUNCTION_OBJ"),
+        ("fn(c) { 1 }[0]", "index operator not supported for Type.FUNCTION_OBJ"),
+        (
+            "len(fn(c) { 1 })",
+            "argument to 'len' not supported, got <class 'src.object.Function'>",
+        ),
+    ],
+)
+def test_functions_are_reported_as_functions(source, expected_message):
+    assert transpile_helper(source).message == expected_message
+
+
+def test_top_level_lets_are_kept_in_the_environment():
+    env = object.new_environment()
+    first = Parser.new(Lexer.new("let a = 5; let f = fn(x) { x + a };"))
+    transpiler.compile_program(first.parse_program()).run(env)
+    assert env.get("a").value == 5
+    assert isinstance(env.get("f"), object.Function)
+    second = Parser.new(Lexer.new("f(a) + a;"))
+    assert transpiler.compile_program(second.parse_program()).run(env).value == 15
+
+
+def test_conditions_compile_without_warnings():
+    program = Parser.new(Lexer.new("if (x) { 1 } else { 2 };")).parse_program()
+    # a missing condition, left behind by a parse error, is compiled as None
+    program.statements[0].expression.condition = None
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        compiled = transpiler.compile_program(program)
+    assert compiled.run(object.new_environment()).value == 1
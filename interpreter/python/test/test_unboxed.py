@@ -0,0 +1,72 @@
+import pytest
+from src import evaluator
+from src import object
+from src import unboxed
+from src.escape_analysis import analyze
+from src.resolver import resolve
+from src.tail_calls import mark
+from corpus import ALL_PROGRAMS, outcome, parse
+
+EXTRA_SOURCES = [
+    "10 / 4 * 2;",
+    '!0; !-1; !"";',
+    '[1, true, "a"] == [1, true, "a"];',
+    "[1] == [true];",
+    "true == true; true != false; true < false;",
+    '"a" - "b";',
+    "-true;",
+    "let a = [1, 2, 3]; a[1] + a[5];",
+    "[1, [2, 3]][1];",
+    'len("four") + len([1, 2]);',
+    "let f = fn(x) { x }; f;",
+]
+
+
+def evaluate(evaluate_program, program):
+    result = outcome(evaluate_program, program)
+    if type(result) is object.Function:
+        # the environment of an unboxed function holds unboxed values
+        return result.inspect()
+    return result
+
+
+@pytest.mark.parametrize(
+    "source",
+    ALL_PROGRAMS + EXTRA_SOURCES,
+)
+def test_unboxed_evaluates_the_same(source, capsys):
+    expected = evaluate(evaluator.eval_program, parse(source))
+    program = parse(source)
+    capsys.readouterr()
+    assert evaluate(unboxed.eval_program, program) == expected
+    # no program writes to stdout, 'eval_program' only prints a debug line
+    assert capsys.readouterr().out == ""
+    program = mark(analyze(resolve(parse(source))))
+    assert evaluate(unboxed.eval_program, program) == expected
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        object.Integer(value=3),
+        object.String(value="a"),
+        evaluator.TRUE,
+        evaluator.NULL,
+        object.Array(elements=[object.Integer(value=1), evaluator.FALSE]),
+    ],
+)
+def test_box(value):
+    assert unboxed.box(unboxed.unbox(value)) == value
+
+
+def test_values_are_not_boxed():
+    env = object.new_environment()
+    source = 'let a = 1 + 2; let b = "x" + "y"; let c = a > 2; let d = [a, b];'
+    unboxed.eval_program(parse(source), env)
+    assert env.get("a") == 3 and type(env.get("a")) is int
+    assert env.get("b") == "xy"
+    assert env.get("c") is True
+    assert env.get("d").elements == [3, "xy"]
+    assert unboxed.eval_program(parse("d;"), env) == object.Array(
+        elements=[object.Integer(value=3), object.String(value="xy")]
+    )
@@ -0,0 +1,102 @@
+import pytest
+from src.lexer import Lexer
+from src.parser import Parser
+from src.compiler import compile_program
+from src import vm
+from src.evaluator import eval_program
+from src import object
+from src.escape_analysis import analyze
+from src.resolver import resolve
+from corpus import ALL_PROGRAMS, EVALUATION_CASES, ERROR_CASES, outcome, parse
+
+
+def vm_helper(source: str) -> object.Object:
+    l: Lexer = Lexer.new(source)
+    p: Parser = Parser.new(l)
+
+    program = p.parse_program()
+    env = object.new_environment()
+    return vm.interpret(program, env)
+
+
+@pytest.mark.parametrize("source, expected", EVALUATION_CASES)
+def test_evaluations(source, expected):
+    evaluated = vm_helper(source)
+    if evaluated is None:
+        assert evaluated is expected
+    elif type(evaluated) == object.Error:
+        assert evaluated.message == expected
+    else:
+        assert evaluated.value == expected
+
+
+@pytest.mark.parametrize("source, expected_message", ERROR_CASES)
+def test_error_handling(source, expected_message):
+    evaluated = vm_helper(source)
+    assert evaluated.message == expected_message
+
+
+@pytest.mark.parametrize("source", ALL_PROGRAMS)
+def test_resolved_programs(source, capsys):
+    # 'resolver' and 'escape_analysis' annotate the ast the chunks are
+    # compiled from, the vm still runs it by name
+    expected = outcome(vm.interpret, parse(source))
+    assert outcome(vm.interpret, analyze(resolve(parse(source)))) == expected
+
+
+@pytest.mark.parametrize(
+    "source, expected_message",
+    [
+        ("foo + ![1]", "identifier not found: foo"),
+        ("g()[!fn(){}]", "identifier not found: g"),
+        ("g(![1])", "identifier not found: g"),
+        ("let a = [1]; a[foo][![1]]", "identifier not found: foo"),
+        ("-foo * ![1]", "identifier not found: foo"),
+    ],
+)
+def test_errors_skip_the_remaining_operands(source, expected_message):
+    evaluated = vm_helper(source)
+    assert evaluated.message == expected_message
+    assert evaluated == eval_program(
+        Parser.new(Lexer.new(source)).parse_program(), object.new_environment()
+    )
+
+
+def test_errors_in_arguments_skip_the_remaining_arguments():
+    # the evaluator raises a TypeError for these, through 'eval_expressions'
+    source = "let f = fn(x, y) { x }; f(foo, ![1]);"
+    assert vm_helper(source).message == "identifier not found: foo"
+    assert vm_helper("[1, foo, ![1]]").message == "identifier not found: foo"
+
+
+def test_function():
+    evaluated = vm_helper("fn(x) { x + 2; };")
+    assert isinstance(evaluated, object.Function)
+    assert evaluated.parameters[0].value == "x"
+    assert evaluated.body.statements[0].expression.operator == "+"
+
+
+def test_closures():
+    source = """
+    let newAdder = fn(x) {
+    fn(y) { x + y };
+    };
+    let addTwo = newAdder(2);
+    addTwo(2);
+    """
+    assert vm_helper(source).value == 4
+
+
+def test_recursion_deeper_than_python_stack():
+    source = """
+    let countdown = fn(n) { if (n == 0) { 0 } else { countdown(n - 1) } };
+    countdown(5000);
+    """
+    assert vm_helper(source).value == 0
+
+
+def test_constants_are_deduplicated():
+    l: Lexer = Lexer.new("1 + 1 + 1;")
+    chunk = compile_program(Parser.new(l).parse_program())
+    assert len(chunk.constants) == 1
+    assert chunk.disassemble().count("CONSTANT") == 3